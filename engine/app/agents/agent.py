@@ -1,4 +1,5 @@
-from app.llm.prompts import RESPONSE_GENERATION_PROMPT
+from typing import Iterator, List
+from app.llm.prompts import RESPONSE_GENERATION_PROMPT, FALLBACK_RESPONSES
 
 
 class Agent:
@@ -19,7 +20,7 @@ class Agent:
         
         return strategy_map.get(intent, "PROBE_DETAILS")
 
-    def generate_response(self, context: str, intent: str, strategy: str, language: str = "English") -> str:
+    def build_prompt(self, context: str, strategy: str, language: str = "English") -> str:
         strategy_descriptions = {
             "CLARIFY": "Ask for clarification to understand better",
             "PROBE_DETAILS": "Ask about specific details they mentioned",
@@ -31,26 +32,43 @@ class Agent:
         }
         
         strategy_desc = strategy_descriptions.get(strategy, "Ask a thoughtful question")
-        
+        return RESPONSE_GENERATION_PROMPT.format(
+            context=context,
+            strategy=strategy_desc,
+            language=language
+        )
+
+    def generate_response(self, context: str, intent: str, strategy: str, language: str = "English") -> str:
         try:
-            prompt = RESPONSE_GENERATION_PROMPT.format(
-                context=context,
-                strategy=strategy_desc,
-                language=language
-            )
+            prompt = self.build_prompt(context, strategy, language)
             response = self.flan_client.generate(prompt, max_new_tokens=40, temperature=0.9)
-            
-            response = response.strip()
-            if not response:
-                return "Can you tell me more about that?"
-            
-            if not response.endswith('?'):
-                question_words = ['what', 'how', 'why', 'when', 'where', 'who', 'can', 'could', 'would', 'do', 'does', 'did', 'is', 'are', 'was', 'were']
-                first_word = response.split()[0].lower() if response.split() else ''
-                if first_word in question_words:
-                    response += '?'
-            
-            return response
+            return self.clean_response(response)
         except Exception as e:
             print(f"\n⚠ Error in generate_response: {e}")
-            return "How does that make you feel?"
+            return FALLBACK_RESPONSES[1]
+
+    def clean_response(self, response: str) -> str:
+        response = response.strip()
+        if not response:
+            return FALLBACK_RESPONSES[0]
+        
+        if not response.endswith('?'):
+            question_words = ['what', 'how', 'why', 'when', 'where', 'who', 'can', 'could', 'would', 'do', 'does', 'did', 'is', 'are', 'was', 'were']
+            first_word = response.split()[0].lower() if response.split() else ''
+            if first_word in question_words:
+                response = response.rstrip('.') + '?'
+        
+        return response
+
+    def generate_candidates(self, context: str, intent: str, strategy: str, language: str = "English", count: int = 3) -> List[str]:
+        try:
+            prompt = self.build_prompt(context, strategy, language)
+            responses = self.flan_client.generate_many(prompt, count, max_new_tokens=40, temperature=0.9)
+            return [self.clean_response(response) for response in responses]
+        except Exception as e:
+            print(f"\n⚠ Error in generate_candidates: {e}")
+            return [FALLBACK_RESPONSES[1]]
+
+    def generate_response_stream(self, context: str, intent: str, strategy: str, language: str = "English") -> Iterator[str]:
+        prompt = self.build_prompt(context, strategy, language)
+        return self.flan_client.generate_stream(prompt, max_new_tokens=40, temperature=0.9)
@@ -1,18 +1,43 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
 from typing import List, Optional, Tuple
 from app.agents.agent import Agent
+from app.agents.intent_classifier import INTENTS, IntentClassifier
+from app.agents.question_bank import QuestionBank
 from app.llm.flan import FlanClient
-from app.llm.prompts import INTENT_CLASSIFICATION_PROMPT
+from app.llm.prompts import INTENT_CLASSIFICATION_PROMPT, FALLBACK_RESPONSES
 from app.memory.store import ConversationStore
+from app.memory.context import BackendLimits, ContextBuilder, llm_summarizer
 from app.memory.threads import ThreadInferencer
 from app.utils.similarity import SimilarityChecker
+from app.utils.sentences import iter_sentences
 from app.config import Config
 from app.tts.elevenlabs_service import ElevenLabsTTSService
 from app.tts.audio_player import AudioPlayer
+from app.tts.pcm_player import PCMStreamPlayer
+from app.tts.cache import TTSCache
+from app.tts.archive import AudioArchiver
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class TurnPlan:
+    agent: Agent
+    intent: str
+    strategy: str
+    context: str
+    language: str
+    preselected: bool = False
+    primary_text: str = ""
+    abandoned: bool = False
+
+
 class Orchestrator:
     def __init__(
         self,
@@ -32,8 +57,29 @@ class Orchestrator:
         self.round_robin_index = 0
         self.tts_service: Optional[ElevenLabsTTSService] = None
         self.audio_player: Optional[AudioPlayer] = None
+        self.pcm_player: Optional[PCMStreamPlayer] = None
+        self.barge_in = None
+        self.recorder = None
         self.agent_voice_map = {}
         self.detected_language = "English"
+        self.intent_classifier: Optional[IntentClassifier] = None
+        if self.config.local_intent_classifier:
+            self.intent_classifier = IntentClassifier(
+                threshold=self.config.intent_confidence_threshold,
+                cache_size=self.config.intent_cache_size,
+                escalate=self.classify_intent_llm
+            )
+        self.question_bank = QuestionBank()
+        self.response_executor = ThreadPoolExecutor(max_workers=4)
+        self.turn_stats: Counter = Counter()
+        self.context_builder: Optional[ContextBuilder] = None
+        if self.config.context_token_budget > 0:
+            self.context_builder = ContextBuilder(
+                memory,
+                BackendLimits(flan_client, config),
+                config,
+                summarize=llm_summarizer(flan_client) if self.config.context_summary else None
+            )
         
         if not self.config.single_person_mode:
             for i, agent in enumerate(agents):
@@ -43,38 +89,68 @@ class Orchestrator:
         if self.config.enable_tts:
             if self.config.elevenlabs_api_key:
                 try:
+                    tts_cache = None
+                    if self.config.tts_cache_enabled:
+                        tts_cache = TTSCache(
+                            self.config.tts_cache_dir,
+                            memory_items=self.config.tts_cache_memory_items,
+                            max_bytes=int(self.config.tts_cache_max_mb * 1024 * 1024)
+                        )
+                    archiver = None
+                    if self.config.tts_archive_enabled:
+                        archiver = AudioArchiver(
+                            self.config.tts_archive_dir,
+                            audio_format=self.config.tts_archive_format,
+                            max_files=self.config.tts_archive_max_files,
+                            max_bytes=int(self.config.tts_archive_max_mb * 1024 * 1024),
+                            queue_size=self.config.tts_archive_queue_size,
+                            sample_rate=self.config.tts_sample_rate
+                        )
                     self.tts_service = ElevenLabsTTSService(
                         api_key=self.config.elevenlabs_api_key,
                         voice_id=self.config.elevenlabs_voice_id,
                         timeout=self.config.tts_timeout,
-                        tts_enabled=self.config.enable_tts
+                        tts_enabled=self.config.enable_tts,
+                        cache=tts_cache,
+                        archiver=archiver,
+                        streaming_latency=self.config.tts_streaming_latency
                     )
+                    if tts_cache:
+                        voices = [self.config.elevenlabs_voice_id] + list(self.config.student_voices)
+                        threading.Thread(
+                            target=self.tts_service.warm_cache,
+                            args=(FALLBACK_RESPONSES, list(dict.fromkeys(voices))),
+                            daemon=True
+                        ).start()
                     self.audio_player = AudioPlayer()
+                    if self.config.streaming_playback:
+                        self.pcm_player = PCMStreamPlayer(self.config)
                     logger.info("TTS service initialized successfully")
                 except Exception as e:
                     logger.error(f"Failed to initialize TTS service: {e}")
                     self.tts_service = None
                     self.audio_player = None
+                    self.pcm_player = None
             else:
                 logger.warning("TTS enabled but ELEVENLABS_API_KEY not configured - TTS disabled")
 
     def classify_intent(self, text: str) -> str:
+        if self.intent_classifier:
+            return self.intent_classifier.classify(text)
+        return self.classify_intent_llm(text)
+
+    def classify_intent_llm(self, text: str) -> str:
         prompt = INTENT_CLASSIFICATION_PROMPT.format(text=text)
-        response = self.flan_client.generate(prompt, max_new_tokens=16, temperature=0.1)
+        response = self.flan_client.generate(prompt, max_new_tokens=16, temperature=0.1, purpose="intent")
         intent = response.strip().upper()
 
-        valid_intents = [
-            "INFORMATION", "EMOTIONAL_EXPRESSION", "REQUEST_REPEAT",
-            "REQUEST_CLARIFICATION", "DEFENSIVE", "ELABORATION", "QUESTION"
-        ]
-
-        for valid in valid_intents:
+        for valid in INTENTS:
             if valid in intent:
                 return valid
 
         return "INFORMATION"
 
-    def select_speaking_agent(self, context: str, intent: str) -> Agent:
+    def select_speaking_agent(self, context: str, intent: str, advance: bool = True) -> Agent:
         last_agent_name = self.memory.last_agent
         if last_agent_name:
             for agent in self.agents:
@@ -84,7 +160,8 @@ class Orchestrator:
                         return agent
         
         selected = self.agents[self.round_robin_index]
-        self.round_robin_index = (self.round_robin_index + 1) % len(self.agents)
+        if advance:
+            self.round_robin_index = (self.round_robin_index + 1) % len(self.agents)
         return selected
 
     def check_and_regenerate(
@@ -107,7 +184,12 @@ class Orchestrator:
 
         return response
 
-    def process_turn(self, primary_text: str, detected_language: str = "English") -> Tuple[str, str, str]:
+    def build_context(self, pending_primary: Optional[str] = None) -> str:
+        if self.context_builder:
+            return self.context_builder.build(pending_primary)
+        return self.memory.build_context(self.config.max_context_turns, pending_primary=pending_primary)
+
+    def prepare_turn(self, primary_text: str, detected_language: str = "English") -> TurnPlan:
         self.detected_language = detected_language
         
         if self.config.use_intent_classification:
@@ -117,46 +199,354 @@ class Orchestrator:
         
         self.memory.add_primary_turn(primary_text, intent)
         self.thread_inferencer.update_if_needed(self.memory)
-        context = self.memory.build_context(self.config.max_context_turns)
+        context = self.build_context()
         selected_agent = self.select_speaking_agent(context, intent)
         strategy = selected_agent.select_strategy(context, intent)
-        response = selected_agent.generate_response(context, intent, strategy, detected_language)
-        response = self.check_and_regenerate(selected_agent, response, context, intent, strategy, detected_language)
-        self.memory.add_agent_turn(selected_agent.name, response, strategy)
-        return selected_agent.name, strategy, response
+        return TurnPlan(selected_agent, intent, strategy, context, detected_language, primary_text=primary_text)
+
+    def preview_turn(self, primary_text: str, detected_language: str = "English") -> TurnPlan:
+        # prepare_turn without touching the conversation store or the agent
+        # rotation, for speculative generation on a provisional transcript.
+        if self.config.use_intent_classification:
+            intent = self.classify_intent(primary_text)
+        else:
+            intent = "INFORMATION"
+        context = self.build_context(pending_primary=primary_text)
+        selected_agent = self.select_speaking_agent(context, intent, advance=False)
+        strategy = selected_agent.select_strategy(context, intent)
+        return TurnPlan(selected_agent, intent, strategy, context, detected_language, primary_text=primary_text)
+
+    def adopt_preview(self, plan: TurnPlan, primary_text: str) -> None:
+        # Applies the state changes prepare_turn would have made.
+        self.detected_language = plan.language
+        self.memory.add_primary_turn(primary_text, plan.intent)
+        self.thread_inferencer.update_if_needed(self.memory)
+        if plan.agent is self.agents[self.round_robin_index]:
+            self.round_robin_index = (self.round_robin_index + 1) % len(self.agents)
+        plan.primary_text = primary_text
+
+    def select_candidate(self, plan: TurnPlan) -> str:
+        # Asks for several candidates at once instead of regenerating
+        # serially, and takes the one least similar to our recent outputs.
+        # Canned fallbacks are never chosen over a real candidate.
+        candidates = plan.agent.generate_candidates(
+            plan.context, plan.intent, plan.strategy, plan.language,
+            count=self.config.response_candidates
+        )
+        generated = [c for c in candidates if c not in FALLBACK_RESPONSES]
+        if not generated:
+            return candidates[0] if candidates else FALLBACK_RESPONSES[0]
+        recent_outputs = self.memory.get_recent_agent_outputs()
+        return min(generated, key=lambda c: self.similarity_checker.max_similarity(c, recent_outputs))
+
+    def generate_for_turn(self, plan: TurnPlan) -> str:
+        if self.config.response_candidates > 1:
+            plan.preselected = True
+            return self.select_candidate(plan)
+        return plan.agent.generate_response(plan.context, plan.intent, plan.strategy, plan.language)
+
+    def needs_regeneration(self, plan: TurnPlan, response: str) -> bool:
+        # Whether finalize_turn would replace the response.
+        if plan.preselected:
+            return False
+        return self.similarity_checker.is_too_similar(response, self.memory.get_recent_agent_outputs())
+
+    @staticmethod
+    def ensure_response(response: str) -> str:
+        if not response or len(response.strip()) < 3:
+            return FALLBACK_RESPONSES[0]
+        return response
+
+    def finalize_turn(self, plan: TurnPlan, response: str) -> str:
+        if plan.preselected:
+            return response
+        return self.check_and_regenerate(plan.agent, response, plan.context, plan.intent, plan.strategy, plan.language)
+
+    def fallback_question(self, plan: TurnPlan) -> str:
+        # Bank questions are already non-repeating, so skip the repetition check.
+        plan.preselected = True
+        if not self.question_bank.supports(plan.language):
+            return FALLBACK_RESPONSES[0]
+        self.turn_stats["bank_answers"] += 1
+        recent_outputs = self.memory.get_recent_agent_outputs()
+        # The same check, and scope, that generated responses go through.
+        question = self.question_bank.select(
+            plan.strategy,
+            plan.primary_text,
+            keywords=self.memory.active_threads,
+            exclude=recent_outputs,
+            is_repeat=lambda text: self.similarity_checker.is_too_similar(text, recent_outputs)
+        )
+        return question or FALLBACK_RESPONSES[0]
+
+    def turn_deadline(self, language: str) -> Optional[float]:
+        # None when the bank cannot answer in the patient's language. Never
+        # shorter than llm_deadline, so the router can fail over to another
+        # backend before the bank takes the turn.
+        if self.config.response_deadline <= 0 or not self.question_bank.supports(language):
+            return None
+        return max(self.config.response_deadline, self.config.llm_deadline)
+
+    def _generate_and_finalize(self, plan: TurnPlan) -> str:
+        response = self.generate_for_turn(plan)
+        if plan.abandoned:
+            # The turn was already answered; skip the regeneration calls.
+            return response
+        return self.finalize_turn(plan, response)
+
+    def generate_with_deadline(self, plan: TurnPlan, started: float) -> str:
+        # Generation runs on a worker so the turn can be answered from the
+        # question bank once the deadline passes; the late result is dropped.
+        # Canned replies from a failed generation are replaced the same way.
+        deadline = self.turn_deadline(plan.language)
+        if deadline is None:
+            response = self.finalize_turn(plan, self.generate_for_turn(plan))
+        else:
+            future = self.response_executor.submit(self._generate_and_finalize, plan)
+            try:
+                response = future.result(timeout=max(0.0, deadline - (time.monotonic() - started)))
+            except FutureTimeoutError:
+                # A call still queued behind stale work never starts; a
+                # running one stops before regenerating.
+                future.cancel()
+                plan.abandoned = True
+                self.turn_stats["deadline_misses"] += 1
+                return self.fallback_question(plan)
+
+        if response in FALLBACK_RESPONSES:
+            return self.fallback_question(plan)
+        return response
+
+    def commit_turn(self, plan: TurnPlan, response: str) -> None:
+        self.memory.add_agent_turn(plan.agent.name, response, plan.strategy)
+        self.similarity_checker.add(response)
+
+    def process_turn(
+        self,
+        primary_text: str,
+        detected_language: str = "English",
+        speculative: Optional[Tuple[TurnPlan, Optional[str]]] = None,
+        started: Optional[float] = None
+    ) -> Tuple[str, str, str]:
+        # A speculative response of None means the speculation used up the
+        # turn's deadline, so the bank answers right away.
+        if speculative:
+            plan, response = speculative
+            self.adopt_preview(plan, primary_text)
+            if response is None:
+                self.turn_stats["deadline_misses"] += 1
+                response = self.fallback_question(plan)
+        else:
+            if started is None:
+                started = time.monotonic()
+            plan = self.prepare_turn(primary_text, detected_language)
+            response = self.generate_with_deadline(plan, started)
+        self.commit_turn(plan, response)
+        return plan.agent.name, plan.strategy, response
+
+    def get_display_name(self, agent_name: str) -> str:
+        if agent_name == "Interviewer":
+            return "INTERVIEWER"
+        student_num = agent_name.split("_")[-1] if "_" in agent_name else "1"
+        return f"STUDENT {student_num}"
+
+    def get_voice_id(self, agent_name: str) -> Optional[str]:
+        if not self.config.single_person_mode and agent_name in self.agent_voice_map:
+            return self.agent_voice_map[agent_name]
+        return None
+
+    def synthesize(self, agent_name: str, response: str, language: str) -> Optional[bytes]:
+        return self.tts_service.text_to_speech(response, voice_id=self.get_voice_id(agent_name), language=language)
+
+    def _play_with_barge_in(self, play, response: str) -> bool:
+        if self.recorder:
+            self.recorder.playback.set()
+        try:
+            if not self.barge_in:
+                play(None)
+                return False
+
+            self.barge_in.start()
+            try:
+                play(self.barge_in.triggered)
+            finally:
+                self.barge_in.stop()
+            if self.barge_in.triggered.is_set():
+                self.memory.mark_last_agent_turn_truncated(response)
+                logger.info(f"Playback interrupted by patient: {response}")
+                return True
+            return False
+        finally:
+            # The microphone heard the playback too; don't record it as the
+            # patient's next turn.
+            if self.recorder:
+                self.recorder.playback.clear()
+                self.recorder.skip_to_live()
+
+    def play_response(self, audio_data: bytes, response: str) -> bool:
+        return self._play_with_barge_in(
+            lambda interrupt: self.audio_player.play_audio(audio_data, interrupt=interrupt),
+            response
+        )
+
+    def speak_streaming(self, agent_name: str, response: str, language: str) -> bool:
+        chunks = self.tts_service.stream_speech(response, voice_id=self.get_voice_id(agent_name), language=language)
+        return self._play_with_barge_in(
+            lambda interrupt: self.pcm_player.play_stream(chunks, interrupt=interrupt),
+            response
+        )
+
+    def _synthesize_sentences(self, agent_name: str, sentences: queue.Queue, ready: queue.Queue, language: str, state: dict) -> None:
+        # Fetches each sentence's audio into its own buffer. `ready` holds one
+        # entry, so this runs one sentence ahead of playback: the next request
+        # is in flight while the current sentence plays, and nothing is
+        # synthesized for a turn that has been interrupted.
+        while True:
+            sentence = sentences.get()
+            if sentence is None:
+                ready.put(None)
+                return
+            if state["interrupted"]:
+                continue
+            buffer: queue.Queue = queue.Queue()
+            ready.put((sentence, buffer))
+            try:
+                if self.pcm_player:
+                    for chunk in self.tts_service.stream_speech(sentence, voice_id=self.get_voice_id(agent_name), language=language):
+                        if state["interrupted"]:
+                            break
+                        buffer.put(chunk)
+                else:
+                    buffer.put(self.synthesize(agent_name, sentence, language))
+            except Exception as e:
+                logger.error(f"TTS_ERROR [RUNTIME]: Error during TTS processing: {e}")
+            finally:
+                buffer.put(None)
+
+    def _speak_sentences(self, agent_name: str, sentences: queue.Queue, language: str, state: dict) -> None:
+        ready: queue.Queue = queue.Queue(maxsize=1)
+        threading.Thread(
+            target=self._synthesize_sentences,
+            args=(agent_name, sentences, ready, language, state),
+            daemon=True
+        ).start()
+        while True:
+            item = ready.get()
+            if item is None:
+                return
+            sentence, buffer = item
+            chunks = iter(buffer.get, None)
+            if state["interrupted"]:
+                for _ in chunks:
+                    pass
+                continue
+            try:
+                if self.pcm_player:
+                    interrupted = self._play_with_barge_in(
+                        lambda interrupt: self.pcm_player.play_stream(chunks, interrupt=interrupt),
+                        sentence
+                    )
+                else:
+                    audio_data = b"".join(chunk for chunk in chunks if chunk)
+                    interrupted = self.play_response(audio_data, sentence) if audio_data else False
+                if interrupted:
+                    state["interrupted"] = True
+            except Exception as e:
+                logger.error(f"TTS_ERROR [RUNTIME]: Error during TTS processing: {e}")
+
+    def stream_interaction(self, primary_text: str, detected_language: str = "English") -> None:
+        # Speaks each sentence as soon as the LLM finishes it instead of
+        # waiting for the whole completion.
+        plan = self.prepare_turn(primary_text, detected_language)
+        recent_outputs = self.memory.get_recent_agent_outputs()
+
+        sentences: queue.Queue = queue.Queue()
+        state = {"interrupted": False}
+        speaker = None
+        if self.tts_service and self.audio_player:
+            speaker = threading.Thread(
+                target=self._speak_sentences,
+                args=(plan.agent.name, sentences, detected_language, state),
+                daemon=True
+            )
+            speaker.start()
+
+        spoken = []
+        stream = plan.agent.generate_response_stream(plan.context, plan.intent, plan.strategy, detected_language)
+        try:
+            for sentence in iter_sentences(stream):
+                sentence = plan.agent.clean_response(sentence)
+                # The response so far, as it would be committed, must pass the
+                # same repetition check as a non-streamed response.
+                repetitive = self.similarity_checker.is_too_similar(" ".join(spoken + [sentence]), recent_outputs)
+                if not spoken and not repetitive:
+                    repetitive = self.similarity_checker.is_too_similar_prefix(sentence, recent_outputs)
+                if repetitive:
+                    stream.close()
+                    if not spoken:
+                        # Nothing spoken yet: fall back to the regenerating path.
+                        spoken.append(self.ensure_response(self.finalize_turn(plan, self.generate_for_turn(plan))))
+                        sentences.put(spoken[-1])
+                    # Otherwise stop before the repetitive sentence.
+                    break
+                spoken.append(sentence)
+                sentences.put(sentence)
+            if not spoken:
+                spoken.append(FALLBACK_RESPONSES[0])
+                sentences.put(spoken[-1])
+        finally:
+            sentences.put(None)
+
+        response = " ".join(spoken)
+        self.commit_turn(plan, response)
+        if speaker:
+            speaker.join()
+        if state["interrupted"]:
+            self.memory.mark_last_agent_turn_truncated(response)
+
+        suffix = " [interrupted]" if state["interrupted"] else ""
+        print(f"[{self.get_display_name(plan.agent.name)}]: {response}{suffix}\n")
+
+    def run_interaction(
+        self,
+        primary_text: str,
+        detected_language: str = "English",
+        speculative: Optional[Tuple[TurnPlan, Optional[str]]] = None,
+        started: Optional[float] = None
+    ) -> None:
+        if self.config.stream_responses:
+            try:
+                self.stream_interaction(primary_text, detected_language)
+            except Exception as e:
+                print(f"\n⚠ Error generating response: {e}")
+                print("Trying again...\n")
+            return
 
-    def run_interaction(self, primary_text: str, detected_language: str = "English") -> None:
         try:
             print("Processing...", end="", flush=True)
-            agent_name, strategy, response = self.process_turn(primary_text, detected_language)
+            agent_name, strategy, response = self.process_turn(primary_text, detected_language, speculative, started)
             print("\r" + " " * 20 + "\r", end="", flush=True)
             
-            if agent_name == "Interviewer":
-                display_name = "INTERVIEWER"
-            else:
-                student_num = agent_name.split("_")[-1] if "_" in agent_name else "1"
-                display_name = f"STUDENT {student_num}"
-            
-            if not response or len(response.strip()) < 3:
-                response = "Can you tell me more about that?"
+            display_name = self.get_display_name(agent_name)
+            response = self.ensure_response(response)
             
+            interrupted = False
             if self.tts_service and self.audio_player:
                 try:
-                    print("Generating audio...", end="", flush=True)
-                    
-                    voice_id = None
-                    if not self.config.single_person_mode and agent_name in self.agent_voice_map:
-                        voice_id = self.agent_voice_map[agent_name]
-                    
-                    audio_data = self.tts_service.text_to_speech(response, voice_id=voice_id, language=detected_language)
-                    print("\r" + " " * 20 + "\r", end="", flush=True)
-                    if audio_data:
-                        self.audio_player.play_audio(audio_data)
+                    if self.pcm_player:
+                        interrupted = self.speak_streaming(agent_name, response, detected_language)
+                    else:
+                        print("Generating audio...", end="", flush=True)
+                        audio_data = self.synthesize(agent_name, response, detected_language)
+                        print("\r" + " " * 20 + "\r", end="", flush=True)
+                        if audio_data:
+                            interrupted = self.play_response(audio_data, response)
                 except Exception as e:
                     print("\r" + " " * 20 + "\r", end="", flush=True)
                     logger.error(f"TTS_ERROR [RUNTIME]: Error during TTS processing: {e}")
             
-            print(f"[{display_name}]: {response}\n")
+            suffix = " [interrupted]" if interrupted else ""
+            print(f"[{display_name}]: {response}{suffix}\n")
         except Exception as e:
             print(f"\n⚠ Error generating response: {e}")
             print("Trying again...\n")
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Optional, Tuple
+from app.agents.orchestrator import Orchestrator
+from app.llm.prompts import FALLBACK_RESPONSES
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPipeline:
+    # Runs listen -> respond -> speak as concurrent stages connected by
+    # bounded queues, so synthesis of one response overlaps with handing the
+    # next one over. Without barge-in the microphone waits for each turn to
+    # finish playing; with barge-in it keeps listening and the recorder skips
+    # our own playback until the patient starts talking.
+
+    def __init__(
+        self,
+        orchestrator: Orchestrator,
+        listen: Callable[[], Optional[Tuple[str, str]]],
+        config: Config
+    ):
+        self.orchestrator = orchestrator
+        self.listen = listen
+        self.config = config
+
+    async def run(self) -> None:
+        utterances: asyncio.Queue = asyncio.Queue(maxsize=self.config.pipeline_queue_size)
+        responses: asyncio.Queue = asyncio.Queue(maxsize=self.config.pipeline_queue_size)
+        await asyncio.gather(
+            self._listen_stage(utterances),
+            self._respond_stage(utterances, responses),
+            self._speak_stage(responses)
+        )
+
+    async def _listen_stage(self, utterances: asyncio.Queue) -> None:
+        while True:
+            result = await asyncio.to_thread(self.listen)
+            if result is None:
+                continue
+            # Set once the response to this utterance has been spoken (or
+            # dropped); until then the microphone would hear our own playback.
+            done = asyncio.Event()
+            await utterances.put((*result, done))
+            if not self.orchestrator.barge_in:
+                await done.wait()
+
+    async def _respond_stage(self, utterances: asyncio.Queue, responses: asyncio.Queue) -> None:
+        orchestrator = self.orchestrator
+        while True:
+            transcript, language, done = await utterances.get()
+            print(f"[PATIENT]: {transcript}")
+            try:
+                started = time.monotonic()
+                plan = await asyncio.to_thread(orchestrator.prepare_turn, transcript, language)
+                response = orchestrator.ensure_response(await self._generate_within_deadline(plan, started))
+
+                # Synthesis is billed once started and cannot be cancelled, so
+                # it only starts once the response is final. The repetition
+                # check itself is cheap; only a regeneration takes time.
+                if orchestrator.needs_regeneration(plan, response):
+                    response = orchestrator.ensure_response(
+                        await asyncio.to_thread(orchestrator.finalize_turn, plan, response)
+                    )
+                tts_task = self._start_tts(plan.agent.name, response, language)
+                orchestrator.commit_turn(plan, response)
+            except Exception as e:
+                print(f"\n⚠ Error generating response: {e}")
+                print("Trying again...\n")
+                done.set()
+                continue
+            await responses.put((plan.agent.name, response, language, tts_task, done))
+
+    async def _generate_within_deadline(self, plan, started: float) -> str:
+        orchestrator = self.orchestrator
+        deadline = orchestrator.turn_deadline(plan.language)
+        timeout = max(0.0, deadline - (time.monotonic() - started)) if deadline is not None else None
+        try:
+            response = await asyncio.wait_for(asyncio.to_thread(orchestrator.generate_for_turn, plan), timeout)
+        except asyncio.TimeoutError:
+            orchestrator.turn_stats["deadline_misses"] += 1
+            return orchestrator.fallback_question(plan)
+        if response in FALLBACK_RESPONSES:
+            return orchestrator.fallback_question(plan)
+        return response
+
+    def _start_tts(self, agent_name: str, response: str, language: str) -> Optional[asyncio.Task]:
+        orchestrator = self.orchestrator
+        if not (orchestrator.tts_service and orchestrator.audio_player) or orchestrator.pcm_player:
+            return None
+        return asyncio.create_task(asyncio.to_thread(orchestrator.synthesize, agent_name, response, language))
+
+    async def _speak_stage(self, responses: asyncio.Queue) -> None:
+        orchestrator = self.orchestrator
+        while True:
+            agent_name, response, language, tts_task, done = await responses.get()
+            interrupted = False
+            try:
+                if orchestrator.pcm_player and orchestrator.tts_service:
+                    # Streaming playback synthesizes as it plays, nothing to await.
+                    interrupted = await asyncio.to_thread(orchestrator.speak_streaming, agent_name, response, language)
+                elif tts_task:
+                    audio_data = await tts_task
+                    if audio_data:
+                        interrupted = await asyncio.to_thread(orchestrator.play_response, audio_data, response)
+            except Exception as e:
+                logger.error(f"TTS_ERROR [RUNTIME]: Error during TTS processing: {e}")
+            finally:
+                done.set()
+            suffix = " [interrupted]" if interrupted else ""
+            print(f"[{orchestrator.get_display_name(agent_name)}]: {response}{suffix}\n")
@@ -0,0 +1,198 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Curated questions per strategy (the values of Agent.select_strategy and
+# Agent.build_prompt). Each entry is (question, extra index terms); the
+# terms let a question match topics it does not mention literally.
+QUESTION_BANK: Dict[str, List[Tuple[str, str]]] = {
+    "CLARIFY": [
+        ("What do you mean when you say that?", "mean say"),
+        ("Could you put that another way for me?", "explain confusing"),
+        ("Which part of that matters most to you?", "important matter part"),
+        ("When you say it's hard, what makes it hard?", "hard difficult struggle tough"),
+        ("Who else was involved in that situation?", "people someone family friend partner"),
+        ("Is this about work, home, or something else?", "work job home house"),
+        ("How long has this been going on?", "time long years months weeks started"),
+        ("Did I understand that you feel stuck?", "stuck trapped"),
+    ],
+    "PROBE_DETAILS": [
+        ("What happened right before that?", "happened event before"),
+        ("Where were you when that happened?", "place where location"),
+        ("How did your family react to that?", "family mother father parents sister brother"),
+        ("What is a typical day at work like for you?", "work job boss office colleagues"),
+        ("How have you been sleeping lately?", "sleep tired night insomnia exhausted"),
+        ("What changed for you when that started?", "change started different"),
+        ("How often does this come up for you?", "often frequent always"),
+        ("What does your partner think about it?", "partner wife husband girlfriend boyfriend relationship"),
+        ("How is this affecting your friendships?", "friends friendship lonely social"),
+        ("What has money been like for you recently?", "money bills debt rent pay"),
+    ],
+    "PROBE_EMOTION": [
+        ("How did that make you feel?", "feel feeling"),
+        ("What was going through your mind at that moment?", "thoughts mind thinking"),
+        ("Where do you notice that feeling in your body?", "body anxious tense panic"),
+        ("What feels heaviest for you right now?", "heavy sad depressed down"),
+        ("What makes you angry about it?", "angry mad furious annoyed frustrated"),
+        ("What are you most afraid might happen?", "afraid scared fear worried anxious"),
+        ("How do you usually cope when you feel this way?", "cope coping deal handle"),
+        ("When did you last feel at peace?", "calm peace happy relaxed"),
+        ("What is it like to carry that alone?", "alone lonely isolated"),
+    ],
+    "CHALLENGE_ASSUMPTION": [
+        ("What makes you sure it will go that way?", "sure certain always never"),
+        ("Is there another way to look at this?", "another perspective view"),
+        ("What would you tell a friend in your place?", "friend advice"),
+        ("Has there been a time when it went differently?", "different exception time"),
+        ("What evidence do you have for that belief?", "believe belief evidence"),
+        ("Is that a fact, or a fear?", "fear fact worry"),
+        ("Whose voice does that thought sound like?", "parents mother father critic voice"),
+    ],
+    "REQUEST_EXAMPLE": [
+        ("Can you give me a recent example?", "example recent"),
+        ("What is one moment that stands out?", "moment memory remember"),
+        ("Could you walk me through the last time it happened?", "last time happened"),
+        ("What did a bad day look like this week?", "bad day week"),
+        ("Can you describe a conversation where that came up?", "conversation talk argument fight"),
+        ("What is an example from work?", "work job boss office"),
+        ("What is an example from home?", "home house family"),
+    ],
+    "SUMMARIZE_CONFIRM": [
+        ("So it sounds like this has been building up for a while?", "building while long"),
+        ("Am I right that this is mostly about your relationships?", "relationship partner family friends"),
+        ("It sounds like work is the main pressure, is that right?", "work job stress pressure"),
+        ("So you feel unheard, is that fair to say?", "unheard ignored listen"),
+        ("Did I get that right?", "right understand"),
+        ("Is the hardest part not knowing what comes next?", "future uncertain next unknown"),
+    ],
+    "FOLLOW_UP_QUESTION": [
+        ("What happened after that?", "after then next"),
+        ("How are things now?", "now today currently"),
+        ("What would you like to be different?", "change different want wish"),
+        ("What have you tried so far?", "tried attempts help"),
+        ("Who do you talk to about this?", "talk support friend family"),
+        ("What would help most this week?", "help week support"),
+        ("What do you hope comes out of our conversation?", "hope goal want"),
+    ],
+}
+
+# The curated questions are English; other languages are not answered from
+# the bank. Whisper reports codes, the rest of the app names.
+BANK_LANGUAGES = frozenset({"en", "english"})
+
+TOKEN_PATTERN = re.compile(r"[a-z']+")
+STOPWORDS = frozenset({
+    "the", "and", "but", "for", "with", "that", "this", "you", "your", "was",
+    "are", "have", "has", "had", "not", "what", "when", "where", "who", "how",
+    "does", "did", "can", "could", "would", "about", "there", "been", "its",
+    "it's", "i'm", "just", "really", "like", "they", "them", "their",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        token = token.strip("'")
+        if len(token) < 3 or token in STOPWORDS:
+            continue
+        # Crude plural folding so "friends" matches "friend".
+        if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def normalize(text: str) -> str:
+    return " ".join(TOKEN_PATTERN.findall(text.lower()))
+
+
+class QuestionBank:
+    # BM25 over an inverted index of the curated questions. Lookups only
+    # touch the postings of the query terms, so picking a question costs
+    # microseconds even as the bank grows.
+
+    def __init__(self, questions: Dict[str, List[Tuple[str, str]]] = QUESTION_BANK, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.questions: List[str] = []
+        self.normalized: List[str] = []
+        self.strategies: List[str] = []
+        self.by_strategy: Dict[str, List[int]] = defaultdict(list)
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths: List[int] = []
+        self.asked: Dict[str, int] = {}
+        self.asked_counter = 0
+
+        for strategy, entries in questions.items():
+            for question, terms in entries:
+                doc_id = len(self.questions)
+                tokens = tokenize(f"{question} {terms}")
+                self.questions.append(question)
+                self.normalized.append(normalize(question))
+                self.strategies.append(strategy)
+                self.by_strategy[strategy].append(doc_id)
+                self.lengths.append(len(tokens))
+                for term, count in Counter(tokens).items():
+                    self.postings[term].append((doc_id, count))
+
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        total = len(self.questions)
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    @staticmethod
+    def supports(language: str) -> bool:
+        return (language or "").lower() in BANK_LANGUAGES
+
+    def score(self, query_terms: Iterable[str]) -> Dict[int, float]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term, query_count in Counter(query_terms).items():
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, count in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / self.average_length)
+                scores[doc_id] += query_count * idf * count * (self.k1 + 1) / (count + norm)
+        return scores
+
+    def select(
+        self,
+        strategy: str,
+        patient_text: str,
+        keywords: Iterable[str] = (),
+        exclude: Iterable[str] = (),
+        is_repeat: Optional[Callable[[str], bool]] = None
+    ) -> Optional[str]:
+        # Best BM25 match within the strategy that has not been asked yet;
+        # other strategies are considered once this one is exhausted, and if
+        # everything has been asked the longest-unused question is reused.
+        # `is_repeat` rejects questions too close to what was already said,
+        # beyond the exact matches in `exclude`.
+        excluded = {normalize(text) for text in exclude}
+        scores = self.score(tokenize(patient_text) + tokenize(" ".join(keywords)))
+
+        def fresh(doc_id: int) -> bool:
+            question = self.normalized[doc_id]
+            if question in self.asked or question in excluded:
+                return False
+            return is_repeat is None or not is_repeat(self.questions[doc_id])
+
+        pools = [self.by_strategy.get(strategy, []), range(len(self.questions))]
+        for pool in pools:
+            candidates = [doc_id for doc_id in pool if fresh(doc_id)]
+            if candidates:
+                # max() keeps the first of equal scores, i.e. curated order.
+                return self.mark_asked(self.questions[max(candidates, key=lambda d: scores.get(d, 0.0))])
+
+        if not self.questions:
+            return None
+        oldest = min(range(len(self.questions)), key=lambda d: self.asked.get(self.normalized[d], 0))
+        return self.mark_asked(self.questions[oldest])
+
+    def mark_asked(self, question: str) -> str:
+        self.asked_counter += 1
+        self.asked[normalize(question)] = self.asked_counter
+        return question
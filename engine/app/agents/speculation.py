@@ -0,0 +1,164 @@
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from difflib import SequenceMatcher
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+from app.agents.orchestrator import Orchestrator, TurnPlan
+from app.llm.prompts import FALLBACK_RESPONSES
+from app.config import Config
+
+
+def transcript_similarity(a: str, b: str) -> float:
+    words_a = re.findall(r"\w+", a.lower())
+    words_b = re.findall(r"\w+", b.lower())
+    return SequenceMatcher(None, words_a, words_b).ratio()
+
+
+class Speculation:
+    def __init__(self, audio: np.ndarray, initial_prompt: Optional[str]):
+        self.audio = audio
+        self.initial_prompt = initial_prompt
+        self.transcript: Optional[str] = None
+        self.asr_error: Optional[Exception] = None
+        self.transcribed = threading.Event()
+        self.cancelled = threading.Event()
+        self.plan: Optional[TurnPlan] = None
+        self.generation_started = 0.0
+        self.generation_finished = 0.0
+        self.future: Optional[Future] = None
+
+
+class SpeculativeResponder:
+    # Starts transcribing and generating a response during the trailing
+    # silence, while the endpointer is still deciding whether the patient has
+    # finished. If the final transcript matches the provisional one, the
+    # response is already (or nearly) done; otherwise it is thrown away.
+    # Nothing is written to the conversation store until resolve() hits.
+    # A single worker keeps at most one speculation in flight: a newer pause
+    # queues behind the one being abandoned, which stops at its next step.
+
+    def __init__(self, orchestrator: Orchestrator, asr, config: Config, is_trivial: Callable[[str], bool]):
+        self.orchestrator = orchestrator
+        self.asr = asr
+        self.config = config
+        self.is_trivial = is_trivial
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.current: Optional[Speculation] = None
+        self.initial_prompt: Optional[str] = None
+        self.stats: Counter = Counter()
+        self.latency_saved = 0.0
+
+    def start(self, initial_prompt: Optional[str] = None) -> None:
+        self.discard()
+        self.initial_prompt = initial_prompt
+
+    def discard(self) -> None:
+        if self.current:
+            self.current.cancelled.set()
+            if self.current.future.running():
+                self.stats["throttled"] += 1
+            self.current.future.cancel()
+            self.current = None
+
+    def on_pause(self, audio: np.ndarray) -> None:
+        # A new pause supersedes the previous one: the patient kept talking.
+        self.discard()
+        speculation = Speculation(audio, self.initial_prompt)
+        speculation.future = self.executor.submit(self._speculate, speculation)
+        self.current = speculation
+        self.stats["started"] += 1
+
+    def _speculate(self, speculation: Speculation) -> Optional[Tuple[TurnPlan, str]]:
+        try:
+            text, language = self.asr.transcribe(speculation.audio, initial_prompt=speculation.initial_prompt, observe=False)
+        except Exception as e:
+            speculation.asr_error = e
+            raise
+        finally:
+            speculation.transcribed.set()
+        speculation.transcript = text
+        if speculation.cancelled.is_set() or self.is_trivial(text):
+            return None
+
+        orchestrator = self.orchestrator
+        speculation.generation_started = time.monotonic()
+        plan = orchestrator.preview_turn(text, language)
+        if speculation.cancelled.is_set():
+            return None
+        speculation.plan = plan
+        response = orchestrator.generate_for_turn(plan)
+        if speculation.cancelled.is_set() or plan.abandoned:
+            return None
+        response = orchestrator.finalize_turn(plan, response)
+        speculation.generation_finished = time.monotonic()
+        return plan, response
+
+    def _miss(self, reason: str) -> None:
+        self.stats["misses"] += 1
+        self.stats[f"miss_{reason}"] += 1
+
+    def resolve(self, transcript: str, language: str, started: Optional[float] = None) -> Optional[Tuple[TurnPlan, Optional[str]]]:
+        # Returns the speculative (plan, response) to commit, or None if the
+        # turn has to be generated normally. Waiting counts against the turn's
+        # deadline from `started`; a speculation still generating when it
+        # runs out comes back as (plan, None) so the turn is answered from
+        # the question bank instead of starting over.
+        speculation = self.current
+        self.current = None
+        if speculation is None:
+            self.stats["not_started"] += 1
+            return None
+
+        resolved_at = time.monotonic()
+        deadline = self.orchestrator.turn_deadline(language)
+        deadline_at = (started or resolved_at) + deadline if deadline is not None else None
+
+        def remaining() -> Optional[float]:
+            return max(0.0, deadline_at - time.monotonic()) if deadline_at is not None else None
+
+        if not speculation.transcribed.wait(remaining()):
+            speculation.cancelled.set()
+            self._miss("slow_asr")
+            return None
+        if speculation.asr_error is not None:
+            self._miss("asr_error")
+            return None
+        if speculation.transcript is None or transcript_similarity(speculation.transcript, transcript) < self.config.speculative_match_threshold:
+            speculation.cancelled.set()
+            speculation.future.cancel()
+            self._miss("mismatch")
+            return None
+
+        try:
+            result = speculation.future.result(timeout=remaining())
+        except FutureTimeoutError:
+            self._miss("timeout")
+            plan = speculation.plan
+            if plan is None:
+                speculation.cancelled.set()
+                return None
+            plan.abandoned = True
+            return plan, None
+        except Exception as e:
+            print(f"\n⚠ Speculative generation failed: {e}")
+            self._miss("error")
+            return None
+        if result is None or result[1] in FALLBACK_RESPONSES:
+            self._miss("no_response")
+            return None
+
+        self.stats["hits"] += 1
+        self.latency_saved += max(0.0, min(speculation.generation_finished, resolved_at) - speculation.generation_started)
+        return result
+
+    def get_stats(self) -> Dict[str, float]:
+        stats = dict(self.stats)
+        resolved = self.stats["hits"] + self.stats["misses"]
+        stats["hit_rate"] = self.stats["hits"] / resolved if resolved else 0.0
+        stats["latency_saved_s"] = self.latency_saved
+        if self.stats["hits"]:
+            stats["mean_latency_saved_ms"] = 1000 * self.latency_saved / self.stats["hits"]
+        return stats
@@ -0,0 +1,143 @@
+import os
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+DEFAULT_AUTHKEY = "asr-service"
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def service_authkey() -> bytes:
+    return os.getenv("ASR_SERVICE_KEY", DEFAULT_AUTHKEY).encode()
+
+
+class ASRServer:
+    # Shares one BatchedASRService between the stations on this machine.
+    # Every connection gets its own thread that blocks on its request, so
+    # requests from different stations wait in the same queue and are
+    # decoded in the same micro-batches.
+    #
+    # Messages are pickled by multiprocessing.connection; only peers with the
+    # authkey can connect, and the default address is loopback only.
+
+    def __init__(self, service, address: str = "127.0.0.1:50007", authkey: Optional[bytes] = None):
+        self.service = service
+        self.listener = Listener(parse_address(address), authkey=authkey or service_authkey())
+        self.address = "{}:{}".format(*self.listener.address)
+        self.closed = threading.Event()
+
+    def serve_forever(self) -> None:
+        while not self.closed.is_set():
+            try:
+                connection = self.listener.accept()
+            except (AuthenticationError, EOFError):
+                # A peer without the key, or one that hung up mid-handshake.
+                continue
+            except OSError:
+                if self.closed.is_set():
+                    return
+                raise
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def _handle(self, connection: Connection) -> None:
+        # First message names the session; every later one is a request.
+        try:
+            _, session = connection.recv()
+            while True:
+                message = connection.recv()
+                if message[0] == "stats":
+                    connection.send(("ok", self.service.get_stats()))
+                    continue
+                _, audio, language, initial_prompt = message
+                try:
+                    result = self.service.submit(audio, language, initial_prompt, session=session).result()
+                except Exception as e:
+                    connection.send(("error", str(e)))
+                else:
+                    connection.send(("ok", result))
+        except (EOFError, OSError):
+            pass
+        finally:
+            connection.close()
+
+    def close(self) -> None:
+        self.closed.set()
+        self.listener.close()
+
+
+class RemoteASRService:
+    # Client side of ASRServer, with the transcribe() of BatchedASRService.
+    # Each calling thread gets its own connection, so a station's concurrent
+    # requests (partials, speculative and final transcripts) are not
+    # serialized behind each other.
+
+    model = None
+
+    def __init__(self, address: str, session: Optional[str] = None, authkey: Optional[bytes] = None):
+        self.address = parse_address(address)
+        self.authkey = authkey or service_authkey()
+        self.session = session or f"pid-{os.getpid()}"
+        self.local = threading.local()
+        self.connections = []
+        self.connections_lock = threading.Lock()
+
+    def _connection(self) -> Connection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = Client(self.address, authkey=self.authkey)
+            connection.send(("hello", self.session))
+            self.local.connection = connection
+            with self.connections_lock:
+                self.connections.append(connection)
+        return connection
+
+    def _call(self, message: tuple):
+        connection = self._connection()
+        try:
+            connection.send(message)
+            status, value = connection.recv()
+        except (EOFError, OSError):
+            # Reconnect on the next call, e.g. after a server restart.
+            self.local.connection = None
+            raise
+        if status == "error":
+            raise RuntimeError(f"ASR service error: {value}")
+        return value
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None, initial_prompt: Optional[str] = None) -> tuple:
+        return self._call(("transcribe", audio, language, initial_prompt))
+
+    def get_stats(self) -> Dict[str, float]:
+        return self._call(("stats",))
+
+    def close(self) -> None:
+        with self.connections_lock:
+            connections, self.connections = self.connections, []
+        for connection in connections:
+            connection.close()
+
+
+def main():
+    from app.asr.batch_service import BatchedASRService
+    from app.config import Config
+
+    config = Config()
+    print(f"Loading Whisper ASR ({config.whisper_model})...")
+    server = ASRServer(BatchedASRService(config), config.asr_service_address or "127.0.0.1:50007")
+    print(f"✓ ASR service listening on {server.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+import numpy as np
+from faster_whisper import WhisperModel
+from faster_whisper.audio import pad_or_trim
+from faster_whisper.tokenizer import Tokenizer
+from faster_whisper.vad import VadOptions, collect_chunks, get_speech_timestamps
+from app.asr.batching import ASRRequest, MicroBatcher
+from app.config import Config
+
+
+class BatchedASRService:
+    # One Whisper model shared by every caller. Pending utterances are
+    # gathered into micro-batches (bounded by size and wait time) and decoded
+    # in a single encoder/decoder call.
+    #
+    # Within one process that is the station's own concurrent requests
+    # (streaming partials, speculative and final transcripts). To batch
+    # across stations, run it once with `python -m app.asr.asr_server` and
+    # point every station at it with asr_service_address.
+
+    def __init__(self, config: Config):
+        self.config = config
+        compute_type = "float16" if config.device == "cuda" else "int8"
+        self.model = WhisperModel(
+            config.whisper_model,
+            device=config.device,
+            compute_type=compute_type,
+            cpu_threads=config.asr_cpu_threads
+        )
+        self.batcher = MicroBatcher(
+            self._decode_batch,
+            max_batch_size=config.asr_batch_max_size,
+            max_wait=config.asr_batch_max_wait_ms / 1000.0
+        )
+
+    def submit(
+        self,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+        initial_prompt: Optional[str] = None,
+        session: str = ""
+    ) -> Future:
+        return self.batcher.submit(ASRRequest(audio=audio, language=language, initial_prompt=initial_prompt, session=session))
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None, initial_prompt: Optional[str] = None) -> tuple:
+        return self.submit(audio, language, initial_prompt).result()
+
+    def _speech_only(self, audio: np.ndarray) -> np.ndarray:
+        # Same VAD preprocessing WhisperModel.transcribe applies with vad_filter.
+        options = VadOptions(min_silence_duration_ms=self.config.asr_vad_min_silence_ms)
+        timestamps = get_speech_timestamps(audio, options)
+        if not timestamps:
+            return audio[:0]
+        chunks = collect_chunks(audio, timestamps)
+        if isinstance(chunks, tuple):
+            # Newer faster-whisper returns (chunks, metadata).
+            chunks = chunks[0]
+        if isinstance(chunks, list):
+            return np.concatenate(chunks) if chunks else audio[:0]
+        return chunks
+
+    def _decode_batch(self, batch: List[ASRRequest]) -> List[tuple]:
+        model = self.model
+        window = model.feature_extractor.n_samples
+
+        # Audio longer than Whisper's 30s window is split into several
+        # windows, decoded in the same batch and joined afterwards.
+        segments = []
+        for index, request in enumerate(batch):
+            audio = self._speech_only(request.audio) if self.config.asr_vad_filter else request.audio
+            for start in range(0, len(audio), window):
+                segments.append((index, audio[start:start + window]))
+
+        outputs = [("", request.language or "en", 0.0) for request in batch]
+        if not segments:
+            return outputs
+
+        features = np.stack([
+            pad_or_trim(model.feature_extractor(audio)[..., :-1])
+            for _, audio in segments
+        ])
+        encoder_output = model.encode(features)
+
+        detections = None
+        if model.model.is_multilingual and any(batch[index].language is None for index, _ in segments):
+            detections = model.model.detect_language(encoder_output)
+        languages = {}
+        for position, (index, _) in enumerate(segments):
+            if index in languages:
+                continue
+            request = batch[index]
+            if not model.model.is_multilingual:
+                languages[index] = ("en", 1.0)
+            elif request.language:
+                languages[index] = (request.language, 1.0)
+            else:
+                token, probability = detections[position][0]
+                languages[index] = (token[2:-2], probability)
+
+        tokenizers = {}
+        prompts = []
+        for index, _ in segments:
+            if index not in tokenizers:
+                tokenizers[index] = Tokenizer(
+                    model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=languages[index][0]
+                )
+            tokenizer = tokenizers[index]
+            initial_prompt = batch[index].initial_prompt
+            previous = tokenizer.encode(" " + initial_prompt.strip()) if initial_prompt else []
+            prompts.append(model.get_prompt(tokenizer, previous, without_timestamps=True))
+
+        results = model.model.generate(
+            encoder_output,
+            prompts,
+            beam_size=self.config.asr_beam_size,
+            max_length=model.max_length,
+            suppress_blank=True,
+            suppress_tokens=[-1]
+        )
+
+        texts: Dict[int, List[str]] = {}
+        for (index, _), result in zip(segments, results):
+            texts.setdefault(index, []).append(tokenizers[index].decode(result.sequences_ids[0]).strip())
+        for index, parts in texts.items():
+            language, probability = languages[index]
+            outputs[index] = (" ".join(part for part in parts if part), language, probability)
+        return outputs
+
+    def get_stats(self) -> Dict[str, float]:
+        return self.batcher.get_stats()
+
+    def shutdown(self) -> None:
+        self.batcher.shutdown()
@@ -0,0 +1,109 @@
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+
+@dataclass
+class ASRRequest:
+    audio: np.ndarray
+    language: Optional[str]
+    initial_prompt: Optional[str]
+    # Which station the request came from, for the batch mix statistics.
+    session: str = ""
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class MicroBatcher:
+    # Gathers pending requests into batches, bounded by size and by how long
+    # the first request may wait, and hands each batch to `decode` on a
+    # single worker thread. `decode` returns one result per request.
+
+    def __init__(self, decode: Callable[[List[ASRRequest]], List[tuple]], max_batch_size: int, max_wait: float):
+        self.decode = decode
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests: "queue.Queue[Optional[ASRRequest]]" = queue.Queue()
+
+        self.stats_lock = threading.Lock()
+        self.total_requests = 0
+        self.total_batches = 0
+        self.mixed_batches = 0
+        self.batch_sizes: Counter = Counter()
+        self.sessions: Counter = Counter()
+        self.queue_waits = deque(maxlen=1000)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, request: ASRRequest) -> Future:
+        self.requests.put(request)
+        return request.future
+
+    def _collect_batch(self, first: ASRRequest) -> List[ASRRequest]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self.requests.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self.requests.get()
+            if first is None:
+                return
+            batch = self._collect_batch(first)
+            started = time.monotonic()
+            sessions = {request.session for request in batch}
+            with self.stats_lock:
+                self.total_requests += len(batch)
+                self.total_batches += 1
+                self.mixed_batches += len(sessions) > 1
+                self.batch_sizes[len(batch)] += 1
+                self.sessions.update(request.session for request in batch)
+                self.queue_waits.extend(started - r.enqueued_at for r in batch)
+            try:
+                results = self.decode(batch)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+
+    def get_stats(self) -> Dict[str, float]:
+        with self.stats_lock:
+            waits = sorted(self.queue_waits)
+            stats = {
+                "requests": self.total_requests,
+                "batches": self.total_batches,
+                "mean_batch_size": self.total_requests / self.total_batches if self.total_batches else 0.0,
+                "batch_size_histogram": dict(self.batch_sizes),
+                "mixed_batches": self.mixed_batches,
+                "sessions": len(self.sessions),
+                "pending": self.requests.qsize(),
+            }
+        if waits:
+            stats["mean_queue_wait_ms"] = 1000 * sum(waits) / len(waits)
+            stats["p95_queue_wait_ms"] = 1000 * waits[int(0.95 * (len(waits) - 1))]
+            stats["max_queue_wait_ms"] = 1000 * waits[-1]
+        return stats
+
+    def shutdown(self) -> None:
+        self.requests.put(None)
+        self._thread.join()
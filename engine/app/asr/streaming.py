@@ -0,0 +1,96 @@
+import threading
+from typing import List, Optional
+import numpy as np
+from app.asr.whisper_asr import WhisperASR
+from app.config import Config
+
+
+class StreamingTranscriber:
+    def __init__(self, asr: WhisperASR, config: Config):
+        self.asr = asr
+        self.config = config
+        self.sample_rate = config.sample_rate
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reset()
+
+    def reset(self) -> None:
+        self._audio: Optional[np.ndarray] = None
+        self.committed: List[str] = []
+        self.committed_samples = 0
+        self._pending: List[str] = []
+        self.language: Optional[str] = None
+        self.context_prompt = ""
+
+    def start(self, initial_prompt: Optional[str] = None) -> None:
+        self.reset()
+        self.context_prompt = initial_prompt or ""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def feed(self, audio: np.ndarray) -> None:
+        # `audio` is everything captured so far for this utterance; it only grows.
+        self._audio = audio
+
+    def _run(self) -> None:
+        min_samples = int(self.config.streaming_min_window * self.sample_rate)
+        while not self._stop.wait(self.config.streaming_interval):
+            audio = self._audio
+            if audio is None or len(audio) - self.committed_samples < min_samples:
+                continue
+            try:
+                self._decode_window(audio, final=False)
+            except Exception as e:
+                print(f"\n⚠ Streaming ASR error: {e}")
+
+    def _decode_window(self, audio: np.ndarray, final: bool) -> List[str]:
+        with self._lock:
+            window = audio[self.committed_samples:]
+            if len(window) == 0:
+                return []
+            prompt = " ".join([self.context_prompt] + self.committed).strip()
+            prompt = prompt[-self.config.asr_prompt_chars:] or None
+            segments, info = self.asr.transcribe_segments(window, initial_prompt=prompt)
+            self.language = info.language
+            texts = [segment.text.strip() for segment in segments]
+            if final:
+                self.asr.observe_language(info.language, info.language_probability)
+                return texts
+
+            # A segment is committed once it ends outside the unstable tail and
+            # two consecutive decodes agree on it.
+            stable_end = len(window) / self.sample_rate - self.config.streaming_stable_margin
+            agreed = 0
+            for segment, text, previous in zip(segments, texts, self._pending):
+                if segment.end > stable_end or text != previous:
+                    break
+                agreed += 1
+
+            if agreed:
+                self.committed.extend(t for t in texts[:agreed] if t)
+                self.committed_samples += int(segments[agreed - 1].end * self.sample_rate)
+            self._pending = texts[agreed:]
+            return texts
+
+    def _join(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def finish(self, end_sample: Optional[int] = None) -> tuple:
+        self._join()
+        audio = self._audio
+        if audio is not None and end_sample:
+            audio = audio[:end_sample]
+        tail = []
+        if audio is not None:
+            tail = self._decode_window(audio, final=True)
+        text = " ".join(self.committed + [t for t in tail if t]).strip()
+        return text, self.language
+
+    def cancel(self) -> None:
+        self._join()
+        self.reset()
@@ -1,23 +1,84 @@
-from faster_whisper import WhisperModel
+from typing import Optional, Union
+import numpy as np
+from faster_whisper import WhisperModel, decode_audio
 from app.config import Config
 
 
 class WhisperASR:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, service=None):
         self.config = config
-        compute_type = "float16" if config.device == "cuda" else "int8"
-        self.model = WhisperModel(
-            config.whisper_model,
-            device=config.device,
-            compute_type=compute_type
-        )
+        self.service = service
+        if service is not None:
+            # None for a service in another process.
+            self.model = service.model
+        else:
+            compute_type = "float16" if config.device == "cuda" else "int8"
+            self.model = WhisperModel(
+                config.whisper_model,
+                device=config.device,
+                compute_type=compute_type
+            )
+        self.locked_language: Optional[str] = None
+        self._candidate_language: Optional[str] = None
+        self._language_streak = 0
+
+    def to_float32(self, audio: np.ndarray) -> np.ndarray:
+        if audio.dtype == np.int16:
+            return audio.astype(np.float32) / 32768.0
+        return audio.astype(np.float32, copy=False)
 
-    def transcribe(self, wav_path: str) -> tuple:
+    def transcribe_segments(self, audio: Union[np.ndarray, str], **options) -> tuple:
+        # Accepts 16 kHz mono samples (int16 or float32) or a path to an audio file.
+        if isinstance(audio, np.ndarray):
+            audio = self.to_float32(audio)
+        if self.locked_language:
+            options.setdefault("language", self.locked_language)
+        if self.config.asr_vad_filter:
+            options.setdefault("vad_filter", True)
+            options.setdefault("vad_parameters", {"min_silence_duration_ms": self.config.asr_vad_min_silence_ms})
         segments, info = self.model.transcribe(
-            wav_path, 
-            beam_size=5,
-            task="transcribe"
+            audio,
+            beam_size=self.config.asr_beam_size,
+            task="transcribe",
+            **options
         )
+        return list(segments), info
+
+    def observe_language(self, language: str, probability: float) -> None:
+        # Once the same language has been detected confidently for enough
+        # consecutive turns, pin it and skip detection for the rest of the session.
+        if self.locked_language:
+            return
+        if probability < self.config.asr_language_lock_probability:
+            self._language_streak = 0
+            return
+        if language == self._candidate_language:
+            self._language_streak += 1
+        else:
+            self._candidate_language = language
+            self._language_streak = 1
+        if self._language_streak >= self.config.asr_language_lock_turns:
+            self.locked_language = language
+            if self.config.debug:
+                print(f"ASR language locked to '{self.locked_language}'")
+
+    def transcribe(self, audio: Union[np.ndarray, str], initial_prompt: Optional[str] = None, observe: bool = True) -> tuple:
+        # observe=False keeps provisional transcriptions out of the language lock.
+        if self.service is not None and self.model is None and isinstance(audio, str):
+            audio = decode_audio(audio)
+        if self.service is not None and isinstance(audio, np.ndarray):
+            text, language, probability = self.service.transcribe(
+                self.to_float32(audio),
+                language=self.locked_language,
+                initial_prompt=initial_prompt or None
+            )
+            if observe:
+                self.observe_language(language, probability)
+            return text, language
+
+        segments, info = self.transcribe_segments(audio, initial_prompt=initial_prompt or None)
+        if observe:
+            self.observe_language(info.language, info.language_probability)
         text_parts = []
         for segment in segments:
             text_parts.append(segment.text.strip())
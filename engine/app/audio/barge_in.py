@@ -0,0 +1,61 @@
+import math
+import threading
+from typing import Optional
+from app.audio.recorder import AudioRecorder
+from app.config import Config
+
+# A single loud chunk (cough, desk knock) must never interrupt playback.
+MIN_VOICED_CHUNKS = 3
+
+
+class BargeInMonitor:
+    def __init__(self, recorder: AudioRecorder, config: Config):
+        if recorder.capture is None:
+            raise ValueError("Barge-in requires persistent_capture")
+        self.recorder = recorder
+        self.capture = recorder.capture
+        self.config = config
+        chunk_seconds = config.chunk_size / config.sample_rate
+        self.min_chunks = max(MIN_VOICED_CHUNKS, math.ceil(config.barge_in_min_speech / chunk_seconds))
+        self.triggered = threading.Event()
+        self.onset_chunk: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def threshold(self) -> float:
+        # Raised above the normal onset threshold so our own TTS leaking from
+        # the speakers into the microphone does not interrupt itself.
+        endpointer = self.recorder.endpointer
+        base = endpointer.onset_threshold if endpointer else self.config.silence_threshold
+        return base * self.config.barge_in_threshold_ratio
+
+    def start(self) -> None:
+        self.stop()
+        self.triggered.clear()
+        self.onset_chunk = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(self.capture.chunks_written,), daemon=True)
+        self._thread.start()
+
+    def _run(self, cursor: int) -> None:
+        threshold = self.threshold()
+        voiced = 0
+        while not self._stop.is_set():
+            if not self.capture.wait_for_chunk(cursor, timeout=0.05):
+                continue
+            if self.capture.chunk_energy(cursor) > threshold:
+                voiced += 1
+                if voiced >= self.min_chunks:
+                    self.onset_chunk = cursor - voiced + 1
+                    self.recorder.resume_from(self.onset_chunk)
+                    self.triggered.set()
+                    return
+            else:
+                voiced = 0
+            cursor += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
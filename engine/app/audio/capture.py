@@ -0,0 +1,110 @@
+import threading
+import logging
+import numpy as np
+import pyaudio
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_rms(samples: np.ndarray, scratch: np.ndarray) -> float:
+    # Reuses a preallocated float32 buffer instead of allocating per chunk.
+    n = len(samples)
+    if n == 0:
+        return 0.0
+    work = scratch[:n]
+    np.copyto(work, samples, casting="unsafe")
+    return float(np.sqrt(np.dot(work, work) / n))
+
+
+class AudioCapture:
+    def __init__(self, config: Config, audio: pyaudio.PyAudio):
+        self.config = config
+        self.audio = audio
+        self.samples_per_chunk = config.chunk_size * config.channels
+        chunks_per_second = config.sample_rate / config.chunk_size
+        self.capacity_chunks = int(config.capture_buffer_seconds * chunks_per_second)
+        self.capacity = self.capacity_chunks * self.samples_per_chunk
+
+        # Every chunk is written twice, `capacity` apart, so any window of up
+        # to `capacity` samples is a contiguous slice and can be handed out as
+        # a view without copying across the wrap-around point.
+        self.ring = np.zeros(2 * self.capacity, dtype=np.int16)
+        self.rms = np.zeros(2 * self.capacity_chunks, dtype=np.float32)
+        self._scratch = np.empty(self.samples_per_chunk, dtype=np.float32)
+
+        self.chunks_written = 0
+        self.overflows = 0
+        self._cond = threading.Condition()
+        self.stream = None
+
+    def start(self) -> None:
+        if self.stream is not None:
+            return
+        self.stream = self.audio.open(
+            format=pyaudio.paInt16,
+            channels=self.config.channels,
+            rate=self.config.sample_rate,
+            input=True,
+            frames_per_buffer=self.config.chunk_size,
+            stream_callback=self._callback
+        )
+        self.stream.start_stream()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+            if self.config.debug:
+                logger.warning(f"Audio input overflow ({self.overflows} total)")
+
+        samples = np.frombuffer(in_data, dtype=np.int16)[:self.samples_per_chunk]
+        n = len(samples)
+        slot = self.chunks_written % self.capacity_chunks
+        pos = slot * self.samples_per_chunk
+        self.ring[pos:pos + n] = samples
+        self.ring[pos + self.capacity:pos + self.capacity + n] = samples
+        if n < self.samples_per_chunk:
+            self.ring[pos + n:pos + self.samples_per_chunk] = 0
+            self.ring[pos + self.capacity + n:pos + self.capacity + self.samples_per_chunk] = 0
+
+        rms = chunk_rms(samples, self._scratch)
+        self.rms[slot] = rms
+        self.rms[slot + self.capacity_chunks] = rms
+
+        with self._cond:
+            self.chunks_written += 1
+            self._cond.notify_all()
+        return (None, pyaudio.paContinue)
+
+    def wait_for_chunk(self, index: int, timeout: float = 1.0) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self.chunks_written > index, timeout)
+
+    def is_active(self) -> bool:
+        return self.stream is not None and self.stream.is_active()
+
+    def chunk_energy(self, index: int) -> float:
+        return float(self.rms[index % self.capacity_chunks])
+
+    def _check_window(self, start_chunk: int, end_chunk: int) -> None:
+        if end_chunk - start_chunk > self.capacity_chunks:
+            raise ValueError("Requested window is larger than the capture buffer")
+        if self.chunks_written - start_chunk > self.capacity_chunks:
+            logger.warning("Capture window has already been overwritten; consumer fell behind")
+
+    def view(self, start_chunk: int, end_chunk: int) -> np.ndarray:
+        # Zero-copy; valid until the ring wraps past `start_chunk`.
+        self._check_window(start_chunk, end_chunk)
+        pos = (start_chunk % self.capacity_chunks) * self.samples_per_chunk
+        return self.ring[pos:pos + (end_chunk - start_chunk) * self.samples_per_chunk]
+
+    def rms_view(self, start_chunk: int, end_chunk: int) -> np.ndarray:
+        self._check_window(start_chunk, end_chunk)
+        slot = start_chunk % self.capacity_chunks
+        return self.rms[slot:slot + (end_chunk - start_chunk)]
+
+    def stop(self) -> None:
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
@@ -0,0 +1,141 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+from app.config import Config
+
+
+@dataclass
+class EndpointDecision:
+    reason: str
+    speech_seconds: float
+    trailing_silence: float
+    hangover: float
+    noise_floor: float
+    onset_threshold: float
+    offset_threshold: float
+    sentence_final: bool
+
+
+class Endpointer:
+    def __init__(self, config: Config):
+        self.config = config
+        self.chunk_seconds = config.chunk_size / config.sample_rate
+        self.noise_floor: Optional[float] = None
+        self.decisions: Deque[EndpointDecision] = deque(maxlen=50)
+        self.reset()
+
+    def reset(self) -> None:
+        self.calibration_chunks = 0
+        self.started = False
+        self.in_speech = False
+        self.speech_chunks = 0
+        self.silent_chunks = 0
+        self.peak_rms = 0.0
+        self.recent_voiced: Deque[float] = deque(maxlen=8)
+        self.last_decision: Optional[EndpointDecision] = None
+
+    @property
+    def onset_threshold(self) -> float:
+        if self.noise_floor is None:
+            return self.config.silence_threshold
+        return max(self.noise_floor * self.config.endpoint_onset_ratio, self.config.endpoint_min_threshold)
+
+    @property
+    def offset_threshold(self) -> float:
+        # Lower than the onset threshold so a speaker trailing off is not cut
+        # mid-word (hysteresis).
+        if self.noise_floor is None:
+            return self.config.silence_threshold
+        offset = max(self.noise_floor * self.config.endpoint_offset_ratio, self.config.endpoint_min_threshold * 0.75)
+        return min(offset, self.onset_threshold)
+
+    def _update_noise_floor(self, rms: float) -> None:
+        if self.calibration_chunks < self.config.endpoint_calibration_chunks:
+            self.calibration_chunks += 1
+            if self.noise_floor is None:
+                self.noise_floor = rms
+            else:
+                self.noise_floor += (rms - self.noise_floor) / self.calibration_chunks
+        else:
+            self.noise_floor += (rms - self.noise_floor) * self.config.endpoint_floor_adaptation
+
+    def is_sentence_final(self) -> bool:
+        # Declining energy over the last voiced chunks after a reasonably long
+        # utterance is a good sign the speaker finished a sentence rather
+        # than pausing mid-thought.
+        if self.speech_chunks * self.chunk_seconds < self.config.endpoint_min_utterance:
+            return False
+        if len(self.recent_voiced) < 4 or self.peak_rms <= 0:
+            return False
+        tail = list(self.recent_voiced)[-3:]
+        return sum(tail) / len(tail) < self.peak_rms * self.config.endpoint_decline_ratio
+
+    def current_hangover(self) -> float:
+        if self.is_sentence_final():
+            return self.config.endpoint_min_hangover
+        return self.config.silence_duration
+
+    def update(self, rms: float) -> bool:
+        if self.in_speech:
+            if rms > self.offset_threshold:
+                self.speech_chunks += 1
+                self.recent_voiced.append(rms)
+                self.peak_rms = max(self.peak_rms, rms)
+                return False
+            self.in_speech = False
+            self.silent_chunks = 0
+        elif rms > self.onset_threshold:
+            self.started = True
+            self.in_speech = True
+            self.speech_chunks += 1
+            self.silent_chunks = 0
+            self.recent_voiced.append(rms)
+            self.peak_rms = max(self.peak_rms, rms)
+            return False
+        elif self.calibration_chunks < self.config.endpoint_calibration_chunks or rms < self.offset_threshold:
+            self._update_noise_floor(rms)
+
+        if not self.started:
+            return False
+
+        self.silent_chunks += 1
+        if self.silent_chunks * self.chunk_seconds >= self.current_hangover():
+            self.finish("endpoint")
+            return True
+        return False
+
+    def finish(self, reason: str) -> EndpointDecision:
+        sentence_final = self.is_sentence_final()
+        decision = EndpointDecision(
+            reason=reason if self.started else "no_speech",
+            speech_seconds=self.speech_chunks * self.chunk_seconds,
+            trailing_silence=self.silent_chunks * self.chunk_seconds,
+            hangover=self.config.endpoint_min_hangover if sentence_final else self.config.silence_duration,
+            noise_floor=self.noise_floor or 0.0,
+            onset_threshold=self.onset_threshold,
+            offset_threshold=self.offset_threshold,
+            sentence_final=sentence_final
+        )
+        self.last_decision = decision
+        self.decisions.append(decision)
+        if self.config.debug:
+            print(
+                f"[ENDPOINT] {decision.reason}: speech={decision.speech_seconds:.2f}s "
+                f"silence={decision.trailing_silence:.2f}s hangover={decision.hangover:.2f}s "
+                f"floor={decision.noise_floor:.0f} onset={decision.onset_threshold:.0f} "
+                f"offset={decision.offset_threshold:.0f} final={decision.sentence_final}"
+            )
+        return decision
+
+    def get_stats(self) -> Dict[str, float]:
+        endpoints = [d for d in self.decisions if d.reason == "endpoint"]
+        stats = {
+            "decisions": len(self.decisions),
+            "endpoints": len(endpoints),
+            "max_length": sum(1 for d in self.decisions if d.reason == "max_length"),
+            "sentence_final": sum(1 for d in endpoints if d.sentence_final),
+            "noise_floor": self.noise_floor or 0.0,
+        }
+        if endpoints:
+            stats["mean_trailing_silence"] = sum(d.trailing_silence for d in endpoints) / len(endpoints)
+        return stats
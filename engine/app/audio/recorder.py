@@ -3,7 +3,15 @@ import numpy as np
 import wave
 import tempfile
 import os
+import threading
+from typing import Callable, Iterator, Optional, Tuple, Union
 from app.config import Config
+from app.audio.trim import find_speech_span, voiced_duration
+from app.audio.endpointer import Endpointer
+from app.audio.capture import AudioCapture, chunk_rms
+
+CHUNK_WAIT_SECONDS = 1.0
+CAPTURE_STALL_SECONDS = 5.0
 
 
 class AudioRecorder:
@@ -11,15 +19,31 @@ class AudioRecorder:
         self.config = config
         self.audio = pyaudio.PyAudio()
         self.format = pyaudio.paInt16
+        chunks_per_second = self.config.sample_rate / self.config.chunk_size
+        self.max_chunks = int(self.config.max_utterance_seconds * chunks_per_second)
+        self.preroll_chunks = int(self.config.capture_preroll * chunks_per_second)
+        self.samples_per_chunk = self.config.chunk_size * self.config.channels
+        self._scratch = np.empty(self.samples_per_chunk, dtype=np.float32)
+        self.speech_end = 0
+        self.endpointer = Endpointer(config) if config.adaptive_endpointing else None
+
+        self.capture: Optional[AudioCapture] = None
+        self.start_chunk = 0
+        self.next_chunk = 0
+        self.pending_onset: Optional[int] = None
+        # Set while a response is playing, for recording that overlaps with it.
+        self.playback = threading.Event()
+        if config.persistent_capture:
+            self.capture = AudioCapture(config, self.audio)
+            self.capture.start()
+        else:
+            self.buffer = np.empty(self.max_chunks * self.samples_per_chunk, dtype=np.int16)
+            self.chunk_rms = np.zeros(self.max_chunks, dtype=np.float32)
 
     def calculate_rms(self, data: bytes) -> float:
-        audio_data = np.frombuffer(data, dtype=np.int16).astype(np.float32)
-        if len(audio_data) == 0:
-            return 0.0
-        return np.sqrt(np.mean(audio_data ** 2))
+        return chunk_rms(np.frombuffer(data, dtype=np.int16), self._scratch)
 
-
-    def record_utterance(self) -> str:
+    def _blocking_chunks(self) -> Iterator[float]:
         stream = self.audio.open(
             format=self.format,
             channels=self.config.channels,
@@ -27,39 +51,187 @@ class AudioRecorder:
             input=True,
             frames_per_buffer=self.config.chunk_size
         )
-
-        frames = []
+        try:
+            for index in range(self.max_chunks):
+                data = stream.read(self.config.chunk_size, exception_on_overflow=False)
+                samples = np.frombuffer(data, dtype=np.int16)
+                start = index * self.samples_per_chunk
+                self.buffer[start:start + len(samples)] = samples
+                self.chunk_rms[index] = chunk_rms(samples, self._scratch)
+                yield self.chunk_rms[index]
+        finally:
+            stream.stop_stream()
+            stream.close()
+
+    def _onset_cursor(self, floor: int) -> int:
+        # Where an utterance starts in the ring: at `floor` (the first chunk
+        # not yet consumed), or a short pre-roll before an onset detected
+        # during playback so it is not clipped, but never further back than
+        # half the ring.
+        backlog_start = self.capture.chunks_written - self.capture.capacity_chunks // 2
+        if self.pending_onset is not None:
+            cursor = max(self.pending_onset - self.preroll_chunks, floor, backlog_start)
+            self.pending_onset = None
+        else:
+            cursor = max(floor, backlog_start)
+        self.start_chunk = cursor
+        return cursor
+
+    def _capture_chunks(self) -> Iterator[Optional[float]]:
+        # The stream never stops, so speech said since the last utterance was
+        # consumed is still in the ring (as far back as the ring holds) unless
+        # skip_to_live() dropped it. Yields None when the utterance restarts
+        # at an onset recorded with resume_from() while it was running.
+        floor = self.next_chunk
+        cursor = self._onset_cursor(floor)
+        count = 0
+        while count < self.max_chunks:
+            if self.pending_onset is not None and not self.playback.is_set():
+                # Barge-in while we were waiting out our own playback: those
+                # chunks were skipped, so go back and read them again.
+                cursor = self._onset_cursor(floor)
+                count = 0
+                yield None
+            stalled = 0.0
+            while not self.capture.wait_for_chunk(cursor, CHUNK_WAIT_SECONDS):
+                stalled += CHUNK_WAIT_SECONDS
+                if not self.capture.is_active():
+                    raise RuntimeError("Audio capture stream is no longer running")
+                if stalled >= CAPTURE_STALL_SECONDS:
+                    raise RuntimeError(f"No audio from the capture stream for {stalled:.0f}s")
+            yield self.capture.chunk_energy(cursor)
+            cursor += 1
+            count += 1
+            self.next_chunk = cursor
+
+    def skip_to_live(self) -> None:
+        # Drops everything captured so far, e.g. our own TTS playback picked
+        # up by the microphone. An interruption recorded with resume_from()
+        # is kept.
+        if self.capture and self.pending_onset is None:
+            self.next_chunk = self.capture.chunks_written
+
+    def resume_from(self, chunk: int) -> None:
+        # Start the next utterance at speech that was detected while we were
+        # busy (e.g. the patient interrupting playback).
+        self.pending_onset = chunk
+
+    def audio_view(self, first_chunk: int, last_chunk: int) -> np.ndarray:
+        # Views only stay valid until the next utterance is recorded.
+        if self.capture:
+            return self.capture.view(self.start_chunk + first_chunk, self.start_chunk + last_chunk)
+        return self.buffer[first_chunk * self.samples_per_chunk:last_chunk * self.samples_per_chunk]
+
+    def rms_view(self, chunk_count: int) -> np.ndarray:
+        if self.capture:
+            return self.capture.rms_view(self.start_chunk, self.start_chunk + chunk_count)
+        return self.chunk_rms[:chunk_count]
+
+    def record_utterance(
+        self,
+        on_chunk: Optional[Callable[[np.ndarray], None]] = None,
+        on_pause: Optional[Callable[[np.ndarray], None]] = None
+    ) -> Union[np.ndarray, str]:
+        # on_pause receives the speech so far each time the trailing silence
+        # reaches speculative_pause, before the endpoint is decided.
         silent_chunks = 0
         chunks_per_second = self.config.sample_rate / self.config.chunk_size
         max_silent_chunks = int(self.config.silence_duration * chunks_per_second)
+        pause_chunks = max(1, int(self.config.speculative_pause * chunks_per_second))
         started = False
-        max_seconds = 30
-        max_chunks = int(max_seconds * chunks_per_second)
         chunk_count = 0
+        endpointer = self.endpointer
+        if endpointer:
+            endpointer.reset()
 
         print("Listening... Speak now!")
 
-        while chunk_count < max_chunks:
-            data = stream.read(self.config.chunk_size, exception_on_overflow=False)
-            rms = self.calculate_rms(data)
-            chunk_count += 1
-
-            frames.append(data)
-
-            if rms > self.config.silence_threshold:
-                started = True
-                silent_chunks = 0
-            elif started:
-                silent_chunks += 1
-                if silent_chunks >= max_silent_chunks:
-                    break
-
-        stream.stop_stream()
-        stream.close()
+        source = self._capture_chunks() if self.capture else self._blocking_chunks()
+        try:
+            for rms in source:
+                if rms is None:
+                    # Restarted at a barge-in onset: everything so far was
+                    # our own playback.
+                    started = False
+                    silent_chunks = 0
+                    chunk_count = 0
+                    if endpointer:
+                        endpointer.reset()
+                    continue
+                if self.capture and not started and self.playback.is_set():
+                    # Our own playback before the patient started talking:
+                    # restart the utterance window after it.
+                    self.start_chunk += chunk_count + 1
+                    chunk_count = 0
+                    continue
+                chunk_count += 1
+                if on_chunk is not None:
+                    on_chunk(self.audio_view(0, chunk_count))
+
+                if endpointer:
+                    if endpointer.update(rms):
+                        break
+                    started = endpointer.started
+                    silent_chunks = 0 if endpointer.in_speech else endpointer.silent_chunks
+                elif rms > self.config.silence_threshold:
+                    started = True
+                    silent_chunks = 0
+                elif started:
+                    silent_chunks += 1
+                    if silent_chunks >= max_silent_chunks:
+                        break
+
+                if on_pause is not None and started and silent_chunks == pause_chunks:
+                    span = self.speech_span(chunk_count)
+                    if span is not None:
+                        on_pause(self.audio_view(*span))
+            else:
+                if endpointer:
+                    endpointer.finish("max_length")
+        finally:
+            source.close()
+
+        self.speech_end = 0
+        if not chunk_count or not started:
+            return ""
 
-        if not frames or not started:
+        audio = self.trim(chunk_count)
+        if audio is None:
             return ""
 
+        if self.config.asr_debug_wav:
+            return self.save_wav(audio)
+
+        return audio
+
+    def trim(self, chunk_count: int) -> Optional[np.ndarray]:
+        # Drops leading/trailing non-speech using the RMS already measured per
+        # chunk, and rejects clips too short to be worth decoding.
+        rms = self.rms_view(chunk_count)
+        threshold = self.endpointer.offset_threshold if self.endpointer else self.config.silence_threshold
+        chunk_seconds = self.config.chunk_size / self.config.sample_rate
+
+        voiced = voiced_duration(rms, threshold, chunk_seconds)
+        if voiced < self.config.min_voiced_duration:
+            if self.config.debug:
+                print(f"Skipping clip with {voiced:.2f}s of speech")
+            return None
+
+        span = self.speech_span(chunk_count)
+        if span is None:
+            return None
+        first, last = span
+        self.speech_end = last * self.samples_per_chunk
+        return self.audio_view(first, last)
+
+    def speech_span(self, chunk_count: int) -> Optional[Tuple[int, int]]:
+        rms = self.rms_view(chunk_count)
+        threshold = self.endpointer.offset_threshold if self.endpointer else self.config.silence_threshold
+        chunk_seconds = self.config.chunk_size / self.config.sample_rate
+        pad_chunks = int(self.config.trim_padding / chunk_seconds)
+        return find_speech_span(rms, threshold, pad_chunks)
+
+    def save_wav(self, audio: np.ndarray) -> str:
         temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
         temp_path = temp_file.name
         temp_file.close()
@@ -68,9 +240,13 @@ class AudioRecorder:
             wf.setnchannels(self.config.channels)
             wf.setsampwidth(self.audio.get_sample_size(self.format))
             wf.setframerate(self.config.sample_rate)
-            wf.writeframes(b"".join(frames))
+            wf.writeframes(audio.tobytes())
 
         return temp_path
 
     def cleanup(self):
+        if self.capture:
+            self.capture.stop()
+            if self.config.debug:
+                print(f"Audio capture overflows: {self.capture.overflows}")
         self.audio.terminate()
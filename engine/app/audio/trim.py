@@ -0,0 +1,15 @@
+from typing import Optional, Tuple
+import numpy as np
+
+
+def find_speech_span(chunk_rms: np.ndarray, threshold: float, pad_chunks: int = 0) -> Optional[Tuple[int, int]]:
+    voiced = np.flatnonzero(chunk_rms > threshold)
+    if len(voiced) == 0:
+        return None
+    first = max(int(voiced[0]) - pad_chunks, 0)
+    last = min(int(voiced[-1]) + 1 + pad_chunks, len(chunk_rms))
+    return first, last
+
+
+def voiced_duration(chunk_rms: np.ndarray, threshold: float, chunk_seconds: float) -> float:
+    return int(np.count_nonzero(chunk_rms > threshold)) * chunk_seconds
@@ -4,26 +4,115 @@ import torch
 
 class Config:
     openrouter_model: str = "openai/gpt-3.5-turbo"
+    openrouter_base_url: str = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+    async_llm_client: bool = False
+    llm_deadline: float = 8.0
+    llm_intent_deadline: float = 2.0
+    llm_local_fallback: bool = False
+    llm_breaker_failures: int = 3
+    llm_breaker_cooldown: float = 30.0
+    llm_ewma_alpha: float = 0.3
+    llm_connect_timeout: float = 2.0
+    llm_max_retries: int = 2
+    llm_retry_base_delay: float = 0.25
+    llm_hedge_requests: bool = False
+    llm_hedge_min_delay: float = 0.5
+    llm_max_connections: int = 16
+    llm_keepalive_seconds: float = 30.0
     flan_model: str = "google/flan-t5-large"
+    flan_batch_size: int = 8
+    flan_backend: str = "transformers"  # transformers, int8, ctranslate2, onnx
+    flan_num_threads: int = 0  # 0 = one per available core; > 0 also sets torch's process-wide thread count
+    flan_converted_dir: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache", "flan")
     whisper_model: str = "tiny"
     num_agents: int = 3
     single_person_mode: bool = False
     silence_threshold: float = 200.0
     silence_duration: float = 1.25
+    adaptive_endpointing: bool = True
+    endpoint_calibration_chunks: int = 5
+    endpoint_floor_adaptation: float = 0.05
+    endpoint_onset_ratio: float = 3.0
+    endpoint_offset_ratio: float = 2.0
+    endpoint_min_threshold: float = 100.0
+    endpoint_min_hangover: float = 0.5
+    endpoint_min_utterance: float = 1.0
+    endpoint_decline_ratio: float = 0.5
     sample_rate: int = 16000
     channels: int = 1
     chunk_size: int = 1024
+    max_utterance_seconds: float = 30.0
+    persistent_capture: bool = True
+    capture_buffer_seconds: float = 60.0
+    capture_preroll: float = 0.3
+    barge_in: bool = False
+    barge_in_min_speech: float = 0.25  # consecutive voiced audio needed; shorter coughs and knocks are ignored
+    barge_in_threshold_ratio: float = 1.5
+    asr_debug_wav: bool = False
+    trim_padding: float = 0.2
+    min_voiced_duration: float = 0.3
+    asr_beam_size: int = 5
+    asr_vad_filter: bool = False
+    asr_vad_min_silence_ms: int = 500
+    asr_language_lock_turns: int = 3
+    asr_language_lock_probability: float = 0.8
+    asr_context_prompt: bool = True
+    asr_prompt_chars: int = 200
+    asr_cpu_threads: int = 0
+    shared_asr_service: bool = False
+    asr_service_address: str = ""  # host:port of a shared `python -m app.asr.asr_server`; batches across stations
+    asr_batch_max_size: int = 8
+    asr_batch_max_wait_ms: float = 50.0
+    streaming_asr: bool = False
+    streaming_interval: float = 1.0
+    streaming_min_window: float = 1.0
+    streaming_stable_margin: float = 2.0
     max_context_turns: int = 20
+    context_token_budget: int = 360  # prompt context tokens for local models, fits FLAN's 512 with the template; 0 = turn count only
+    remote_context_token_budget: int = 1500  # the same for OpenRouter; the smallest budget among the active backends applies
+    context_summary: bool = False  # fold turns that drop out of the budget into a running summary (an extra LLM call per batch)
+    context_summary_tokens: int = 80
+    context_summary_batch: int = 2  # evicted turns to collect before refreshing the summary
     similarity_threshold: float = 0.6
     similarity_window: int = 5
+    similarity_scope: str = "session"  # repetition check against: window (last similarity_window outputs) or session (also every earlier output)
+    similarity_session_threshold: float = 0.75  # with session scope, outputs before the window only count as repeats from this similarity
+    response_candidates: int = 1
+    speculative_responses: bool = False
+    speculative_pause: float = 0.3  # trailing silence before speculating on the speech so far
+    speculative_match_threshold: float = 0.9  # word-level similarity needed to keep a speculative response
+    response_deadline: float = 8.0  # seconds per turn before answering from the question bank (English only, at least llm_deadline); 0 disables
+    candidate_parallelism: int = 3
     thread_update_interval: int = 3
+    thread_decay: float = 1.0  # per patient turn weight decay for thread keywords; < 1 follows the current topic
     use_intent_classification: bool = False
+    local_intent_classifier: bool = True
+    intent_confidence_threshold: float = 0.6
+    intent_cache_size: int = 256
+    async_pipeline: bool = False
+    stream_responses: bool = False
+    pipeline_queue_size: int = 1
     debug: bool = False
     device: str = "cuda" if torch.cuda.is_available() else "cpu"
     enable_tts: bool = True
     elevenlabs_api_key: str = os.getenv("ELEVENLABS_API_KEY", "")
     elevenlabs_voice_id: str = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
     tts_timeout: float = 10.0
+    streaming_playback: bool = False
+    tts_sample_rate: int = 44100
+    tts_output_frames: int = 1024
+    tts_jitter_buffer_ms: float = 150.0
+    tts_streaming_latency: int = 3  # ElevenLabs optimize_streaming_latency (0-4) for streamed playback; None to omit
+    tts_cache_enabled: bool = True
+    tts_cache_dir: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache", "tts")
+    tts_cache_memory_items: int = 128
+    tts_cache_max_mb: float = 100.0
+    tts_archive_enabled: bool = True
+    tts_archive_dir: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "temp")
+    tts_archive_format: str = "wav"
+    tts_archive_max_files: int = 500
+    tts_archive_max_mb: float = 500.0
+    tts_archive_queue_size: int = 16
     
     student_voices: list = [
         "21m00Tcm4TlvDq8ikWAM",
@@ -0,0 +1,426 @@
+import asyncio
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter, deque
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+from app.llm.openrouter_client import OPENROUTER_BASE_URL, SYSTEM_PROMPT
+from app.llm.prompts import FALLBACK_RESPONSES
+
+FALLBACK_RESPONSE = FALLBACK_RESPONSES[2]
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return values[int(q * (len(values) - 1))]
+
+
+class AsyncOpenRouterClient:
+    # asyncio client over a pooled keep-alive connection. Each request has an
+    # overall deadline; 429/5xx responses and connection errors are retried
+    # with jittered exponential backoff inside it, and with hedging enabled a
+    # duplicate request is sent once the first is slower than the recent p95.
+    # The synchronous methods run on a private event loop thread so agents
+    # can use this as a drop-in replacement for OpenRouterClient.
+
+    def __init__(
+        self,
+        model: str = "anthropic/claude-3.5-sonnet",
+        api_key: Optional[str] = None,
+        base_url: str = OPENROUTER_BASE_URL,
+        deadline: float = 8.0,
+        connect_timeout: float = 2.0,
+        max_retries: int = 2,
+        retry_base_delay: float = 0.25,
+        hedge: bool = False,
+        hedge_min_delay: float = 0.5,
+        hedge_min_samples: int = 20,
+        max_connections: int = 16,
+        keepalive_seconds: float = 30.0
+    ):
+        self.model = model
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.counters: Counter = Counter()
+        self.attempt_latencies = deque(maxlen=500)
+        self.request_latencies = deque(maxlen=1000)
+
+        try:
+            import openai
+            from openai import AsyncOpenAI
+            # openai>=3 is built on httpx2; the pool must come from the same
+            # transport package the SDK uses.
+            if int(openai.__version__.split(".")[0]) >= 3:
+                import httpx2 as httpx
+            else:
+                import httpx
+
+            key = api_key or os.getenv("OPENROUTER_API_KEY")
+
+            if not key:
+                raise ValueError("OPENROUTER_API_KEY not set")
+
+            self.client = AsyncOpenAI(
+                api_key=key,
+                base_url=base_url,
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_connections,
+                        keepalive_expiry=keepalive_seconds
+                    ),
+                    timeout=httpx.Timeout(deadline, connect=connect_timeout)
+                )
+            )
+            self.available = True
+            print(f"✓ OpenRouter (async) initialized with {model}")
+        except ImportError:
+            print("⚠ OpenAI package not installed. Run: pip install openai")
+            self.available = False
+        except ValueError as e:
+            print(f"⚠ {e}")
+            print("  Set environment variable: $env:OPENROUTER_API_KEY='sk-or-v1-...'")
+            print("  Get your key from: https://openrouter.ai/keys")
+            self.available = False
+        except Exception as e:
+            print(f"⚠ OpenRouter initialization failed: {e}")
+            print("  Get your key from: https://openrouter.ai/keys")
+            self.available = False
+
+    def build_messages(self, prompt: str) -> list:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self.stats_lock:
+            self.counters[name] += amount
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        from openai import APIConnectionError, APIStatusError
+        if isinstance(error, APIConnectionError):
+            return True
+        if isinstance(error, APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        return False
+
+    @staticmethod
+    def _retry_after(error: Exception) -> float:
+        response = getattr(error, "response", None)
+        if response is None:
+            return 0.0
+        try:
+            return float(response.headers.get("retry-after", 0))
+        except ValueError:
+            return 0.0
+
+    def hedge_delay(self) -> float:
+        with self.stats_lock:
+            latencies = sorted(self.attempt_latencies)
+        if len(latencies) < self.hedge_min_samples:
+            return self.hedge_min_delay
+        return max(self.hedge_min_delay, _percentile(latencies, 0.95))
+
+    async def _attempt(self, messages: list, max_new_tokens: int, temperature: float, timeout: float) -> str:
+        started = time.monotonic()
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_new_tokens,
+            temperature=temperature,
+            timeout=timeout
+        )
+        with self.stats_lock:
+            self.attempt_latencies.append(time.monotonic() - started)
+            if response.usage:
+                self.counters["prompt_tokens"] += response.usage.prompt_tokens or 0
+                self.counters["completion_tokens"] += response.usage.completion_tokens or 0
+        return (response.choices[0].message.content or "").strip()
+
+    async def _backoff(self, error: Exception, attempt: int, deadline_at: float) -> None:
+        # Full jitter, but never sooner than the server's Retry-After and
+        # never past the deadline.
+        if not self._is_retryable(error) or attempt >= self.max_retries:
+            raise error
+        delay = max(random.uniform(0, self.retry_base_delay * 2 ** attempt), self._retry_after(error))
+        if time.monotonic() + delay >= deadline_at:
+            raise error
+        self._count("retries")
+        await asyncio.sleep(delay)
+
+    async def _with_retries(self, messages: list, max_new_tokens: int, temperature: float, deadline_at: float) -> str:
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded("Deadline exceeded before the request could be retried")
+            self._count("attempts")
+            try:
+                return await self._attempt(messages, max_new_tokens, temperature, remaining)
+            except Exception as e:
+                await self._backoff(e, attempt, deadline_at)
+            attempt += 1
+
+    async def _hedged(self, messages: list, max_new_tokens: int, temperature: float, deadline_at: float) -> str:
+        primary = asyncio.ensure_future(self._with_retries(messages, max_new_tokens, temperature, deadline_at))
+        backup = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay())
+            if done:
+                return primary.result()
+
+            self._count("hedges")
+            backup = asyncio.ensure_future(self._with_retries(messages, max_new_tokens, temperature, deadline_at))
+            pending = {primary, backup}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            primary.cancel()
+            if backup:
+                backup.cancel()
+
+    async def acomplete(
+        self,
+        prompt: str,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7,
+        deadline: Optional[float] = None
+    ) -> str:
+        # Raises on failure; agenerate() is the variant that falls back.
+        if not self.available:
+            raise RuntimeError("OpenRouter client not available")
+        deadline = deadline or self.deadline
+        deadline_at = time.monotonic() + deadline
+        messages = self.build_messages(prompt)
+        request = self._hedged if self.hedge else self._with_retries
+
+        self._count("requests")
+        started = time.monotonic()
+        try:
+            text = await asyncio.wait_for(request(messages, max_new_tokens, temperature, deadline_at), deadline)
+        except TimeoutError as e:
+            self._count("deadline_exceeded")
+            if isinstance(e, DeadlineExceeded):
+                raise
+            raise DeadlineExceeded(f"No response within {deadline:.1f}s") from e
+        except Exception:
+            self._count("errors")
+            raise
+        with self.stats_lock:
+            self.request_latencies.append(time.monotonic() - started)
+        return text
+
+    async def agenerate(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7) -> str:
+        if not self.available:
+            return FALLBACK_RESPONSES[0]
+        try:
+            return await self.acomplete(prompt, max_new_tokens, temperature)
+        except Exception as e:
+            print(f"OpenRouter API error: {e}")
+            return FALLBACK_RESPONSE
+
+    async def agenerate_many(self, prompt: str, count: int, max_new_tokens: int = 128, temperature: float = 0.7) -> List[str]:
+        return list(await asyncio.gather(*[
+            self.agenerate(prompt, max_new_tokens, temperature) for _ in range(count)
+        ]))
+
+    async def acomplete_many(
+        self,
+        prompt: str,
+        count: int,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7,
+        deadline: Optional[float] = None
+    ) -> List[str]:
+        # Returns the candidates that succeeded; raises only if none did.
+        outcomes = await asyncio.gather(
+            *[self.acomplete(prompt, max_new_tokens, temperature, deadline) for _ in range(count)],
+            return_exceptions=True
+        )
+        results = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+        if not results:
+            raise outcomes[0]
+        return results
+
+    async def astream(
+        self,
+        prompt: str,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        # Retries only until the first delta arrives; after that a failure is
+        # raised to the caller with the partial text already delivered.
+        if not self.available:
+            raise RuntimeError("OpenRouter client not available")
+        deadline = deadline or self.deadline
+        messages = self.build_messages(prompt)
+        deadline_at = time.monotonic() + deadline
+        self._count("requests")
+        started = time.monotonic()
+        attempt = 0
+        produced = False
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                self._count("deadline_exceeded")
+                raise DeadlineExceeded(f"No response within {deadline:.1f}s")
+            self._count("attempts")
+            try:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=max_new_tokens,
+                    temperature=temperature,
+                    stream=True,
+                    timeout=remaining
+                )
+                try:
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            if not produced:
+                                produced = True
+                                with self.stats_lock:
+                                    self.attempt_latencies.append(time.monotonic() - started)
+                            yield delta
+                finally:
+                    await stream.close()
+                with self.stats_lock:
+                    self.request_latencies.append(time.monotonic() - started)
+                return
+            except Exception as e:
+                if produced:
+                    self._count("errors")
+                    raise
+                try:
+                    await self._backoff(e, attempt, deadline_at)
+                except Exception:
+                    self._count("errors")
+                    raise
+            attempt += 1
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self.loop_lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, daemon=True).start()
+            return self.loop
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop()).result()
+
+    def generate(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7, purpose: str = "response") -> str:
+        return self._run(self.agenerate(prompt, max_new_tokens, temperature))
+
+    def generate_many(self, prompt: str, count: int, max_new_tokens: int = 128, temperature: float = 0.7) -> List[str]:
+        return self._run(self.agenerate_many(prompt, count, max_new_tokens, temperature))
+
+    def complete(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7, deadline: Optional[float] = None) -> str:
+        return self._run(self.acomplete(prompt, max_new_tokens, temperature, deadline))
+
+    def complete_many(
+        self,
+        prompt: str,
+        count: int,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7,
+        deadline: Optional[float] = None
+    ) -> List[str]:
+        return self._run(self.acomplete_many(prompt, count, max_new_tokens, temperature, deadline))
+
+    async def _pump_stream(self, deltas: queue.Queue, *args) -> None:
+        # Hands deltas to the calling thread; a failure is passed along as
+        # the exception object itself.
+        try:
+            async for delta in self.astream(*args):
+                deltas.put(delta)
+        except Exception as e:
+            deltas.put(e)
+        finally:
+            deltas.put(None)
+
+    def complete_stream(
+        self,
+        prompt: str,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7,
+        deadline: Optional[float] = None
+    ) -> Iterator[str]:
+        deltas: queue.Queue = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._pump_stream(deltas, prompt, max_new_tokens, temperature, deadline),
+            self._get_loop()
+        )
+        try:
+            while True:
+                delta = deltas.get()
+                if delta is None:
+                    return
+                if isinstance(delta, Exception):
+                    raise delta
+                yield delta
+        finally:
+            future.cancel()
+
+    def generate_stream(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7) -> Iterator[str]:
+        if not self.available:
+            yield FALLBACK_RESPONSES[0]
+            return
+
+        produced = False
+        try:
+            for delta in self.complete_stream(prompt, max_new_tokens, temperature):
+                produced = True
+                yield delta
+        except Exception as e:
+            print(f"OpenRouter API error: {e}")
+            if not produced:
+                yield FALLBACK_RESPONSE
+
+    def get_stats(self) -> Dict[str, float]:
+        with self.stats_lock:
+            stats = dict(self.counters)
+            latencies = sorted(self.request_latencies)
+        if latencies:
+            stats["p50_latency_ms"] = 1000 * _percentile(latencies, 0.5)
+            stats["p95_latency_ms"] = 1000 * _percentile(latencies, 0.95)
+            stats["p99_latency_ms"] = 1000 * _percentile(latencies, 0.99)
+        if self.hedge:
+            stats["hedge_delay_ms"] = 1000 * self.hedge_delay()
+        return stats
+
+    def close(self) -> None:
+        # Releases the connection pool and stops the loop thread; safe to
+        # call more than once.
+        with self.loop_lock:
+            loop, self.loop = self.loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self.client.close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
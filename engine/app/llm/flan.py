@@ -1,17 +1,141 @@
+import os
+import platform
+from typing import Iterator, List, Optional
 import torch
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 from app.config import Config
 
+FLAN_BACKENDS = ("transformers", "int8", "ctranslate2", "onnx")
+
+
+def local_thread_count(config: Config) -> int:
+    if config.flan_num_threads > 0:
+        return config.flan_num_threads
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def converted_model_dir(config: Config, backend: str) -> str:
+    name = config.flan_model.replace("/", "--")
+    return os.path.join(config.flan_converted_dir, f"{name}-{backend}")
+
+
+def create_flan_client(config: Config):
+    if config.flan_backend not in FLAN_BACKENDS:
+        raise ValueError(f"Unsupported FLAN backend: {config.flan_backend}")
+    if config.flan_backend == "ctranslate2":
+        return CTranslate2FlanClient(config)
+    return FlanClient(config)
+
+
+class LocalLLMClient:
+    # Shared by the local backends. Local generation is not incremental and
+    # cannot be cut short, so deadlines are accepted but not enforced. The
+    # `purpose` taken by generate() only matters to LLMManager's router; the
+    # clients accept it so callers need not know which one they were given.
+
+    def generate_stream(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7) -> Iterator[str]:
+        yield self.generate(prompt, max_new_tokens, temperature)
+
+    def generate_many(self, prompt: str, count: int, max_new_tokens: int = 128, temperature: float = 0.7) -> List[str]:
+        return self.generate_batch([prompt], count, max_new_tokens, temperature)[0]
+
+    def complete(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7, deadline: Optional[float] = None) -> str:
+        return self.generate(prompt, max_new_tokens, temperature)
+
+    def complete_many(
+        self,
+        prompt: str,
+        count: int,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7,
+        deadline: Optional[float] = None
+    ) -> List[str]:
+        return self.generate_many(prompt, count, max_new_tokens, temperature)
+
+    def complete_stream(
+        self,
+        prompt: str,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7,
+        deadline: Optional[float] = None
+    ) -> Iterator[str]:
+        return self.generate_stream(prompt, max_new_tokens, temperature)
+
+
+class FlanClient(LocalLLMClient):
+    # Serves the "transformers", "int8" and "onnx" backends. All three expose
+    # the transformers generate() API, so only model loading differs.
 
-class FlanClient:
     def __init__(self, config: Config):
         self.config = config
+        self.backend = config.flan_backend
         self.device = torch.device(config.device)
+        self.num_threads = local_thread_count(config)
+        if config.device == "cpu" and config.flan_num_threads > 0:
+            # torch's thread pool is process-wide, so this also applies to any
+            # other torch model in the process (Whisper runs on CTranslate2
+            # and is unaffected). By default torch's own setting is kept.
+            torch.set_num_threads(self.num_threads)
         self.tokenizer = AutoTokenizer.from_pretrained(config.flan_model)
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(config.flan_model).to(self.device)
-        self.model.eval()
+        self.model = self._load_model()
+
+    def _load_model(self):
+        if self.backend == "onnx":
+            return self._load_onnx()
+
+        model = AutoModelForSeq2SeqLM.from_pretrained(self.config.flan_model)
+        model.eval()
+        if self.backend == "int8":
+            if self.config.device != "cpu":
+                print("⚠ int8 dynamic quantization is CPU-only; using full precision on GPU")
+            else:
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model.to(self.device)
+
+    def _load_onnx(self):
+        # Exported once to flan_converted_dir. On CPU every graph is then
+        # dynamically quantized to int8, which is where ONNX Runtime's speedup
+        # over PyTorch comes from.
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.num_threads
+        provider = "CUDAExecutionProvider" if self.config.device == "cuda" else "CPUExecutionProvider"
+        path = converted_model_dir(self.config, "onnx")
+        graphs = ("encoder_model", "decoder_model", "decoder_with_past_model")
+
+        if not os.path.isdir(path):
+            ORTModelForSeq2SeqLM.from_pretrained(self.config.flan_model, export=True).save_pretrained(path)
+        if self.config.device != "cpu":
+            return ORTModelForSeq2SeqLM.from_pretrained(path, session_options=options, provider=provider)
 
-    def generate(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7) -> str:
+        if not os.path.exists(os.path.join(path, f"{graphs[0]}_quantized.onnx")):
+            from optimum.onnxruntime import ORTQuantizer
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+            if platform.machine().lower() in ("arm64", "aarch64"):
+                quantization = AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+            else:
+                quantization = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+            for graph in graphs:
+                if os.path.exists(os.path.join(path, f"{graph}.onnx")):
+                    quantizer = ORTQuantizer.from_pretrained(path, file_name=f"{graph}.onnx")
+                    quantizer.quantize(save_dir=path, quantization_config=quantization)
+
+        names = {}
+        if os.path.exists(os.path.join(path, f"{graphs[2]}_quantized.onnx")):
+            names["decoder_with_past_file_name"] = f"{graphs[2]}_quantized.onnx"
+        return ORTModelForSeq2SeqLM.from_pretrained(
+            path,
+            encoder_file_name=f"{graphs[0]}_quantized.onnx",
+            decoder_file_name=f"{graphs[1]}_quantized.onnx",
+            session_options=options,
+            provider=provider,
+            **names
+        )
+
+    def generate(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7, purpose: str = "response") -> str:
         inputs = self.tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
         inputs = {k: v.to(self.device) for k, v in inputs.items()}
 
@@ -30,3 +154,111 @@ class FlanClient:
 
         response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
         return response.strip()
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        num_samples: int = 1,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7
+    ) -> List[List[str]]:
+        # Returns `num_samples` outputs per prompt. Identical prompts are
+        # encoded once, the encoder output is reused for every sample, and
+        # prompts are grouped by length so padding stays small.
+        distinct = list(dict.fromkeys(prompts))
+        input_ids = self.tokenizer(distinct, truncation=True, max_length=512)["input_ids"]
+        order = sorted(range(len(distinct)), key=lambda i: len(input_ids[i]))
+        batch_size = self.config.flan_batch_size
+
+        samples = {}
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            inputs = self.tokenizer.pad(
+                {"input_ids": [input_ids[i] for i in indices]},
+                padding="longest",
+                return_tensors="pt"
+            )
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+
+            with torch.no_grad():
+                outputs = self.model.generate(
+                    **inputs,
+                    max_new_tokens=max_new_tokens,
+                    temperature=max(temperature, 0.01),
+                    do_sample=True,
+                    top_p=0.9,
+                    num_beams=1,
+                    num_return_sequences=num_samples,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    eos_token_id=self.tokenizer.eos_token_id
+                )
+
+            texts = self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+            for position, i in enumerate(indices):
+                group = texts[position * num_samples:(position + 1) * num_samples]
+                samples[distinct[i]] = [text.strip() for text in group]
+
+        return [samples[prompt] for prompt in prompts]
+
+
+class CTranslate2FlanClient(LocalLLMClient):
+    # Runs an int8 CTranslate2 conversion of the FLAN model. The conversion is
+    # done once and stored under flan_converted_dir.
+
+    def __init__(self, config: Config):
+        import ctranslate2
+        self.config = config
+        self.backend = "ctranslate2"
+        self.num_threads = local_thread_count(config)
+        self.tokenizer = AutoTokenizer.from_pretrained(config.flan_model)
+
+        path = converted_model_dir(config, "ctranslate2")
+        if not os.path.isdir(path):
+            converter = ctranslate2.converters.TransformersConverter(config.flan_model)
+            converter.convert(path, quantization="int8")
+        self.translator = ctranslate2.Translator(
+            path,
+            device=config.device,
+            compute_type="int8_float16" if config.device == "cuda" else "int8",
+            intra_threads=self.num_threads
+        )
+
+    def generate(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7, purpose: str = "response") -> str:
+        return self.generate_batch([prompt], 1, max_new_tokens, temperature)[0][0]
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        num_samples: int = 1,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7
+    ) -> List[List[str]]:
+        # Sampling in CTranslate2 returns one hypothesis per source, so each
+        # distinct prompt is repeated num_samples times within the batch.
+        distinct = list(dict.fromkeys(prompts))
+        sources = []
+        for prompt in distinct:
+            input_ids = self.tokenizer(prompt, truncation=True, max_length=512)["input_ids"]
+            sources.extend([self.tokenizer.convert_ids_to_tokens(input_ids)] * num_samples)
+
+        results = self.translator.translate_batch(
+            sources,
+            max_batch_size=self.config.flan_batch_size * num_samples,
+            beam_size=1,
+            sampling_topk=0,
+            sampling_topp=0.9,
+            sampling_temperature=max(temperature, 0.01),
+            max_decoding_length=max_new_tokens
+        )
+
+        samples = {}
+        for i, prompt in enumerate(distinct):
+            group = results[i * num_samples:(i + 1) * num_samples]
+            samples[prompt] = [
+                self.tokenizer.decode(
+                    self.tokenizer.convert_tokens_to_ids(result.hypotheses[0]),
+                    skip_special_tokens=True
+                ).strip()
+                for result in group
+            ]
+        return [samples[prompt] for prompt in prompts]
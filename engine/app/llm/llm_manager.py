@@ -1,23 +1,62 @@
-from typing import Optional
+import threading
+import time
+from collections import Counter
+from typing import Callable, Iterator, List, Optional
 from app.config import Config
+from app.llm.prompts import FALLBACK_RESPONSES
+from app.llm.router import PURPOSE_POLICIES, BackendHealth
+
+FALLBACK_RESPONSE = FALLBACK_RESPONSES[2]
+# Share of the remaining deadline a backend always keeps for itself, however
+# slow the fallback behind it is.
+MIN_BUDGET_SHARE = 0.5
 
 
 class LLMManager:
+    # Routes every call to a backend chosen per call: OpenRouter when it is
+    # healthy and fast enough for the purpose's deadline, otherwise the local
+    # FLAN model. A failed call falls through to the next backend.
     
     def __init__(self, config: Config):
         self.config = config
         self.client = None
         self.client_name = "none"
+        self.backends: List[BackendHealth] = []
+        self.backends_lock = threading.Lock()
+        self.routed: Counter = Counter()
         
         self._initialize_client()
     
     def _initialize_client(self):
         try:
-            from app.llm.openrouter_client import OpenRouterClient
-            client = OpenRouterClient(model=self.config.openrouter_model)
+            if self.config.async_llm_client:
+                from app.llm.async_openrouter_client import AsyncOpenRouterClient
+                client = AsyncOpenRouterClient(
+                    model=self.config.openrouter_model,
+                    base_url=self.config.openrouter_base_url,
+                    deadline=self.config.llm_deadline,
+                    connect_timeout=self.config.llm_connect_timeout,
+                    max_retries=self.config.llm_max_retries,
+                    retry_base_delay=self.config.llm_retry_base_delay,
+                    hedge=self.config.llm_hedge_requests,
+                    hedge_min_delay=self.config.llm_hedge_min_delay,
+                    max_connections=self.config.llm_max_connections,
+                    keepalive_seconds=self.config.llm_keepalive_seconds
+                )
+            else:
+                from app.llm.openrouter_client import OpenRouterClient
+                client = OpenRouterClient(
+                    model=self.config.openrouter_model,
+                    max_parallel=self.config.candidate_parallelism,
+                    base_url=self.config.openrouter_base_url
+                )
             if client.available:
                 self.client = client
                 self.client_name = "OpenRouter"
+                self._add_backend("OpenRouter", client)
+                if self.config.llm_local_fallback:
+                    # Ready as a fallback target without delaying startup.
+                    threading.Thread(target=self._load_local_backend, daemon=True).start()
                 return
         except Exception as e:
             print(f"Could not initialize OpenRouter: {e}")
@@ -26,12 +65,207 @@ class LLMManager:
         print("  Set OPENROUTER_API_KEY for best quality")
         print("  Get key from: https://openrouter.ai/keys")
         
-        from app.llm.flan import FlanClient
-        self.client = FlanClient(self.config)
-        self.client_name = "FLAN-T5"
+        self.client = self._create_local_client()
+        self.client_name = self._local_name()
+        self._add_backend(self.client_name, self.client)
+    
+    def _local_name(self) -> str:
+        return "FLAN-T5" if self.config.flan_backend == "transformers" else f"FLAN-T5 ({self.config.flan_backend})"
+    
+    def _create_local_client(self):
+        from app.llm.flan import create_flan_client
+        return create_flan_client(self.config)
+    
+    def _load_local_backend(self):
+        try:
+            client = self._create_local_client()
+            # One warm-up call, which also seeds the latency estimate the
+            # router uses to reserve time for falling back to it.
+            started = time.monotonic()
+            client.generate("Ask one short question about the weather.", max_new_tokens=40)
+            backend = self._add_backend(self._local_name(), client)
+            backend.record_success(time.monotonic() - started)
+        except Exception as e:
+            print(f"Could not load local fallback model: {e}")
+    
+    def _add_backend(self, name: str, client) -> BackendHealth:
+        backend = BackendHealth(
+            name,
+            client,
+            failure_threshold=self.config.llm_breaker_failures,
+            cooldown=self.config.llm_breaker_cooldown,
+            alpha=self.config.llm_ewma_alpha
+        )
+        with self.backends_lock:
+            self.backends.append(backend)
+        return backend
+    
+    def deadline_for(self, purpose: str) -> float:
+        if purpose == "intent":
+            return self.config.llm_intent_deadline
+        return self.config.llm_deadline
+    
+    def _candidates(self, purpose: str, deadline: float) -> List[BackendHealth]:
+        with self.backends_lock:
+            backends = list(self.backends)
+        healthy = [backend for backend in backends if backend.is_available()]
+        if PURPOSE_POLICIES.get(purpose, "preferred") == "fastest":
+            healthy.sort(key=lambda backend: backend.expected_latency())
+        in_time = [backend for backend in healthy if backend.expected_latency() <= deadline]
+        # Empty with every breaker open: the caller fails fast, and a backend
+        # only gets called again as a half-open probe once its cooldown ends.
+        return in_time + [backend for backend in healthy if backend not in in_time]
+    
+    @staticmethod
+    def _budget(candidates: List[BackendHealth], index: int, remaining: float) -> float:
+        # Leave enough of the deadline for the fastest remaining backend, so
+        # a hung call still leaves time to fall back, but never cut this
+        # backend below its own expected latency or MIN_BUDGET_SHARE.
+        reserve = min((backend.expected_latency() for backend in candidates[index + 1:]), default=0.0)
+        floor = max(candidates[index].expected_latency(), MIN_BUDGET_SHARE * remaining)
+        return min(remaining, max(remaining - reserve, floor))
+    
+    def _count_route(self, purpose: str, backend: BackendHealth) -> None:
+        with self.backends_lock:
+            self.routed[f"{purpose}:{backend.name}"] += 1
+    
+    def _route(self, purpose: str, call: Callable):
+        deadline = self.deadline_for(purpose)
+        deadline_at = time.monotonic() + deadline
+        error: Optional[Exception] = None
+        candidates = self._candidates(purpose, deadline)
+        if not candidates:
+            raise RuntimeError("No LLM backend available: every circuit breaker is open")
+        for index, backend in enumerate(candidates):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            if not backend.acquire():
+                # Opened since, or half-open with a probe already in flight.
+                continue
+            started = time.monotonic()
+            try:
+                result = call(backend.client, self._budget(candidates, index, remaining))
+            except Exception as e:
+                backend.record_failure(time.monotonic() - started)
+                print(f"{backend.name} error: {e}")
+                error = e
+                continue
+            backend.record_success(time.monotonic() - started)
+            self._count_route(purpose, backend)
+            return result
+        raise error or TimeoutError(f"No LLM backend answered within {deadline:.1f}s")
+    
+    def generate(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7, purpose: str = "response") -> str:
+        try:
+            return self._route(
+                purpose,
+                lambda client, deadline: client.complete(prompt, max_new_tokens, temperature, deadline)
+            )
+        except Exception as e:
+            print(f"LLM error: {e}")
+            return FALLBACK_RESPONSE
     
-    def generate(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7) -> str:
-        return self.client.generate(prompt, max_new_tokens, temperature)
+    def generate_many(
+        self,
+        prompt: str,
+        count: int,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7,
+        purpose: str = "response"
+    ) -> List[str]:
+        try:
+            return self._route(
+                purpose,
+                lambda client, deadline: client.complete_many(prompt, count, max_new_tokens, temperature, deadline)
+            )
+        except Exception as e:
+            print(f"LLM error: {e}")
+            return [FALLBACK_RESPONSE]
+    
+    def generate_batch(
+        self,
+        prompts: List[str],
+        num_samples: int = 1,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7,
+        purpose: str = "response"
+    ) -> List[List[str]]:
+        def call(client, deadline):
+            if hasattr(client, "generate_batch"):
+                return client.generate_batch(prompts, num_samples, max_new_tokens, temperature)
+            return [client.complete_many(prompt, num_samples, max_new_tokens, temperature, deadline) for prompt in prompts]
+        try:
+            return self._route(purpose, call)
+        except Exception as e:
+            print(f"LLM error: {e}")
+            return [[FALLBACK_RESPONSE] for _ in prompts]
+    
+    def generate_stream(
+        self,
+        prompt: str,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7,
+        purpose: str = "response"
+    ) -> Iterator[str]:
+        # Time to first delta is the latency a stream is judged by. Once text
+        # has been delivered a failure ends the stream instead of switching
+        # backends mid-sentence.
+        deadline = self.deadline_for(purpose)
+        deadline_at = time.monotonic() + deadline
+        candidates = self._candidates(purpose, deadline)
+        for index, backend in enumerate(candidates):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            if not backend.acquire():
+                # Opened since, or half-open with a probe already in flight.
+                continue
+            started = time.monotonic()
+            produced = False
+            try:
+                for delta in backend.client.complete_stream(
+                    prompt, max_new_tokens, temperature, self._budget(candidates, index, remaining)
+                ):
+                    if not produced:
+                        produced = True
+                        backend.record_success(time.monotonic() - started)
+                        self._count_route(purpose, backend)
+                    yield delta
+                if not produced:
+                    backend.record_success(time.monotonic() - started)
+                return
+            except Exception as e:
+                print(f"{backend.name} error: {e}")
+                if produced:
+                    return
+                backend.record_failure(time.monotonic() - started)
+        yield FALLBACK_RESPONSE
+    
+    def get_stats(self) -> dict:
+        if hasattr(self.client, "get_stats"):
+            return self.client.get_stats()
+        return {}
+    
+    def get_router_stats(self) -> dict:
+        with self.backends_lock:
+            backends = list(self.backends)
+            routed = dict(self.routed)
+        return {
+            "backends": {backend.name: backend.get_stats() for backend in backends},
+            "routed": routed,
+        }
     
     def get_client_name(self) -> str:
         return self.client_name
+    
+    def get_clients(self) -> list:
+        with self.backends_lock:
+            return [backend.client for backend in self.backends]
+    
+    def close(self) -> None:
+        with self.backends_lock:
+            backends = list(self.backends)
+        for backend in backends:
+            if hasattr(backend.client, "close"):
+                backend.client.close()
@@ -1,10 +1,23 @@
 import os
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+from app.llm.prompts import FALLBACK_RESPONSES
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+SYSTEM_PROMPT = "You are a student therapist learning to ask therapeutic questions. Keep responses brief and always ask questions."
 
 
 class OpenRouterClient:
     
-    def __init__(self, model: str = "anthropic/claude-3.5-sonnet", api_key: Optional[str] = None):
+    def __init__(
+        self,
+        model: str = "anthropic/claude-3.5-sonnet",
+        api_key: Optional[str] = None,
+        max_parallel: int = 4,
+        base_url: str = OPENROUTER_BASE_URL
+    ):
+        self.max_parallel = max_parallel
+        self.executor: Optional[ThreadPoolExecutor] = None
         try:
             from openai import OpenAI
             
@@ -15,7 +28,7 @@ class OpenRouterClient:
             
             self.client = OpenAI(
                 api_key=key,
-                base_url="https://openrouter.ai/api/v1"
+                base_url=base_url
             )
             self.model = model
             self.available = True
@@ -33,21 +46,119 @@ class OpenRouterClient:
             print("  Get your key from: https://openrouter.ai/keys")
             self.available = False
     
-    def generate(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7) -> str:
+    def _client_for(self, deadline: Optional[float]):
+        # Under a deadline a slow attempt is not retried here; the caller
+        # decides whether to fail over instead.
+        if deadline is None:
+            return self.client
+        return self.client.with_options(timeout=deadline, max_retries=0)
+
+    def complete(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7, deadline: Optional[float] = None) -> str:
+        # Like generate(), but raises instead of returning a canned reply.
         if not self.available:
-            return "Can you tell me more about that?"
+            raise RuntimeError("OpenRouter client not available")
+        response = self._client_for(deadline).chat.completions.create(
+            model=self.model,
+            messages=self.build_messages(prompt),
+            max_tokens=max_new_tokens,
+            temperature=temperature
+        )
+        return (response.choices[0].message.content or "").strip()
+
+    def generate(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7, purpose: str = "response") -> str:
+        if not self.available:
+            return FALLBACK_RESPONSES[0]
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a student therapist learning to ask therapeutic questions. Keep responses brief and always ask questions."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_new_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content.strip()
+            return self.complete(prompt, max_new_tokens, temperature)
+        except Exception as e:
+            print(f"OpenRouter API error: {e}")
+            return FALLBACK_RESPONSES[2]
+
+    def generate_many(self, prompt: str, count: int, max_new_tokens: int = 128, temperature: float = 0.7) -> List[str]:
+        # Independent requests issued concurrently, so `count` candidates
+        # cost roughly one round-trip.
+        if count <= 1:
+            return [self.generate(prompt, max_new_tokens, temperature)]
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_parallel)
+        futures = [
+            self.executor.submit(self.generate, prompt, max_new_tokens, temperature)
+            for _ in range(count)
+        ]
+        return [future.result() for future in futures]
+
+    def complete_many(
+        self,
+        prompt: str,
+        count: int,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7,
+        deadline: Optional[float] = None
+    ) -> List[str]:
+        # Returns the candidates that succeeded; raises only if none did.
+        if count <= 1:
+            return [self.complete(prompt, max_new_tokens, temperature, deadline)]
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_parallel)
+        futures = [
+            self.executor.submit(self.complete, prompt, max_new_tokens, temperature, deadline)
+            for _ in range(count)
+        ]
+        results = []
+        error = None
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                error = error or e
+        if not results:
+            raise error
+        return results
+
+    def build_messages(self, prompt: str) -> list:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+
+    def complete_stream(
+        self,
+        prompt: str,
+        max_new_tokens: int = 128,
+        temperature: float = 0.7,
+        deadline: Optional[float] = None
+    ) -> Iterator[str]:
+        if not self.available:
+            raise RuntimeError("OpenRouter client not available")
+        stream = self._client_for(deadline).chat.completions.create(
+            model=self.model,
+            messages=self.build_messages(prompt),
+            max_tokens=max_new_tokens,
+            temperature=temperature,
+            stream=True
+        )
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            stream.close()
+
+    def generate_stream(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7) -> Iterator[str]:
+        if not self.available:
+            yield FALLBACK_RESPONSES[0]
+            return
+        
+        produced = False
+        try:
+            for delta in self.complete_stream(prompt, max_new_tokens, temperature):
+                produced = True
+                yield delta
         except Exception as e:
             print(f"OpenRouter API error: {e}")
-            return "What are your thoughts on that?"
+            if not produced:
+                yield FALLBACK_RESPONSES[2]
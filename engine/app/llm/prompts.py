@@ -29,3 +29,21 @@ Based on what you just read, ask ONE natural question that:
 - Is written in {language}
 
 Just write the question, nothing else:"""
+
+
+FALLBACK_RESPONSES = (
+    "Can you tell me more about that?",
+    "How does that make you feel?",
+    "What are your thoughts on that?"
+)
+
+
+CONTEXT_SUMMARY_PROMPT = """Summary of a therapy training session so far:
+{summary}
+
+Later in the session:
+{turns}
+
+Rewrite the summary to include the later part. Keep the patient's concerns, people, events and feelings. Use at most {words} words.
+
+Summary:"""
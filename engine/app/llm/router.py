@@ -0,0 +1,104 @@
+import threading
+import time
+from typing import Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# How each purpose picks among healthy backends: "fastest" takes the lowest
+# expected latency, "preferred" keeps registration order (best quality first)
+# and only skips backends that are not expected to meet the deadline.
+PURPOSE_POLICIES = {
+    "intent": "fastest",
+    "response": "preferred",
+    "summary": "preferred",
+}
+
+
+class BackendHealth:
+    # Per-backend EWMA latency and error rate plus a circuit breaker. The
+    # breaker opens after `failure_threshold` consecutive failures, and once
+    # `cooldown` has passed lets a single probe call through (half-open); the
+    # probe's outcome closes or re-opens it.
+
+    def __init__(self, name: str, client, failure_threshold: int = 3, cooldown: float = 30.0, alpha: float = 0.3):
+        self.name = name
+        self.client = client
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.lock = threading.Lock()
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_started: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ewma_latency: Optional[float] = None
+        self.ewma_error_rate = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.opens = 0
+
+    def expected_latency(self) -> float:
+        # Unmeasured backends are assumed fast so they get tried.
+        return self.ewma_latency or 0.0
+
+    def is_available(self) -> bool:
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            return time.monotonic() - self.opened_at >= self.cooldown
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and now - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                # A probe that never reported back (e.g. an abandoned stream)
+                # does not block new probes forever.
+                if self.probe_started is None or now - self.probe_started >= self.cooldown:
+                    self.probe_started = now
+                    return True
+            return False
+
+    def _observe(self, latency: float, failed: bool) -> None:
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency += self.alpha * (latency - self.ewma_latency)
+        self.ewma_error_rate += self.alpha * (float(failed) - self.ewma_error_rate)
+        self.calls += 1
+        self.probe_started = None
+
+    def record_success(self, latency: float) -> None:
+        with self.lock:
+            self._observe(latency, False)
+            self.consecutive_failures = 0
+            self.state = CLOSED
+
+    def record_failure(self, latency: float) -> None:
+        with self.lock:
+            self._observe(latency, True)
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opens += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, float]:
+        with self.lock:
+            return {
+                "state": self.state,
+                "ewma_latency_ms": 1000 * self.ewma_latency if self.ewma_latency is not None else None,
+                "ewma_error_rate": self.ewma_error_rate,
+                "consecutive_failures": self.consecutive_failures,
+                "calls": self.calls,
+                "failures": self.failures,
+                "opens": self.opens,
+            }
@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,6 +8,7 @@ load_dotenv()
 from app.config import Config
 from app.audio.recorder import AudioRecorder
 from app.asr.whisper_asr import WhisperASR
+from app.asr.streaming import StreamingTranscriber
 from app.llm.flan import FlanClient
 from app.memory.store import ConversationStore
 from app.memory.threads import ThreadInferencer
@@ -33,18 +35,39 @@ def main():
     config = Config()
 
     print(f"Loading Whisper ASR ({config.whisper_model})...")
-    asr = WhisperASR(config)
+    asr_service = None
+    if config.asr_service_address:
+        from app.asr.asr_server import RemoteASRService
+        asr_service = RemoteASRService(config.asr_service_address)
+    elif config.shared_asr_service:
+        from app.asr.batch_service import BatchedASRService
+        asr_service = BatchedASRService(config)
+    asr = WhisperASR(config, service=asr_service)
+    streamer = None
+    if config.streaming_asr:
+        if asr.model is None:
+            print("⚠ Streaming ASR needs a local Whisper model; disabled while using the ASR service")
+        else:
+            streamer = StreamingTranscriber(asr, config)
 
     print(f"Loading LLM...")
     from app.llm.llm_manager import LLMManager
     llm_manager = LLMManager(config)
     print(f"✓ Using {llm_manager.get_client_name()} for question generation")
 
-    memory = ConversationStore(similarity_window=config.similarity_window)
+    memory = ConversationStore(
+        similarity_window=config.similarity_window,
+        context_window=config.max_context_turns
+    )
     thread_inferencer = ThreadInferencer(
-        update_interval=config.thread_update_interval
+        update_interval=config.thread_update_interval,
+        decay=config.thread_decay
+    )
+    similarity_checker = SimilarityChecker(
+        threshold=config.similarity_threshold,
+        scope=config.similarity_scope,
+        session_threshold=config.similarity_session_threshold
     )
-    similarity_checker = SimilarityChecker(threshold=config.similarity_threshold)
 
     actual_num_agents = 1 if config.single_person_mode else config.num_agents
     
@@ -68,6 +91,21 @@ def main():
 
     print("Initializing audio recorder...")
     recorder = AudioRecorder(config)
+    orchestrator.recorder = recorder
+    if config.barge_in:
+        if recorder.capture:
+            from app.audio.barge_in import BargeInMonitor
+            orchestrator.barge_in = BargeInMonitor(recorder, config)
+        else:
+            print("⚠ Barge-in requires persistent_capture; disabled")
+
+    speculator = None
+    if config.speculative_responses:
+        if config.async_pipeline or config.stream_responses:
+            print("⚠ Speculative responses require the synchronous, non-streaming loop; disabled")
+        else:
+            from app.agents.speculation import SpeculativeResponder
+            speculator = SpeculativeResponder(orchestrator, asr, config, is_trivial)
 
     print("\n" + "=" * 50)
     if config.single_person_mode:
@@ -82,24 +120,76 @@ def main():
     print("Press Ctrl+C to exit.")
     print("=" * 50 + "\n")
 
+    def listen():
+        asr_prompt = memory.get_recent_transcript(config.asr_prompt_chars) if config.asr_context_prompt else None
+        on_pause = None
+        if speculator:
+            speculator.start(asr_prompt)
+            on_pause = speculator.on_pause
+        if streamer:
+            streamer.start(asr_prompt)
+            audio = recorder.record_utterance(on_chunk=streamer.feed, on_pause=on_pause)
+        else:
+            audio = recorder.record_utterance(on_pause=on_pause)
+        if len(audio) == 0:
+            if streamer:
+                streamer.cancel()
+            return None
+        try:
+            if streamer:
+                transcript, detected_language = streamer.finish(recorder.speech_end)
+            else:
+                transcript, detected_language = asr.transcribe(audio, initial_prompt=asr_prompt)
+        finally:
+            if isinstance(audio, str) and os.path.exists(audio):
+                os.remove(audio)
+        if is_trivial(transcript):
+            return None
+        return transcript, detected_language
+
     try:
-        while True:
-            wav_path = recorder.record_utterance()
-            if not wav_path:
-                continue
-            try:
-                transcript, detected_language = asr.transcribe(wav_path)
-            finally:
-                if os.path.exists(wav_path):
-                    os.remove(wav_path)
-            if is_trivial(transcript):
-                continue
-            print(f"[PATIENT]: {transcript}")
-            orchestrator.run_interaction(transcript, detected_language)
+        if config.async_pipeline:
+            import asyncio
+            from app.agents.pipeline import AsyncPipeline
+            asyncio.run(AsyncPipeline(orchestrator, listen, config).run())
+        else:
+            while True:
+                result = listen()
+                if result is None:
+                    continue
+                transcript, detected_language = result
+                print(f"[PATIENT]: {transcript}")
+                started = time.monotonic()
+                speculative = speculator.resolve(transcript, detected_language, started) if speculator else None
+                orchestrator.run_interaction(transcript, detected_language, speculative, started)
     except KeyboardInterrupt:
         print("\n\nShutting down...")
     finally:
         recorder.cleanup()
+        if orchestrator.pcm_player:
+            if config.debug:
+                print(f"Playback stats: {orchestrator.pcm_player.get_stats()}")
+            orchestrator.pcm_player.close()
+        if orchestrator.tts_service and orchestrator.tts_service.archiver:
+            orchestrator.tts_service.archiver.close()
+        if orchestrator.tts_service and orchestrator.tts_service.cache and config.debug:
+            print(f"TTS cache stats: {orchestrator.tts_service.cache.get_stats()}")
+        if orchestrator.intent_classifier and config.use_intent_classification and config.debug:
+            print(f"Intent classifier stats: {orchestrator.intent_classifier.get_stats()}")
+        if config.debug:
+            print(f"Turn stats: {dict(orchestrator.turn_stats)}")
+            if orchestrator.context_builder:
+                print(f"Context stats: {orchestrator.context_builder.get_stats()}")
+            if speculator:
+                print(f"Speculation stats: {speculator.get_stats()}")
+            print(f"LLM router stats: {llm_manager.get_router_stats()}")
+        if config.async_llm_client and config.debug:
+            print(f"LLM client stats: {llm_manager.get_stats()}")
+        if asr_service and config.debug:
+            print(f"ASR service stats: {asr_service.get_stats()}")
+        llm_manager.close()
+        if hasattr(asr_service, "close"):
+            asr_service.close()
         print("Goodbye.")
         sys.exit(0)
 
@@ -0,0 +1,268 @@
+import math
+import re
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from app.config import Config
+from app.llm.prompts import CONTEXT_SUMMARY_PROMPT, FALLBACK_RESPONSES
+from app.memory.store import CONTEXT_HEADER, ConversationStore, Turn, render_turn
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English BPE vocabularies.
+    return math.ceil(len(text) / 4)
+
+
+def create_token_counter(client, config: Config) -> Callable[[str], int]:
+    # Counts with the tokenizer of the backend that will see the prompt: the
+    # local model's own tokenizer, tiktoken for OpenRouter models, and a
+    # character estimate when neither is available.
+    tokenizer = getattr(client, "tokenizer", None)
+    if tokenizer is not None:
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(config.openrouter_model.split("/")[-1])
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens
+
+
+class BackendLimits:
+    # Token counter and context budget of the most restrictive backend the
+    # router can currently send a turn to: local models (those with their
+    # own tokenizer) get context_token_budget, remote ones the larger
+    # remote_context_token_budget. A local fallback that finishes loading
+    # later tightens the budget from then on.
+
+    def __init__(self, llm, config: Config):
+        self.llm = llm
+        self.config = config
+        self.counters: Dict[int, Callable[[str], int]] = {}
+
+    def budget_for(self, client) -> int:
+        if getattr(client, "tokenizer", None) is not None:
+            return self.config.context_token_budget
+        return self.config.remote_context_token_budget
+
+    def __call__(self) -> Tuple[Callable[[str], int], int]:
+        clients = (self.llm.get_clients() if hasattr(self.llm, "get_clients") else None) or [self.llm]
+        client = min(clients, key=self.budget_for)
+        counter = self.counters.get(id(client))
+        if counter is None:
+            counter = self.counters[id(client)] = create_token_counter(client, self.config)
+        return counter, self.budget_for(client)
+
+
+class ContextEntry:
+    def __init__(self, turn: Turn, line: str, tokens: int):
+        self.turn = turn
+        self.truncated = turn.truncated
+        self.line = line
+        self.tokens = tokens
+
+
+class ContextBuilder:
+    # Builds the prompt context newest-first within a token budget. Turns that
+    # no longer fit are folded into a running summary on a background worker,
+    # so the prompt stays the same size however long the session runs.
+    # `limits` returns the (count_tokens, budget) to build for, e.g. a
+    # BackendLimits; it is checked on every build.
+
+    def __init__(
+        self,
+        store: ConversationStore,
+        limits: Callable[[], Tuple[Callable[[str], int], int]],
+        config: Config,
+        summarize: Optional[Callable[[str, List[str], int], str]] = None
+    ):
+        self.store = store
+        self.limits = limits
+        self.config = config
+        self.summarize = summarize
+        self.entries: Deque[ContextEntry] = deque()
+        self.synced = 0
+        self.lock = threading.Lock()
+        self.count_tokens, self.budget = limits()
+        self.header_tokens = self.count_tokens("\n".join(CONTEXT_HEADER))
+        self.summary = ""
+        self.summary_tokens = 0
+        self.pending: List[ContextEntry] = []
+        self.summarizing = False
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.stats: Counter = Counter()
+
+    def _apply_limits(self) -> None:
+        count_tokens, self.budget = self.limits()
+        if count_tokens is self.count_tokens:
+            return
+        # A different backend's tokenizer: recount what is kept.
+        self.count_tokens = count_tokens
+        self.header_tokens = count_tokens("\n".join(CONTEXT_HEADER))
+        self.summary_tokens = count_tokens(self.summary)
+        for entry in self.entries:
+            entry.tokens = count_tokens(entry.line)
+        for entry in self.pending:
+            entry.tokens = count_tokens(entry.line)
+        self.stats["recounts"] += 1
+
+    def _sync(self) -> None:
+        turns = self.store.turns
+        for turn in turns[self.synced:]:
+            line = render_turn(turn)
+            self.entries.append(ContextEntry(turn, line, self.count_tokens(line)))
+        self.synced = len(turns)
+        for entry in self.entries:
+            if entry.truncated != entry.turn.truncated:
+                entry.truncated = entry.turn.truncated
+                entry.line = render_turn(entry.turn)
+                entry.tokens = self.count_tokens(entry.line)
+
+    def _fit(self, entries: List[ContextEntry], budget: int) -> int:
+        # Number of newest entries that fit; the newest is always kept, and
+        # clipped by build() if it is over the budget on its own.
+        used = 0
+        kept = 0
+        for entry in reversed(entries):
+            if kept and (used + entry.tokens > budget or kept >= self.config.max_context_turns):
+                break
+            used += entry.tokens
+            kept += 1
+        return kept
+
+    def turn_budget(self) -> int:
+        reserved = self.config.context_summary_tokens if self.summarize else 0
+        return self.budget - self.header_tokens - reserved
+
+    def build(self, pending_primary: Optional[str] = None) -> str:
+        # `pending_primary` renders the context as if that patient turn had
+        # been added, without adding it or evicting anything.
+        with self.lock:
+            self._apply_limits()
+            self._sync()
+            entries = list(self.entries)
+            if pending_primary is not None:
+                turn = Turn(speaker="PRIMARY", text=pending_primary, role="primary")
+                line = render_turn(turn)
+                entries.append(ContextEntry(turn, line, self.count_tokens(line)))
+            turn_budget = self.turn_budget()
+            kept = self._fit(entries, turn_budget)
+            if pending_primary is None:
+                self._evict(len(entries) - kept)
+            lines = [entry.line for entry in entries[len(entries) - kept:]]
+            if lines and entries[-1].tokens > turn_budget:
+                lines[-1] = self._clip_entry(entries[-1], turn_budget)
+            summary = self.summary
+
+        context_parts = list(CONTEXT_HEADER)
+        if summary:
+            context_parts.append(f"EARLIER IN THE SESSION: {summary}")
+            context_parts.append("")
+        context_parts.extend(lines or ["(Session just started)"])
+        return "\n".join(context_parts)
+
+    def _clip_entry(self, entry: ContextEntry, budget: int) -> str:
+        # A single turn longer than the whole budget: keep its latest words,
+        # counted with the speaker prefix they are rendered with.
+        turn = entry.turn
+        text = self.clip(turn.text, budget, lambda text: self.count_tokens(render_turn(replace(turn, text=text))))
+        self.stats["clipped_turns"] += 1
+        return render_turn(replace(turn, text=text))
+
+    def _evict(self, count: int) -> None:
+        if count <= 0:
+            return
+        evicted = [self.entries.popleft() for _ in range(count)]
+        self.stats["evicted_turns"] += count
+        if not self.summarize:
+            return
+        self.pending.extend(evicted)
+        if not self.summarizing and len(self.pending) >= self.config.context_summary_batch:
+            self.summarizing = True
+            self.executor.submit(self._summarize_pending)
+
+    def _take_batch(self) -> List[str]:
+        # As many pending turns as fit the budget next to the summary, so the
+        # summary prompt itself never overflows the model; the rest wait for
+        # the next pass. At least one turn is taken per pass.
+        used = self.summary_tokens
+        taken = 0
+        for entry in self.pending:
+            if taken and used + entry.tokens > self.budget:
+                break
+            used += entry.tokens
+            taken += 1
+        batch, self.pending = self.pending[:taken], self.pending[taken:]
+        return [entry.line for entry in batch]
+
+    def _summarize_pending(self) -> None:
+        # Runs until the pending turns are drained; turns evicted while a
+        # summary is being written are picked up by a later pass.
+        while True:
+            with self.lock:
+                if not self.pending:
+                    self.summarizing = False
+                    return
+                lines = self._take_batch()
+                summary = self.summary
+                count_tokens = self.count_tokens
+            try:
+                updated = self.summarize(summary, lines, self.config.context_summary_tokens)
+            except Exception as e:
+                print(f"\n⚠ Context summary failed: {e}")
+                updated = ""
+            extractive = not updated or updated in FALLBACK_RESPONSES
+            if extractive:
+                updated = self.extractive_summary(summary, lines)
+            updated = self.clip(updated, self.config.context_summary_tokens, count_tokens)
+            tokens = count_tokens(updated)
+            with self.lock:
+                self.summary = updated
+                self.summary_tokens = tokens
+                self.stats["extractive_summaries" if extractive else "summaries"] += 1
+
+    def extractive_summary(self, summary: str, lines: List[str]) -> str:
+        # Without a model: the first sentence of each evicted patient turn.
+        points = [summary] if summary else []
+        for line in lines:
+            if line.startswith("PATIENT: "):
+                points.append(SENTENCE_END.split(line[len("PATIENT: "):], maxsplit=1)[0])
+        return " ".join(points)
+
+    def clip(self, text: str, budget: int, count_tokens: Optional[Callable[[str], int]] = None) -> str:
+        # Drops the oldest words until the text fits the budget.
+        count_tokens = count_tokens or self.count_tokens
+        words = text.split()
+        while words and count_tokens(" ".join(words)) > budget:
+            words = words[max(1, len(words) // 10):]
+        return " ".join(words)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            stats["window_turns"] = len(self.entries)
+            stats["window_tokens"] = sum(entry.tokens for entry in self.entries)
+            stats["summary_tokens"] = self.summary_tokens
+            stats["pending_turns"] = len(self.pending)
+        return stats
+
+
+def llm_summarizer(llm) -> Callable[[str, List[str], int], str]:
+    def summarize(summary: str, lines: List[str], budget: int) -> str:
+        prompt = CONTEXT_SUMMARY_PROMPT.format(
+            summary=summary or "(nothing yet)",
+            turns="\n".join(lines),
+            words=max(10, int(budget * 0.75))
+        )
+        return llm.generate(prompt, max_new_tokens=budget, temperature=0.3, purpose="summary").strip()
+    return summarize
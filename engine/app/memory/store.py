@@ -1,4 +1,5 @@
-from typing import List, Dict, Optional
+from collections import Counter, deque
+from typing import Deque, List, Dict, Optional
 from dataclasses import dataclass, field
 
 
@@ -7,56 +8,104 @@ class Turn:
     speaker: str
     text: str
     role: str
+    truncated: bool = False
+
+
+CONTEXT_HEADER = [
+    "THERAPY TRAINING SESSION:",
+    "(PRIMARY = Patient, Agents = Student Therapists)",
+    "",
+]
+
+
+def render_turn(turn: Turn) -> str:
+    if turn.speaker == "PRIMARY":
+        return f"PATIENT: {turn.text}"
+    if turn.truncated:
+        return f"STUDENT {turn.speaker}: {turn.text} (interrupted by patient)"
+    return f"STUDENT {turn.speaker}: {turn.text}"
 
 
 class ConversationStore:
-    def __init__(self, similarity_window: int = 5):
+    def __init__(self, similarity_window: int = 5, context_window: int = 20):
         self.turns: List[Turn] = []
         self.active_threads: List[str] = []
         self.last_agent: Optional[str] = None
         self.last_primary_intent: Optional[str] = None
-        self.recent_agent_outputs: List[str] = []
+        self.recent_agent_outputs: Deque[str] = deque(maxlen=similarity_window)
         self.similarity_window = similarity_window
+        # Turns are rendered once, when added; build_context only joins the
+        # last few lines and caches the result until the next append.
+        self.role_counts: Counter = Counter()
+        self.context_lines: Deque[str] = deque(maxlen=context_window)
+        self.context_cache: Dict[int, str] = {}
 
-    def add_primary_turn(self, text: str, intent: str) -> None:
-        turn = Turn(speaker="PRIMARY", text=text, role="primary")
+    def _append(self, turn: Turn) -> None:
         self.turns.append(turn)
+        self.role_counts[turn.role] += 1
+        self.context_lines.append(render_turn(turn))
+        self.context_cache.clear()
+
+    def add_primary_turn(self, text: str, intent: str) -> None:
+        self._append(Turn(speaker="PRIMARY", text=text, role="primary"))
         self.last_primary_intent = intent
 
     def add_agent_turn(self, agent_name: str, text: str, strategy: str) -> None:
-        turn = Turn(speaker=agent_name, text=text, role="agent")
-        self.turns.append(turn)
+        self._append(Turn(speaker=agent_name, text=text, role="agent"))
         self.last_agent = agent_name
         self.recent_agent_outputs.append(text)
-        if len(self.recent_agent_outputs) > self.similarity_window:
-            self.recent_agent_outputs.pop(0)
+
+    def mark_last_agent_turn_truncated(self, text: Optional[str] = None) -> None:
+        for age, turn in enumerate(reversed(self.turns), start=1):
+            if turn.role == "agent" and (text is None or turn.text == text):
+                turn.truncated = True
+                if age <= len(self.context_lines):
+                    self.context_lines[-age] = render_turn(turn)
+                    self.context_cache.clear()
+                return
 
     def update_threads(self, threads: List[str]) -> None:
         self.active_threads = threads
 
     def get_recent_agent_outputs(self) -> List[str]:
-        return self.recent_agent_outputs.copy()
+        return list(self.recent_agent_outputs)
 
-    def build_context(self, max_turns: int) -> str:
-        recent_turns = self.turns[-max_turns:] if len(self.turns) > max_turns else self.turns
+    def get_recent_transcript(self, max_chars: int) -> str:
+        parts = []
+        length = 0
+        for turn in reversed(self.turns):
+            length += len(turn.text) + 1
+            if parts and length > max_chars:
+                break
+            parts.append(turn.text)
+        transcript = " ".join(reversed(parts))
+        return transcript[-max_chars:]
 
-        context_parts = ["THERAPY TRAINING SESSION:"]
-        context_parts.append("(PRIMARY = Patient, Agents = Student Therapists)")
-        context_parts.append("")
-        
-        for turn in recent_turns:
-            if turn.speaker == "PRIMARY":
-                context_parts.append(f"PATIENT: {turn.text}")
-            else:
-                context_parts.append(f"STUDENT {turn.speaker}: {turn.text}")
+    def recent_lines(self, count: int) -> List[str]:
+        if count <= 0:
+            return []
+        if count > len(self.context_lines) and len(self.turns) > len(self.context_lines):
+            # Asked for more history than the rendered window holds.
+            return [render_turn(turn) for turn in self.turns[-count:]]
+        return list(self.context_lines)[-count:]
 
-        if not recent_turns:
-            context_parts.append("(Session just started)")
+    def build_context(self, max_turns: int, pending_primary: Optional[str] = None) -> str:
+        # `pending_primary` renders the context as if that patient turn had
+        # been added, without adding it.
+        if pending_primary is not None:
+            lines = self.recent_lines(max_turns - 1)
+            lines.append(render_turn(Turn(speaker="PRIMARY", text=pending_primary, role="primary")))
+            return "\n".join(CONTEXT_HEADER + lines)
 
-        return "\n".join(context_parts)
+        context = self.context_cache.get(max_turns)
+        if context is None:
+            lines = self.recent_lines(max_turns) or ["(Session just started)"]
+            context = "\n".join(CONTEXT_HEADER + lines)
+            self.context_cache[max_turns] = context
+        return context
 
     def get_turn_count(self) -> int:
         return len(self.turns)
 
     def get_primary_turn_count(self) -> int:
-        return sum(1 for turn in self.turns if turn.role == "primary")
+        return self.role_counts["primary"]
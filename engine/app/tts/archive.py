@@ -0,0 +1,120 @@
+import gzip
+import logging
+import os
+import queue
+import threading
+import wave
+from collections import deque
+from datetime import datetime
+from typing import Deque, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMATS = ("wav", "wav.gz", "flac")
+
+
+class AudioArchiver:
+    # Writes synthesized PCM to disk on a worker thread so archival never
+    # delays playback, and keeps the archive within a file-count and size
+    # budget by deleting the oldest recordings.
+
+    def __init__(
+        self,
+        directory: str,
+        audio_format: str = "wav",
+        max_files: int = 500,
+        max_bytes: int = 500 * 1024 * 1024,
+        queue_size: int = 16,
+        sample_rate: int = 44100
+    ):
+        if audio_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unsupported archive format: {audio_format}")
+        if audio_format == "flac":
+            try:
+                import soundfile  # noqa: F401
+            except ImportError:
+                logger.warning("soundfile not installed; archiving as wav.gz instead of flac")
+                audio_format = "wav.gz"
+
+        self.directory = directory
+        self.audio_format = audio_format
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        self.written = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.files: Deque[Tuple[str, int]] = deque()
+        self.total_bytes = 0
+        for name in sorted(os.listdir(directory)):
+            if name.startswith("tts_"):
+                path = os.path.join(directory, name)
+                size = os.path.getsize(path)
+                self.files.append((path, size))
+                self.total_bytes += size
+
+        self.queue: "queue.Queue[Optional[Tuple[str, bytes]]]" = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, audio_data: bytes) -> bool:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        try:
+            self.queue.put_nowait((timestamp, audio_data))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"TTS archive queue full, dropped clip ({self.dropped} total)")
+            return False
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            timestamp, audio_data = item
+            try:
+                self._write(timestamp, audio_data)
+                self._prune()
+            except Exception as e:
+                logger.error(f"Failed to archive TTS audio: {e}")
+
+    def _write_wav(self, f, audio_data: bytes) -> None:
+        with wave.open(f, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.sample_rate)
+            wav_file.writeframes(audio_data)
+
+    def _write(self, timestamp: str, audio_data: bytes) -> None:
+        path = os.path.join(self.directory, f"tts_{timestamp}.{self.audio_format}")
+        if self.audio_format == "wav":
+            self._write_wav(path, audio_data)
+        elif self.audio_format == "wav.gz":
+            with gzip.open(path, "wb") as f:
+                self._write_wav(f, audio_data)
+        else:
+            import numpy as np
+            import soundfile
+            samples = np.frombuffer(audio_data, dtype=np.int16)
+            soundfile.write(path, samples, self.sample_rate, format="FLAC")
+
+        size = os.path.getsize(path)
+        self.files.append((path, size))
+        self.total_bytes += size
+        self.written += 1
+        logger.info(f"Saved TTS audio to {path}")
+
+    def _prune(self) -> None:
+        while self.files and (len(self.files) > self.max_files or self.total_bytes > self.max_bytes):
+            path, size = self.files.popleft()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.total_bytes -= size
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self._thread.join()
@@ -1,5 +1,6 @@
 import logging
 import io
+import threading
 import pygame
 from typing import Optional
 
@@ -15,7 +16,7 @@ class AudioPlayer:
             logger.error(f"Failed to initialize audio player: {e}")
             self.initialized = False
 
-    def play_audio(self, audio_data: bytes) -> bool:
+    def play_audio(self, audio_data: bytes, interrupt: Optional[threading.Event] = None) -> bool:
         if not self.initialized:
             logger.warning("Audio player not initialized")
             return False
@@ -26,7 +27,11 @@ class AudioPlayer:
             pygame.mixer.music.play()
             
             while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
+                if interrupt is None:
+                    pygame.time.Clock().tick(10)
+                elif interrupt.wait(0.01):
+                    pygame.mixer.music.stop()
+                    return False
             
             return True
             
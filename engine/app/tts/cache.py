@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTSCache:
+    # Two tiers: an in-memory LRU of recent clips in front of an on-disk
+    # store that evicts least recently used files once it exceeds max_bytes.
+
+    def __init__(self, cache_dir: str, memory_items: int = 128, max_bytes: int = 100 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.disk_sizes: Dict[str, int] = {}
+        for name in os.listdir(cache_dir):
+            if name.endswith(".pcm"):
+                self.disk_sizes[name[:-4]] = os.path.getsize(os.path.join(cache_dir, name))
+        self.disk_bytes = sum(self.disk_sizes.values())
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return re.sub(r"\s+", " ", text.strip().lower())
+
+    def key(self, text: str, voice_id: str, model_id: str, output_format: str = "pcm_44100") -> str:
+        raw = "\x00".join([self.normalize(text), voice_id, model_id, output_format])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pcm")
+
+    def _remember(self, key: str, audio_data: bytes) -> None:
+        self.memory[key] = audio_data
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def get(self, text: str, voice_id: str, model_id: str) -> Optional[bytes]:
+        key = self.key(text, voice_id, model_id)
+        with self.lock:
+            audio_data = self.memory.get(key)
+            if audio_data is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return audio_data
+            if key not in self.disk_sizes:
+                self.misses += 1
+                return None
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio_data = f.read()
+            os.utime(path)
+        except OSError:
+            with self.lock:
+                self.disk_bytes -= self.disk_sizes.pop(key, 0)
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.disk_hits += 1
+            self._remember(key, audio_data)
+        return audio_data
+
+    def contains(self, text: str, voice_id: str, model_id: str) -> bool:
+        key = self.key(text, voice_id, model_id)
+        with self.lock:
+            return key in self.memory or key in self.disk_sizes
+
+    def put(self, text: str, voice_id: str, model_id: str, audio_data: bytes) -> None:
+        if not audio_data:
+            return
+        key = self.key(text, voice_id, model_id)
+        with self.lock:
+            self._remember(key, audio_data)
+            if key in self.disk_sizes:
+                return
+
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(audio_data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write TTS cache entry: {e}")
+            return
+
+        with self.lock:
+            self.disk_sizes[key] = len(audio_data)
+            self.disk_bytes += len(audio_data)
+            if self.disk_bytes > self.max_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        entries = []
+        for key in self.disk_sizes:
+            try:
+                entries.append((os.path.getmtime(self._path(key)), key))
+            except OSError:
+                entries.append((0.0, key))
+        entries.sort()
+        for _, key in entries:
+            if self.disk_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self.disk_bytes -= self.disk_sizes.pop(key)
+
+    def get_stats(self) -> Dict[str, float]:
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_items": len(self.memory),
+                "disk_items": len(self.disk_sizes),
+                "disk_bytes": self.disk_bytes,
+            }
@@ -1,10 +1,8 @@
 import logging
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 from elevenlabs import ElevenLabs
-import os
-from datetime import datetime
-import wave
-import struct
+from app.tts.cache import TTSCache
+from app.tts.archive import AudioArchiver
 
 logger = logging.getLogger(__name__)
 
@@ -15,27 +13,40 @@ class ElevenLabsTTSService:
         api_key: str,
         voice_id: str = "21m00Tcm4TlvDq8ikWAM",
         timeout: int = 30,
-        tts_enabled: bool = True
+        tts_enabled: bool = True,
+        cache: Optional[TTSCache] = None,
+        archiver: Optional[AudioArchiver] = None,
+        streaming_latency: Optional[int] = None
     ):
         self.api_key = api_key
         self.voice_id = voice_id
         self.timeout = timeout
         self.tts_enabled = tts_enabled
+        self.cache = cache
+        self.archiver = archiver
+        self.streaming_latency = streaming_latency
         self.client = ElevenLabs(api_key=api_key)
-        
-        self.temp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "temp")
-        os.makedirs(self.temp_dir, exist_ok=True)
 
-    def text_to_speech(self, text: str, voice_id: str = None, language: str = "English") -> Optional[bytes]:
+    def select_model(self, language: str) -> str:
+        if language.lower() == "english" or language.lower() == "en":
+            return "eleven_turbo_v2_5"
+        return "eleven_multilingual_v2"
+
+    def archive(self, audio_data: bytes) -> None:
+        if self.archiver:
+            self.archiver.submit(audio_data)
+
+    def text_to_speech(self, text: str, voice_id: str = None, language: str = "English", archive: bool = True) -> Optional[bytes]:
         if not self.tts_enabled:
             return None
         
         use_voice = voice_id if voice_id else self.voice_id
+        model_id = self.select_model(language)
         
-        if language.lower() == "english" or language.lower() == "en":
-            model_id = "eleven_turbo_v2_5"
-        else:
-            model_id = "eleven_multilingual_v2"
+        if self.cache:
+            cached = self.cache.get(text, use_voice, model_id)
+            if cached is not None:
+                return cached
         
         try:
             audio_generator = self.client.text_to_speech.convert(
@@ -46,26 +57,70 @@ class ElevenLabsTTSService:
             )
             
             audio_data = b"".join(audio_generator)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-            wav_filename = f"tts_{timestamp}.wav"
-            wav_filepath = os.path.join(self.temp_dir, wav_filename)
-            
-            with wave.open(wav_filepath, 'wb') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(44100)
-                wav_file.writeframes(audio_data)
-            
-            logger.info(f"Saved TTS audio to {wav_filepath}")
-            
+            if archive:
+                self.archive(audio_data)
+            if self.cache:
+                self.cache.put(text, use_voice, model_id, audio_data)
             return audio_data
             
         except Exception as e:
             logger.error(f"ElevenLabs TTS error: {e}")
             return None
 
+    def stream_speech(self, text: str, voice_id: str = None, language: str = "English") -> Iterator[bytes]:
+        # Yields raw pcm_44100 chunks as they arrive from the API.
+        if not self.tts_enabled:
+            return
+        
+        use_voice = voice_id if voice_id else self.voice_id
+        model_id = self.select_model(language)
+        
+        if self.cache:
+            cached = self.cache.get(text, use_voice, model_id)
+            if cached is not None:
+                yield cached
+                return
+        
+        # The streaming endpoint sends audio while the rest is still being
+        # rendered; `convert` only starts sending once the whole clip is done.
+        # Older SDKs name it convert_as_stream.
+        endpoint = getattr(self.client.text_to_speech, "stream", None) or self.client.text_to_speech.convert_as_stream
+        options = {}
+        if self.streaming_latency is not None:
+            options["optimize_streaming_latency"] = self.streaming_latency
+        received = []
+        try:
+            audio_generator = endpoint(
+                voice_id=use_voice,
+                text=text,
+                model_id=model_id,
+                output_format="pcm_44100",
+                **options
+            )
+            for chunk in audio_generator:
+                received.append(chunk)
+                yield chunk
+        except Exception as e:
+            logger.error(f"ElevenLabs TTS error: {e}")
+            return
+        
+        audio_data = b"".join(received)
+        self.archive(audio_data)
+        if self.cache:
+            self.cache.put(text, use_voice, model_id, audio_data)
 
-
-
-
+    def warm_cache(self, phrases: Iterable[str], voice_ids: Iterable[str], language: str = "English") -> int:
+        # Pre-synthesizes phrases that are spoken over and over (fallbacks) so
+        # they never need a network round-trip at runtime.
+        if not self.cache:
+            return 0
+        model_id = self.select_model(language)
+        synthesized = 0
+        for voice_id in voice_ids:
+            for phrase in phrases:
+                if self.cache.contains(phrase, voice_id, model_id):
+                    continue
+                if self.text_to_speech(phrase, voice_id=voice_id, language=language, archive=False):
+                    synthesized += 1
+        logger.info(f"TTS cache warmed ({synthesized} new clips)")
+        return synthesized
@@ -0,0 +1,120 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional
+import pyaudio
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class PCMStreamPlayer:
+    # Plays 16-bit mono PCM as it arrives through one output stream that is
+    # opened once and kept for the whole session.
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.sample_rate = config.tts_sample_rate
+        self.bytes_per_second = self.sample_rate * 2
+        self.jitter_bytes = int(self.bytes_per_second * config.tts_jitter_buffer_ms / 1000) // 2 * 2
+        self.frame_bytes = config.tts_output_frames * 2
+        self.frame_seconds = config.tts_output_frames / self.sample_rate
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.sample_rate,
+            output=True,
+            frames_per_buffer=config.tts_output_frames
+        )
+
+        self.plays = 0
+        self.underruns = 0
+        self.first_sample_latencies = deque(maxlen=1000)
+
+    def _produce(self, chunks: Iterable[bytes], out: queue.Queue, stop: threading.Event) -> None:
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    break
+                if chunk:
+                    out.put(chunk)
+        except Exception as e:
+            logger.error(f"PCM stream source error: {e}")
+        finally:
+            out.put(None)
+
+    def play_stream(self, chunks: Iterable[bytes], interrupt: Optional[threading.Event] = None) -> bool:
+        # Returns True if the stream played to the end, False if it was
+        # interrupted or produced no audio.
+        requested_at = time.monotonic()
+        incoming: queue.Queue = queue.Queue()
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(chunks, incoming, stop), daemon=True)
+        producer.start()
+
+        pending = bytearray()
+        playing = False
+        finished = False
+        play_started = 0.0
+        bytes_written = 0
+        starving = False
+        try:
+            while True:
+                if interrupt is not None and interrupt.is_set():
+                    return False
+
+                if not finished and (not playing or len(pending) < self.frame_bytes):
+                    try:
+                        chunk = incoming.get(timeout=0.01)
+                    except queue.Empty:
+                        chunk = b""
+                    if chunk is None:
+                        finished = True
+                    elif chunk:
+                        starving = False
+                        pending.extend(chunk)
+                    elif playing and not starving and len(pending) < self.frame_bytes and time.monotonic() > play_started + bytes_written / self.bytes_per_second + self.frame_seconds:
+                        # The device has drained everything we wrote and no
+                        # new audio has arrived: an audible gap.
+                        starving = True
+                        self.underruns += 1
+
+                if not playing:
+                    if len(pending) < self.jitter_bytes and not finished:
+                        continue
+                    if not pending:
+                        return False
+                    playing = True
+                    play_started = time.monotonic()
+                    self.plays += 1
+                    self.first_sample_latencies.append(play_started - requested_at)
+
+                if len(pending) >= self.frame_bytes or (finished and pending):
+                    size = min(len(pending), self.frame_bytes)
+                    size -= size % 2
+                    if size == 0:
+                        pending.clear()
+                        continue
+                    self.stream.write(bytes(pending[:size]))
+                    del pending[:size]
+                    bytes_written += size
+                elif finished:
+                    return True
+        finally:
+            stop.set()
+
+    def get_stats(self) -> Dict[str, float]:
+        latencies = sorted(self.first_sample_latencies)
+        stats = {"plays": self.plays, "underruns": self.underruns}
+        if latencies:
+            stats["mean_time_to_first_sample_ms"] = 1000 * sum(latencies) / len(latencies)
+            stats["p95_time_to_first_sample_ms"] = 1000 * latencies[int(0.95 * (len(latencies) - 1))]
+        return stats
+
+    def close(self) -> None:
+        self.stream.stop_stream()
+        self.stream.close()
+        self.audio.terminate()
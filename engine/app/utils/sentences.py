@@ -0,0 +1,23 @@
+import re
+from typing import Iterable, Iterator
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.?!])\s+")
+
+
+def iter_sentences(deltas: Iterable[str], min_chars: int = 8) -> Iterator[str]:
+    # Regroups streamed text deltas into sentences, emitting each one as soon
+    # as the whitespace after its terminating punctuation has arrived.
+    buffer = ""
+    for delta in deltas:
+        buffer += delta
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(buffer):
+            sentence = buffer[start:match.start()].strip()
+            if len(sentence) < min_chars:
+                continue
+            yield sentence
+            start = match.end()
+        buffer = buffer[start:]
+    tail = buffer.strip()
+    if tail:
+        yield tail
@@ -1,36 +1,143 @@
-from typing import List
+from collections import OrderedDict, defaultdict
+from typing import Dict, FrozenSet, List, Optional, Set
 import re
+import threading
+import zlib
+import numpy as np
+
+NON_ALPHANUMERIC = re.compile(r"[^a-z0-9\s]")
+WHITESPACE = re.compile(r"\s+")
+
+
+class MinHashIndex:
+    # Locality-sensitive index over token sets. Each set gets bands * rows
+    # MinHash values; sets sharing any band land in the same bucket. With 20
+    # bands of 3 rows, pairs at Jaccard 0.6 collide with probability ~0.99
+    # and pairs below 0.2 rarely do, so a query only verifies a handful of
+    # candidates no matter how long the session is.
+
+    def __init__(self, bands: int = 20, rows: int = 3, seed: int = 1):
+        self.bands = bands
+        self.rows = rows
+        rng = np.random.default_rng(seed)
+        count = bands * rows
+        # Multiply-shift hashing: (a * x + b) mod 2**64, keeping the high bits.
+        self.a = rng.integers(0, np.iinfo(np.uint64).max, size=count, dtype=np.uint64, endpoint=True) | np.uint64(1)
+        self.b = rng.integers(0, np.iinfo(np.uint64).max, size=count, dtype=np.uint64, endpoint=True)
+        self.buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(bands)]
+        self.sets: List[FrozenSet[str]] = []
+
+    def signature(self, tokens: FrozenSet[str]) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(token.encode()) for token in tokens), dtype=np.uint64, count=len(tokens))
+        return ((np.outer(hashes, self.a) + self.b) >> np.uint64(32)).min(axis=0)
+
+    def band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, tokens: FrozenSet[str]) -> None:
+        if not tokens:
+            return
+        doc_id = len(self.sets)
+        self.sets.append(tokens)
+        for bucket, key in zip(self.buckets, self.band_keys(self.signature(tokens))):
+            bucket[key].append(doc_id)
+
+    def candidates(self, tokens: FrozenSet[str]) -> Set[int]:
+        found: Set[int] = set()
+        if tokens:
+            for bucket, key in zip(self.buckets, self.band_keys(self.signature(tokens))):
+                found.update(bucket.get(key, ()))
+        return found
+
+    def max_similarity(self, tokens: FrozenSet[str]) -> float:
+        # Exact Jaccard against the LSH candidates only.
+        return max((jaccard(tokens, self.sets[doc_id]) for doc_id in self.candidates(tokens)), default=0.0)
+
+    def __len__(self) -> int:
+        return len(self.sets)
+
+
+def jaccard(tokens1: FrozenSet[str], tokens2: FrozenSet[str]) -> float:
+    if not tokens1 or not tokens2:
+        return 0.0
+    return len(tokens1 & tokens2) / len(tokens1 | tokens2)
 
 
 class SimilarityChecker:
-    def __init__(self, threshold: float = 0.6):
+    def __init__(
+        self,
+        threshold: float = 0.6,
+        scope: str = "window",
+        cache_size: int = 512,
+        session_threshold: Optional[float] = None
+    ):
         self.threshold = threshold
+        # "window" compares against the recent outputs passed in; "session"
+        # also checks every agent turn recorded with add(), against its own
+        # (usually stricter) threshold so that older turns only count when
+        # repeated nearly word for word.
+        self.index: Optional[MinHashIndex] = MinHashIndex() if scope == "session" else None
+        self.session_threshold = threshold if session_threshold is None else session_threshold
+        self.cache_size = cache_size
+        self.token_cache: "OrderedDict[str, FrozenSet[str]]" = OrderedDict()
+        # Turns are checked from the response workers and the speculation
+        # thread at once.
+        self.lock = threading.Lock()
 
     def normalize(self, text: str) -> str:
         text = text.lower()
-        text = re.sub(r"[^a-z0-9\s]", "", text)
-        text = re.sub(r"\s+", " ", text)
+        text = NON_ALPHANUMERIC.sub("", text)
+        text = WHITESPACE.sub(" ", text)
         return text.strip()
 
-    def tokenize(self, text: str) -> set:
-        normalized = self.normalize(text)
-        return set(normalized.split())
-
-    def jaccard_similarity(self, text1: str, text2: str) -> float:
-        tokens1 = self.tokenize(text1)
-        tokens2 = self.tokenize(text2)
+    def tokenize(self, text: str) -> FrozenSet[str]:
+        with self.lock:
+            tokens = self.token_cache.get(text)
+            if tokens is not None:
+                self.token_cache.move_to_end(text)
+                return tokens
+        tokens = frozenset(self.normalize(text).split())
+        with self.lock:
+            self.token_cache[text] = tokens
+            if len(self.token_cache) > self.cache_size:
+                self.token_cache.popitem(last=False)
+        return tokens
 
-        if not tokens1 or not tokens2:
-            return 0.0
+    def add(self, text: str) -> None:
+        if self.index is not None:
+            tokens = self.tokenize(text)
+            with self.lock:
+                self.index.add(tokens)
 
-        intersection = tokens1.intersection(tokens2)
-        union = tokens1.union(tokens2)
+    def jaccard_similarity(self, text1: str, text2: str) -> float:
+        return jaccard(self.tokenize(text1), self.tokenize(text2))
 
-        return len(intersection) / len(union)
+    def max_similarity(self, candidate: str, recent_outputs: List[str]) -> float:
+        tokens = self.tokenize(candidate)
+        similarity = max((jaccard(tokens, self.tokenize(output)) for output in recent_outputs), default=0.0)
+        if self.index is not None and similarity < 1.0:
+            similarity = max(similarity, self.index.max_similarity(tokens))
+        return similarity
 
     def is_too_similar(self, candidate: str, recent_outputs: List[str]) -> bool:
+        tokens = self.tokenize(candidate)
+        for output in recent_outputs:
+            if jaccard(tokens, self.tokenize(output)) >= self.threshold:
+                return True
+        return self.index is not None and self.index.max_similarity(tokens) >= self.session_threshold
+
+    def is_too_similar_prefix(self, clause: str, recent_outputs: List[str], min_tokens: int = 3) -> bool:
+        # For a response still being generated: compare its opening clause
+        # with the same-length opening of each recent output.
+        words = self.normalize(clause).split()
+        if len(words) < min_tokens:
+            return False
+        clause_tokens = set(words)
         for output in recent_outputs:
-            similarity = self.jaccard_similarity(candidate, output)
+            prefix_tokens = set(self.normalize(output).split()[:len(words)])
+            if not prefix_tokens:
+                continue
+            similarity = len(clause_tokens & prefix_tokens) / len(clause_tokens | prefix_tokens)
             if similarity >= self.threshold:
                 return True
         return False
@@ -0,0 +1,91 @@
+"""
+Benchmark the local FLAN backends: load time, tokens/s and peak RSS.
+
+Usage: python bench_flan.py [backend ...]
+Each backend runs in its own process so peak RSS is measured in isolation.
+"""
+import json
+import resource
+import subprocess
+import sys
+import time
+
+PROMPTS = [
+    "You are a student therapist. A patient just said: \"I've been feeling anxious.\"\n\nAsk ONE brief therapeutic question (under 15 words):",
+    "You are a student therapist. A patient just said: \"My sister and I stopped talking after the wedding.\"\n\nAsk ONE brief therapeutic question (under 15 words):",
+    "You are a student therapist. A patient just said: \"I can't sleep because work keeps running through my head.\"\n\nAsk ONE brief therapeutic question (under 15 words):",
+    "You are a student therapist. A patient just said: \"I don't really know why I came here today.\"\n\nAsk ONE brief therapeutic question (under 15 words):",
+]
+ROUNDS = 3
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_backend(backend: str) -> dict:
+    from app.config import Config
+    from app.llm.flan import create_flan_client
+
+    config = Config()
+    config.flan_backend = backend
+
+    started = time.perf_counter()
+    client = create_flan_client(config)
+    load_seconds = time.perf_counter() - started
+
+    client.generate(PROMPTS[0], max_new_tokens=8)  # warm-up
+
+    tokens = 0
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        for prompt in PROMPTS:
+            output = client.generate(prompt, max_new_tokens=64)
+            tokens += len(client.tokenizer(output)["input_ids"])
+    elapsed = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "threads": client.num_threads,
+        "load_s": load_seconds,
+        "tokens_per_s": tokens / elapsed,
+        "latency_ms": 1000 * elapsed / (ROUNDS * len(PROMPTS)),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        print(json.dumps(run_backend(sys.argv[2])))
+        sys.exit(0)
+
+    from app.llm.flan import FLAN_BACKENDS
+    backends = sys.argv[1:] or list(FLAN_BACKENDS)
+
+    results = []
+    for backend in backends:
+        print(f"Benchmarking {backend}...")
+        proc = subprocess.run(
+            [sys.executable, __file__, "--child", backend],
+            capture_output=True,
+            text=True
+        )
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()
+            print(f"  ❌ {backend} failed: {error[-1] if error else 'unknown error'}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    if not results:
+        sys.exit(1)
+
+    baseline = next((r for r in results if r["backend"] == "transformers"), None)
+    print(f"\n{'backend':<12} {'threads':>7} {'load s':>8} {'tok/s':>8} {'ms/call':>8} {'RSS MB':>8} {'speedup':>8}")
+    for r in results:
+        speedup = f"{r['tokens_per_s'] / baseline['tokens_per_s']:.2f}x" if baseline else "-"
+        print(
+            f"{r['backend']:<12} {r['threads']:>7} {r['load_s']:>8.1f} {r['tokens_per_s']:>8.1f} "
+            f"{r['latency_ms']:>8.0f} {r['peak_rss_mb']:>8.0f} {speedup:>8}"
+        )
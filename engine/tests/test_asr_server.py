@@ -0,0 +1,93 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.asr.asr_server import ASRServer, RemoteASRService
+from app.asr.batching import ASRRequest, MicroBatcher
+
+AUTHKEY = b"test-key"
+
+
+class EchoService:
+    # Stands in for BatchedASRService: same submit() and batching, but the
+    # "decode" reports which session and how many samples each request had.
+
+    def __init__(self, max_wait=0.2):
+        self.batches = []
+        self.batcher = MicroBatcher(self.decode, max_batch_size=8, max_wait=max_wait)
+
+    def decode(self, batch):
+        self.batches.append(sorted(request.session for request in batch))
+        if any(request.initial_prompt == "fail" for request in batch):
+            raise ValueError("bad audio")
+        return [(f"{request.session} {len(request.audio)}", request.language or "en", 1.0) for request in batch]
+
+    def submit(self, audio, language=None, initial_prompt=None, session=""):
+        return self.batcher.submit(ASRRequest(audio, language, initial_prompt, session=session))
+
+    def get_stats(self):
+        return self.batcher.get_stats()
+
+
+@pytest.fixture
+def server():
+    service = EchoService()
+    server = ASRServer(service, "127.0.0.1:0", authkey=AUTHKEY)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.close()
+    service.batcher.shutdown()
+
+
+def transcribe_concurrently(calls):
+    results = [None] * len(calls)
+
+    def run(index, client, samples):
+        results[index] = client.transcribe(np.zeros(samples, dtype=np.float32))
+
+    threads = [threading.Thread(target=run, args=(index, *call)) for index, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_micro_batcher_mixes_sessions():
+    service = EchoService()
+    futures = [
+        service.submit(np.zeros(10), session="station-a"),
+        service.submit(np.zeros(20), session="station-b"),
+    ]
+    assert [future.result()[0] for future in futures] == ["station-a 10", "station-b 20"]
+    assert service.batches == [["station-a", "station-b"]]
+    stats = service.get_stats()
+    assert stats["mixed_batches"] == 1
+    assert stats["sessions"] == 2
+    service.batcher.shutdown()
+
+
+def test_stations_share_batches_through_the_server(server):
+    station_a = RemoteASRService(server.address, session="station-a", authkey=AUTHKEY)
+    station_b = RemoteASRService(server.address, session="station-b", authkey=AUTHKEY)
+    results = transcribe_concurrently([(station_a, 100), (station_b, 200), (station_a, 300)])
+    assert [text for text, _, _ in results] == ["station-a 100", "station-b 200", "station-a 300"]
+    assert ["station-a", "station-a", "station-b"] in server.service.batches
+    assert station_b.get_stats()["mixed_batches"] >= 1
+    station_a.close()
+    station_b.close()
+
+
+def test_errors_are_raised_on_the_calling_station(server):
+    station = RemoteASRService(server.address, session="station-a", authkey=AUTHKEY)
+    with pytest.raises(RuntimeError, match="bad audio"):
+        station.transcribe(np.zeros(10, dtype=np.float32), initial_prompt="fail")
+    assert station.transcribe(np.zeros(10, dtype=np.float32))[0] == "station-a 10"
+    station.close()
+
+
+def test_wrong_authkey_is_refused(server):
+    station = RemoteASRService(server.address, session="intruder", authkey=b"wrong")
+    with pytest.raises(Exception):
+        station.transcribe(np.zeros(10, dtype=np.float32))
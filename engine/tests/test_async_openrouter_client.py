@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("openai")
+
+from app.llm.async_openrouter_client import AsyncOpenRouterClient, DeadlineExceeded
+
+
+class StubServer:
+    # Local stand-in for the OpenRouter chat completions endpoint. Each
+    # request pops the next (status, delay) from the script; once the script
+    # runs out every request succeeds immediately.
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.lock = threading.Lock()
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("content-length", 0)))
+                with stub.lock:
+                    stub.requests += 1
+                    status, delay = stub.script.pop(0) if stub.script else (200, 0.0)
+                time.sleep(delay)
+                if status == 200:
+                    body = json.dumps({
+                        "id": "stub",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": "stub",
+                        "choices": [{
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": f"reply {stub.requests}?"}
+                        }],
+                        "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8}
+                    }).encode()
+                else:
+                    body = json.dumps({"error": {"message": "unavailable"}}).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("content-type", "application/json")
+                    self.send_header("content-length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def make_client():
+    opened = []
+
+    def make(script, **kwargs):
+        server = StubServer(script)
+        client = AsyncOpenRouterClient(api_key="test", base_url=server.base_url, **kwargs)
+        opened.append((server, client))
+        return server, client
+
+    yield make
+    for server, client in opened:
+        client.close()
+        server.close()
+
+
+def test_retries_server_errors_within_deadline(make_client):
+    server, client = make_client([(503, 0.0), (429, 0.0)], max_retries=2, retry_base_delay=0.01)
+    assert client.complete("hello", deadline=5.0) == "reply 3?"
+    assert server.requests == 3
+    assert client.get_stats()["retries"] == 2
+
+
+def test_gives_up_after_max_retries(make_client):
+    server, client = make_client([(503, 0.0)] * 2, max_retries=1, retry_base_delay=0.01)
+    with pytest.raises(Exception):
+        client.complete("hello", deadline=5.0)
+    assert server.requests == 2
+    assert client.generate("hello") == "reply 3?"
+
+
+def test_deadline_bounds_a_slow_request(make_client):
+    _, client = make_client([(200, 2.0)], max_retries=0)
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        client.complete("hello", deadline=0.3)
+    assert time.monotonic() - started < 1.5
+    assert client.get_stats()["deadline_exceeded"] == 1
+
+
+def test_hedge_answers_from_the_faster_duplicate(make_client):
+    server, client = make_client([(200, 2.0)], hedge=True, hedge_min_delay=0.1)
+    started = time.monotonic()
+    assert client.complete("hello", deadline=5.0) == "reply 2?"
+    assert time.monotonic() - started < 1.5
+    stats = client.get_stats()
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+
+
+def test_close_is_idempotent(make_client):
+    _, client = make_client([])
+    client.complete("hello")
+    client.close()
+    client.close()
+    assert client.loop is None
@@ -0,0 +1,185 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("torch")
+
+from app.llm.prompts import FALLBACK_RESPONSES
+from app.memory.context import BackendLimits, ContextBuilder
+from app.memory.store import ConversationStore
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def make_config(**overrides):
+    values = dict(
+        max_context_turns=20,
+        context_token_budget=60,
+        remote_context_token_budget=200,
+        context_summary_tokens=12,
+        context_summary_batch=2
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def fill(store, turns):
+    for index in range(turns):
+        store.add_primary_turn(f"patient turn {index} about my week.", "INFORMATION")
+        store.add_agent_turn("1", f"question {index} for you?", "PROBE_DETAILS")
+
+
+def flush(builder):
+    # The summary worker is single-threaded; this waits for queued passes.
+    builder.executor.submit(lambda: None).result()
+
+
+def test_context_stays_within_budget_and_keeps_the_newest_turns():
+    store = ConversationStore()
+    builder = ContextBuilder(store, lambda: (count_words, 60), make_config())
+    fill(store, 30)
+    context = builder.build()
+    assert count_words(context) <= 60
+    assert context.endswith("STUDENT 1: question 29 for you?")
+    assert builder.get_stats()["evicted_turns"] > 0
+
+
+def test_pending_primary_is_included_without_evicting():
+    store = ConversationStore()
+    builder = ContextBuilder(store, lambda: (count_words, 60), make_config())
+    fill(store, 3)
+    builder.build()
+    evicted = builder.get_stats().get("evicted_turns", 0)
+    context = builder.build(pending_primary="still talking")
+    assert context.endswith("PATIENT: still talking")
+    assert builder.get_stats().get("evicted_turns", 0) == evicted
+    assert store.get_turn_count() == 6
+
+
+def test_over_budget_turn_keeps_its_latest_words():
+    store = ConversationStore()
+    builder = ContextBuilder(store, lambda: (count_words, 60), make_config())
+    fill(store, 2)
+    words = [f"word{index}" for index in range(600)]
+    store.add_primary_turn(" ".join(words), "INFORMATION")
+    context = builder.build()
+    assert count_words(context) <= 60
+    assert context.endswith("word599")
+    assert "\nPATIENT: word" in context
+    assert builder.get_stats()["clipped_turns"] == 1
+    # The store keeps the whole turn.
+    assert store.turns[-1].text.split() == words
+
+
+def test_over_budget_pending_primary_is_clipped():
+    store = ConversationStore()
+    builder = ContextBuilder(store, lambda: (count_words, 60), make_config())
+    context = builder.build(pending_primary=" ".join(["very"] * 200) + " tired")
+    assert count_words(context) <= 60
+    assert context.endswith("very tired")
+
+
+def test_truncated_turn_is_rendered_again():
+    store = ConversationStore()
+    builder = ContextBuilder(store, lambda: (count_words, 60), make_config())
+    fill(store, 1)
+    builder.build()
+    store.mark_last_agent_turn_truncated()
+    assert builder.build().endswith("(interrupted by patient)")
+
+
+def test_evicted_turns_are_summarized():
+    calls = []
+
+    def summarize(summary, lines, budget):
+        calls.append(lines)
+        return f"{len(calls)} summaries"
+
+    store = ConversationStore()
+    builder = ContextBuilder(store, lambda: (count_words, 60), make_config(), summarize=summarize)
+    fill(store, 10)
+    builder.build()
+    flush(builder)
+    context = builder.build()
+    assert f"EARLIER IN THE SESSION: {len(calls)} summaries" in context
+    assert count_words(context) <= 60
+    assert builder.get_stats()["summaries"] == len(calls)
+
+
+def test_summary_batches_fit_the_budget():
+    batches = []
+
+    def summarize(summary, lines, budget):
+        batches.append((summary, lines))
+        return "short summary"
+
+    store = ConversationStore()
+    builder = ContextBuilder(store, lambda: (count_words, 60), make_config(), summarize=summarize)
+    fill(store, 40)
+    builder.build()
+    flush(builder)
+    assert len(batches) > 1
+    for summary, lines in batches:
+        assert count_words(summary) + sum(count_words(line) for line in lines) <= 60
+    assert builder.get_stats()["pending_turns"] == 0
+
+
+def test_failed_summary_falls_back_to_extracts():
+    store = ConversationStore()
+    builder = ContextBuilder(
+        store, lambda: (count_words, 60), make_config(context_summary_tokens=40),
+        summarize=lambda summary, lines, budget: FALLBACK_RESPONSES[2]
+    )
+    fill(store, 8)
+    builder.build()
+    flush(builder)
+    # Clipped to the summary budget from the oldest end.
+    assert builder.summary.endswith("patient turn 6 about my week. patient turn 7 about my week.")
+    assert count_words(builder.summary) <= 40
+    assert builder.get_stats()["extractive_summaries"] >= 1
+
+
+def test_switching_backend_limits_recounts():
+    limits = {"value": (count_words, 200)}
+    store = ConversationStore()
+    builder = ContextBuilder(store, lambda: limits["value"], make_config())
+    fill(store, 12)
+    long_context = builder.build()
+
+    limits["value"] = (lambda text: 2 * count_words(text), 60)
+    context = builder.build()
+    assert 2 * count_words(context) <= 60
+    assert len(context) < len(long_context)
+    assert builder.get_stats()["recounts"] == 1
+
+
+class FakeTokenizer:
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+
+def test_backend_limits_use_the_most_restrictive_backend():
+    remote = SimpleNamespace()
+    local = SimpleNamespace(tokenizer=FakeTokenizer())
+    clients = [remote]
+    llm = SimpleNamespace(get_clients=lambda: list(clients))
+    config = make_config(openrouter_model="openai/gpt-4o-mini")
+    limits = BackendLimits(llm, config)
+
+    _, budget = limits()
+    assert budget == 200
+
+    clients.append(local)
+    count_tokens, budget = limits()
+    assert budget == 60
+    assert count_tokens("one two three") == 3
+    assert limits()[0] is count_tokens
+
+
+def test_backend_limits_accept_a_bare_client():
+    local = SimpleNamespace(tokenizer=FakeTokenizer())
+    count_tokens, budget = BackendLimits(local, make_config())()
+    assert budget == 60
+    assert count_tokens("a b") == 2
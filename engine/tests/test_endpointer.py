@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("torch")
+
+from app.config import Config
+from app.audio.endpointer import Endpointer
+
+
+def make_config(**overrides):
+    config = Config()
+    config.chunk_size = 1600
+    config.sample_rate = 16000  # 0.1 s chunks
+    config.silence_duration = 1.0
+    config.endpoint_min_hangover = 0.3
+    config.endpoint_calibration_chunks = 5
+    config.endpoint_min_utterance = 0.5
+    config.debug = False
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return config
+
+
+def feed(endpointer, values):
+    for index, rms in enumerate(values):
+        if endpointer.update(rms):
+            return index
+    return None
+
+
+def test_calibrates_noise_floor_before_speech():
+    endpointer = Endpointer(make_config())
+    assert feed(endpointer, [50.0] * 5) is None
+    assert endpointer.noise_floor == pytest.approx(50.0)
+    assert endpointer.onset_threshold == pytest.approx(150.0)
+    assert not endpointer.started
+
+
+def test_silence_alone_never_ends_the_turn():
+    endpointer = Endpointer(make_config())
+    assert feed(endpointer, [50.0] * 100) is None
+    assert endpointer.finish("max_length").reason == "no_speech"
+
+
+def test_level_speech_waits_for_full_hangover():
+    endpointer = Endpointer(make_config())
+    speech = [1000.0] * 10
+    ended = feed(endpointer, [50.0] * 5 + speech + [50.0] * 20)
+    # Ten silent chunks (1.0 s) after fifteen calibration and speech chunks.
+    assert ended == 5 + 10 + 9
+    assert endpointer.last_decision.reason == "endpoint"
+    assert not endpointer.last_decision.sentence_final
+
+
+def test_declining_energy_uses_short_hangover():
+    endpointer = Endpointer(make_config())
+    speech = [2000.0] * 7 + [800.0] * 3
+    ended = feed(endpointer, [50.0] * 5 + speech + [50.0] * 20)
+    assert ended == 5 + 10 + 2
+    assert endpointer.last_decision.sentence_final
@@ -0,0 +1,66 @@
+import pytest
+
+from app.agents.intent_classifier import IntentClassifier
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("I have been feeling really anxious lately", "EMOTIONAL_EXPRESSION"),
+    ("I cried all night", "EMOTIONAL_EXPRESSION"),
+    ("Work has been really stressful", "EMOTIONAL_EXPRESSION"),
+    ("Could you repeat that?", "REQUEST_REPEAT"),
+    ("What do you mean?", "REQUEST_CLARIFICATION"),
+    ("Why do you keep asking?", "DEFENSIVE"),
+    ("And also my sister", "ELABORATION"),
+    ("Is that normal?", "QUESTION"),
+    ("I work at a bank", "INFORMATION"),
+])
+def test_a_single_clear_match_is_handled_locally(text, intent):
+    classifier = IntentClassifier(escalate=lambda text: pytest.fail(f"escalated: {text}"))
+    assert classifier.score(text)[1] >= classifier.threshold
+    assert classifier.classify(text) == intent
+    assert classifier.get_stats()["local"] == 1
+
+
+@pytest.mark.parametrize("text", [
+    "hmm okay",
+    "I'm fine",
+    # Emotion and information both match.
+    "I feel like my boss hates me",
+])
+def test_weak_or_conflicting_matches_are_escalated(text):
+    escalated = []
+
+    def escalate(text):
+        escalated.append(text)
+        return "INFORMATION"
+
+    classifier = IntentClassifier(escalate=escalate)
+    assert classifier.classify(text) == "INFORMATION"
+    assert escalated == [text]
+
+
+def test_question_form_counts_towards_requests():
+    intent, _ = IntentClassifier().score("Sorry, what did you say?")
+    assert intent == "REQUEST_REPEAT"
+
+
+def test_results_are_cached_by_normalized_text():
+    calls = []
+    classifier = IntentClassifier(escalate=lambda text: calls.append(text) or "QUESTION")
+    assert classifier.classify("hmm okay") == "QUESTION"
+    assert classifier.classify("  Hmm   OKAY ") == "QUESTION"
+    assert calls == ["hmm okay"]
+    assert classifier.get_stats()["cache_hits"] == 1
+
+
+def test_cache_is_bounded():
+    classifier = IntentClassifier(cache_size=2)
+    for text in ("one", "two", "three"):
+        classifier.classify(text)
+    assert list(classifier.cache) == ["two", "three"]
+
+
+def test_without_escalation_the_best_guess_is_used():
+    classifier = IntentClassifier()
+    assert classifier.classify("hmm okay") == "INFORMATION"
+    assert classifier.get_stats()["escalation_rate"] == 0.0
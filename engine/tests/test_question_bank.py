@@ -0,0 +1,75 @@
+from app.agents.question_bank import QuestionBank, normalize, tokenize
+
+SMALL_BANK = {
+    "PROBE_DETAILS": [
+        ("How have you been sleeping lately?", "sleep tired night"),
+        ("What is a typical day at work like for you?", "work job boss"),
+    ],
+    "PROBE_EMOTION": [
+        ("How did that make you feel?", "feel feeling"),
+    ],
+}
+
+
+def test_tokenize_drops_stopwords_and_folds_plurals():
+    assert tokenize("What about your friends and the weeks?") == ["friend", "week"]
+    assert tokenize("It's a class") == ["class"]
+
+
+def test_select_matches_the_patient_topic():
+    bank = QuestionBank()
+    assert bank.select("PROBE_DETAILS", "I keep waking up at night and I'm exhausted") == "How have you been sleeping lately?"
+    assert bank.select("PROBE_EMOTION", "I get so angry at him") == "What makes you angry about it?"
+
+
+def test_keywords_count_towards_the_match():
+    bank = QuestionBank(SMALL_BANK)
+    assert bank.select("PROBE_DETAILS", "it was fine", keywords=["boss"]) == "What is a typical day at work like for you?"
+
+
+def test_questions_are_not_repeated_until_the_bank_runs_out():
+    bank = QuestionBank(SMALL_BANK)
+    asked = [bank.select("PROBE_DETAILS", "I can't sleep") for _ in range(3)]
+    assert asked == [
+        "How have you been sleeping lately?",
+        "What is a typical day at work like for you?",
+        # Strategy exhausted: the rest of the bank is used next.
+        "How did that make you feel?",
+    ]
+    # Everything asked: the longest-unused question comes back.
+    assert bank.select("PROBE_DETAILS", "I can't sleep") == "How have you been sleeping lately?"
+
+
+def test_excluded_outputs_are_skipped_regardless_of_punctuation():
+    bank = QuestionBank(SMALL_BANK)
+    question = bank.select("PROBE_DETAILS", "I can't sleep", exclude=["how have you been sleeping lately"])
+    assert question == "What is a typical day at work like for you?"
+
+
+def test_unknown_strategy_uses_the_whole_bank():
+    bank = QuestionBank(SMALL_BANK)
+    assert bank.select("NOT_A_STRATEGY", "I feel awful") == "How did that make you feel?"
+
+
+def test_empty_bank_returns_none():
+    assert QuestionBank({}).select("PROBE_DETAILS", "anything") is None
+
+
+def test_supports_only_english():
+    assert QuestionBank.supports("en")
+    assert QuestionBank.supports("English")
+    assert not QuestionBank.supports("es")
+    assert not QuestionBank.supports("")
+
+
+def test_normalize_ignores_case_and_punctuation():
+    assert normalize("Did I get that RIGHT?") == normalize("did i get that right")
+
+
+def test_is_repeat_rejects_near_matches_of_earlier_outputs():
+    bank = QuestionBank(SMALL_BANK)
+    question = bank.select(
+        "PROBE_DETAILS", "I can't sleep",
+        is_repeat=lambda text: "sleeping" in text
+    )
+    assert question == "What is a typical day at work like for you?"
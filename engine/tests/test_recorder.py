@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pyaudio = pytest.importorskip("pyaudio")
+
+from app.config import Config
+from app.audio.recorder import AudioRecorder
+
+SAMPLES_PER_CHUNK = 160
+
+
+class FakeCapture:
+    # A capture ring that has already recorded `energies`, one per chunk.
+    # Every sample of a chunk holds the chunk index, so audio views show
+    # which chunks they came from. `events` maps a chunk index to a callback
+    # run the first time that chunk is waited for.
+
+    def __init__(self, energies, events=None):
+        self.energies = np.asarray(energies, dtype=np.float32)
+        self.samples = np.repeat(np.arange(len(energies), dtype=np.int16), SAMPLES_PER_CHUNK)
+        self.capacity_chunks = 4 * len(energies)
+        self.chunks_written = 0
+        self.events = dict(events or {})
+
+    def wait_for_chunk(self, index, timeout=1.0):
+        event = self.events.pop(index, None)
+        if event is not None:
+            event()
+        self.chunks_written = max(self.chunks_written, min(index + 1, len(self.energies)))
+        return index < len(self.energies)
+
+    def is_active(self):
+        return True
+
+    def chunk_energy(self, index):
+        return float(self.energies[index])
+
+    def view(self, start_chunk, end_chunk):
+        return self.samples[start_chunk * SAMPLES_PER_CHUNK:end_chunk * SAMPLES_PER_CHUNK]
+
+    def rms_view(self, start_chunk, end_chunk):
+        return self.energies[start_chunk:end_chunk]
+
+
+class FakePyAudio:
+    def terminate(self):
+        pass
+
+
+def make_recorder(monkeypatch, capture):
+    monkeypatch.setattr(pyaudio, "PyAudio", FakePyAudio)
+    config = Config()
+    config.sample_rate = 1600
+    config.chunk_size = SAMPLES_PER_CHUNK  # 0.1 s chunks
+    config.channels = 1
+    config.silence_threshold = 100.0
+    config.silence_duration = 0.5
+    config.capture_preroll = 0.2
+    config.trim_padding = 0.0
+    config.min_voiced_duration = 0.2
+    config.adaptive_endpointing = False
+    config.persistent_capture = False
+    config.asr_debug_wav = False
+    recorder = AudioRecorder(config)
+    recorder.capture = capture
+    return recorder
+
+
+def test_barge_in_during_recording_rewinds_to_the_onset(monkeypatch):
+    # Chunks 0-3 are our playback leaking into the microphone, the patient
+    # talks over it from chunk 4 and barge-in fires at chunk 7.
+    energies = [500.0] * 4 + [800.0] * 6 + [10.0] * 10
+    recorder = None
+
+    def barge_in():
+        recorder.resume_from(4)
+        recorder.playback.clear()
+
+    capture = FakeCapture(energies, events={7: barge_in})
+    recorder = make_recorder(monkeypatch, capture)
+    recorder.playback.set()
+
+    audio = recorder.record_utterance()
+
+    assert recorder.start_chunk == 4 - recorder.preroll_chunks
+    assert recorder.pending_onset is None
+    # The onset chunk is kept even though it was read while playback was on.
+    assert audio[0] == 2
+    assert audio[-1] == 9
+
+
+def test_onset_from_before_the_recording_is_used_at_the_start(monkeypatch):
+    energies = [10.0] * 3 + [800.0] * 4 + [10.0] * 10
+    capture = FakeCapture(energies)
+    recorder = make_recorder(monkeypatch, capture)
+    recorder.resume_from(3)
+
+    audio = recorder.record_utterance()
+
+    assert recorder.start_chunk == 3 - recorder.preroll_chunks
+    assert audio[0] == 3
+    assert audio[-1] == 6
@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from app.llm.router import CLOSED, HALF_OPEN, OPEN, BackendHealth
+
+
+def test_breaker_opens_after_consecutive_failures():
+    backend = BackendHealth("remote", None, failure_threshold=3, cooldown=30.0)
+    backend.record_failure(0.1)
+    backend.record_failure(0.1)
+    backend.record_success(0.1)
+    backend.record_failure(0.1)
+    backend.record_failure(0.1)
+    assert backend.state == CLOSED
+    backend.record_failure(0.1)
+    assert backend.state == OPEN
+    assert not backend.is_available()
+    assert not backend.acquire()
+    assert backend.get_stats()["opens"] == 1
+
+
+def test_half_open_lets_one_probe_through():
+    backend = BackendHealth("remote", None, failure_threshold=1, cooldown=30.0)
+    backend.record_failure(0.1)
+    backend.opened_at -= 31.0
+    assert backend.is_available()
+    assert backend.acquire()
+    assert backend.state == HALF_OPEN
+    assert not backend.acquire()
+
+
+def test_probe_outcome_closes_or_reopens():
+    backend = BackendHealth("remote", None, failure_threshold=1, cooldown=30.0)
+    backend.record_failure(0.1)
+    backend.opened_at -= 31.0
+    backend.acquire()
+    backend.record_failure(0.1)
+    assert backend.state == OPEN
+    assert backend.get_stats()["opens"] == 2
+
+    backend.opened_at -= 31.0
+    backend.acquire()
+    backend.record_success(0.1)
+    assert backend.state == CLOSED
+    assert backend.acquire()
+
+
+def test_ewma_latency_tracks_recent_calls():
+    backend = BackendHealth("remote", None, alpha=0.5)
+    assert backend.expected_latency() == 0.0
+    backend.record_success(1.0)
+    backend.record_success(3.0)
+    assert backend.expected_latency() == pytest.approx(2.0)
+
+
+class StubClient:
+    def __init__(self, reply=None, error=None):
+        self.reply = reply
+        self.error = error
+        self.deadlines = []
+
+    def complete(self, prompt, max_new_tokens=128, temperature=0.7, deadline=None):
+        self.deadlines.append(deadline)
+        if self.error:
+            raise self.error
+        return self.reply
+
+
+@pytest.fixture
+def make_manager():
+    pytest.importorskip("torch")
+    from app.llm.llm_manager import LLMManager
+
+    def make(*clients, latencies=()):
+        # Bypasses __init__ so no real backend is loaded.
+        manager = LLMManager.__new__(LLMManager)
+        manager.config = SimpleNamespace(
+            llm_deadline=8.0,
+            llm_intent_deadline=2.0,
+            llm_breaker_failures=2,
+            llm_breaker_cooldown=30.0,
+            llm_ewma_alpha=0.3
+        )
+        manager.client = clients[0]
+        manager.client_name = "primary"
+        manager.backends = []
+        manager.backends_lock = threading.Lock()
+        manager.routed = Counter()
+        for index, client in enumerate(clients):
+            backend = manager._add_backend(f"backend{index}", client)
+            if index < len(latencies):
+                backend.ewma_latency = latencies[index]
+        return manager
+
+    return make
+
+
+def test_failed_call_falls_through_to_next_backend(make_manager):
+    primary = StubClient(error=RuntimeError("down"))
+    fallback = StubClient(reply="fallback?")
+    manager = make_manager(primary, fallback)
+    assert manager.generate("hi") == "fallback?"
+    stats = manager.get_router_stats()
+    assert stats["routed"] == {"response:backend1": 1}
+    assert stats["backends"]["backend0"]["failures"] == 1
+
+
+def test_open_breaker_is_skipped(make_manager):
+    primary = StubClient(error=RuntimeError("down"))
+    fallback = StubClient(reply="fallback?")
+    manager = make_manager(primary, fallback)
+    manager.generate("hi")
+    manager.generate("hi")
+    manager.generate("hi")
+    assert len(primary.deadlines) == 2
+    assert manager.get_router_stats()["routed"]["response:backend1"] == 3
+
+
+def test_intent_prefers_the_fastest_backend(make_manager):
+    slow = StubClient(reply="slow")
+    fast = StubClient(reply="fast")
+    manager = make_manager(slow, fast, latencies=(1.5, 0.2))
+    assert manager.generate("hi", purpose="intent") == "fast"
+    assert manager.generate("hi") == "slow"
+
+
+def test_budget_reserves_time_for_the_fallback(make_manager):
+    primary = StubClient(reply="primary?")
+    fallback = StubClient(reply="fallback?")
+    manager = make_manager(primary, fallback, latencies=(1.0, 2.0))
+    manager.generate("hi")
+    assert primary.deadlines[0] == pytest.approx(6.0, abs=0.05)
+
+
+def test_budget_reserve_is_capped_by_a_slow_fallback(make_manager):
+    primary = StubClient(reply="primary?")
+    fallback = StubClient(reply="fallback?")
+    manager = make_manager(primary, fallback, latencies=(1.0, 7.5))
+    manager.generate("hi")
+    # Without the cap the primary would get only half a second.
+    assert primary.deadlines[0] == pytest.approx(4.0, abs=0.05)
+
+
+def test_budget_keeps_the_primary_expected_latency(make_manager):
+    primary = StubClient(reply="primary?")
+    fallback = StubClient(reply="fallback?")
+    manager = make_manager(primary, fallback, latencies=(5.0, 6.0))
+    manager.generate("hi")
+    assert primary.deadlines[0] == pytest.approx(5.0, abs=0.05)
+
+
+def test_last_backend_gets_the_whole_remaining_deadline(make_manager):
+    only = StubClient(reply="only?")
+    manager = make_manager(only, latencies=(9.0,))
+    started = time.monotonic()
+    manager.generate("hi")
+    assert only.deadlines[0] == pytest.approx(8.0 - (time.monotonic() - started), abs=0.05)
+
+
+def test_single_open_backend_fails_without_a_call(make_manager):
+    from app.llm.llm_manager import FALLBACK_RESPONSE
+
+    only = StubClient(error=RuntimeError("down"))
+    manager = make_manager(only)
+    manager.generate("hi")
+    manager.generate("hi")
+    assert manager.generate("hi") == FALLBACK_RESPONSE
+    assert list(manager.generate_stream("hi")) == [FALLBACK_RESPONSE]
+    assert len(only.deadlines) == 2
+
+    # Once the cooldown has passed, a single probe gets through.
+    manager.backends[0].opened_at -= 31.0
+    only.error = None
+    only.reply = "back?"
+    assert manager.generate("hi") == "back?"
+    assert manager.backends[0].state == CLOSED
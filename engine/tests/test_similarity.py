@@ -0,0 +1,118 @@
+import random
+import threading
+
+from app.utils.similarity import MinHashIndex, SimilarityChecker, jaccard
+
+VOCABULARY = [f"word{index}" for index in range(2000)]
+
+
+def random_set(rng, size=12):
+    return frozenset(rng.sample(VOCABULARY, size))
+
+
+def near_duplicate(rng, tokens, keep):
+    kept = rng.sample(sorted(tokens), keep)
+    return frozenset(kept + rng.sample(VOCABULARY, len(tokens) - keep))
+
+
+def test_jaccard():
+    assert jaccard(frozenset("ab"), frozenset("bc")) == 1 / 3
+    assert jaccard(frozenset(), frozenset("a")) == 0.0
+
+
+def test_index_finds_near_duplicates():
+    rng = random.Random(7)
+    index = MinHashIndex()
+    queries = []
+    for _ in range(200):
+        tokens = random_set(rng)
+        index.add(tokens)
+        # 10 of 12 tokens shared: Jaccard of about 0.7.
+        queries.append((tokens, near_duplicate(rng, tokens, 10)))
+    found = sum(index.max_similarity(query) == jaccard(query, tokens) for tokens, query in queries)
+    assert found >= 195
+
+
+def test_index_rarely_returns_unrelated_sets():
+    rng = random.Random(11)
+    index = MinHashIndex()
+    for _ in range(500):
+        index.add(random_set(rng))
+    candidates = [len(index.candidates(random_set(rng))) for _ in range(100)]
+    assert sum(candidates) / len(candidates) < 5
+
+
+def test_index_scores_exactly_and_ignores_empty_sets():
+    index = MinHashIndex()
+    index.add(frozenset())
+    index.add(frozenset({"how", "did", "that", "feel"}))
+    assert len(index) == 1
+    assert index.max_similarity(frozenset({"how", "did", "that", "feel"})) == 1.0
+    assert index.max_similarity(frozenset()) == 0.0
+
+
+def test_window_scope_only_checks_the_outputs_passed_in():
+    checker = SimilarityChecker(threshold=0.6, scope="window")
+    checker.add("How did that make you feel?")
+    assert not checker.is_too_similar("How did that make you feel?", [])
+    assert checker.is_too_similar("How did that make you feel", ["how did that make you FEEL?"])
+
+
+def test_session_scope_remembers_every_added_output():
+    checker = SimilarityChecker(threshold=0.6, scope="session")
+    checker.add("How did that make you feel?")
+    for index in range(50):
+        checker.add(f"Unrelated question number {index} about topic {index * 7}?")
+    assert checker.is_too_similar("How did that make you feel?", ["something else entirely"])
+    assert checker.max_similarity("How did that make you feel?", []) == 1.0
+    assert not checker.is_too_similar("What happened at work yesterday?", [])
+
+
+def test_session_threshold_applies_to_older_outputs():
+    checker = SimilarityChecker(threshold=0.6, scope="session", session_threshold=0.75)
+    checker.add("How are you feeling about work these days?")
+    # Jaccard of 0.7: a repeat of a recent output, but not of an older one.
+    candidate = "How are you feeling about your family these days?"
+    assert checker.is_too_similar(candidate, ["How are you feeling about work these days?"])
+    assert not checker.is_too_similar(candidate, [])
+    assert checker.is_too_similar("How are you feeling about work these days", [])
+
+
+def test_prefix_check_compares_opening_clauses():
+    checker = SimilarityChecker(threshold=0.6)
+    recent = ["How did that make you feel when it happened?"]
+    assert checker.is_too_similar_prefix("How did that make", recent)
+    assert not checker.is_too_similar_prefix("How did", recent)
+    assert not checker.is_too_similar_prefix("Where were you then", recent)
+
+
+def test_token_cache_is_bounded_lru():
+    checker = SimilarityChecker(cache_size=2)
+    checker.tokenize("one")
+    checker.tokenize("two")
+    checker.tokenize("one")
+    checker.tokenize("three")
+    assert list(checker.token_cache) == ["one", "three"]
+
+
+def test_concurrent_use_keeps_the_cache_consistent():
+    checker = SimilarityChecker(scope="session", cache_size=16)
+    errors = []
+
+    def work(offset):
+        try:
+            for index in range(300):
+                text = f"question {offset} {index % 40}"
+                checker.add(text)
+                checker.is_too_similar(text, [f"question {offset} {index % 7}"])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(checker.token_cache) <= 16
+    assert len(checker.index) == 1200
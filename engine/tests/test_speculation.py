@@ -0,0 +1,191 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from app.agents.speculation import SpeculativeResponder
+
+AUDIO = np.zeros(1600, dtype=np.float32)
+
+
+class FakeASR:
+    def __init__(self, text="I could not sleep last night", error=None):
+        self.text = text
+        self.error = error
+        self.release = threading.Event()
+        self.release.set()
+
+    def transcribe(self, audio, initial_prompt=None, observe=True):
+        self.release.wait()
+        if self.error:
+            raise self.error
+        return self.text, "en"
+
+
+class FakeOrchestrator:
+    # preview_turn/generate_for_turn/finalize_turn as SpeculativeResponder
+    # calls them; generation blocks until `release` is set.
+
+    def __init__(self, response="How long has that been going on?", deadline=2.0, error=None):
+        self.response = response
+        self.deadline = deadline
+        self.error = error
+        self.generating = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self.previews = []
+
+    def turn_deadline(self, language):
+        return self.deadline
+
+    def preview_turn(self, text, language):
+        self.previews.append(text)
+        return SimpleNamespace(text=text, abandoned=False)
+
+    def generate_for_turn(self, plan):
+        self.generating.set()
+        self.release.wait()
+        if self.error:
+            raise self.error
+        return self.response
+
+    def finalize_turn(self, plan, response):
+        return response
+
+
+@pytest.fixture
+def make_responder():
+    responders = []
+
+    def make(asr=None, orchestrator=None, is_trivial=lambda text: False):
+        asr = asr or FakeASR()
+        orchestrator = orchestrator or FakeOrchestrator()
+        config = SimpleNamespace(speculative_match_threshold=0.8)
+        responder = SpeculativeResponder(orchestrator, asr, config, is_trivial)
+        responders.append((responder, asr, orchestrator))
+        return responder
+
+    yield make
+    for responder, asr, orchestrator in responders:
+        asr.release.set()
+        orchestrator.release.set()
+        responder.executor.shutdown(wait=True)
+
+
+def settle(responder):
+    # Waits for the speculation to finish so resolve() sees its outcome.
+    try:
+        responder.current.future.result(timeout=2.0)
+    except Exception:
+        pass
+
+
+def test_matching_transcript_is_a_hit(make_responder):
+    responder = make_responder()
+    responder.on_pause(AUDIO)
+    settle(responder)
+    plan, response = responder.resolve("I could not sleep last night.", "en", time.monotonic())
+    assert plan.text == "I could not sleep last night"
+    assert response == "How long has that been going on?"
+    stats = responder.get_stats()
+    assert stats["hits"] == 1
+    assert stats["hit_rate"] == 1.0
+    assert stats["latency_saved_s"] >= 0.0
+
+
+def test_different_transcript_is_a_mismatch(make_responder):
+    responder = make_responder()
+    responder.on_pause(AUDIO)
+    settle(responder)
+    assert responder.resolve("My sister called me yesterday about the house", "en") is None
+    assert responder.get_stats()["miss_mismatch"] == 1
+
+
+def test_asr_failure_is_not_counted_as_a_mismatch(make_responder):
+    responder = make_responder(asr=FakeASR(error=RuntimeError("decoder crashed")))
+    responder.on_pause(AUDIO)
+    settle(responder)
+    assert responder.resolve("I could not sleep last night", "en") is None
+    stats = responder.get_stats()
+    assert stats["miss_asr_error"] == 1
+    assert "miss_mismatch" not in stats
+
+
+def test_slow_asr_is_a_miss_within_the_deadline(make_responder):
+    asr = FakeASR()
+    asr.release.clear()
+    responder = make_responder(asr=asr, orchestrator=FakeOrchestrator(deadline=0.1))
+    responder.on_pause(AUDIO)
+    waited = time.monotonic()
+    assert responder.resolve("I could not sleep last night", "en") is None
+    assert time.monotonic() - waited < 1.0
+    assert responder.get_stats()["miss_slow_asr"] == 1
+
+
+def test_generation_past_the_deadline_hands_back_the_plan(make_responder):
+    orchestrator = FakeOrchestrator(deadline=0.1)
+    orchestrator.release.clear()
+    responder = make_responder(orchestrator=orchestrator)
+    responder.on_pause(AUDIO)
+    assert orchestrator.generating.wait(2.0)
+    plan, response = responder.resolve("I could not sleep last night", "en", time.monotonic())
+    assert response is None
+    assert plan.abandoned
+    assert responder.get_stats()["miss_timeout"] == 1
+
+
+def test_deadline_counts_from_the_start_of_the_turn(make_responder):
+    orchestrator = FakeOrchestrator(deadline=2.0)
+    orchestrator.release.clear()
+    responder = make_responder(orchestrator=orchestrator)
+    responder.on_pause(AUDIO)
+    assert orchestrator.generating.wait(2.0)
+    # The turn started long enough ago that its deadline has already passed.
+    waited = time.monotonic()
+    plan, response = responder.resolve("I could not sleep last night", "en", time.monotonic() - 5.0)
+    assert time.monotonic() - waited < 0.5
+    assert response is None and plan.abandoned
+
+
+def test_generation_error_is_a_miss(make_responder):
+    responder = make_responder(orchestrator=FakeOrchestrator(error=RuntimeError("llm down")))
+    responder.on_pause(AUDIO)
+    settle(responder)
+    assert responder.resolve("I could not sleep last night", "en") is None
+    assert responder.get_stats()["miss_error"] == 1
+
+
+def test_trivial_transcript_is_not_answered(make_responder):
+    orchestrator = FakeOrchestrator()
+    responder = make_responder(orchestrator=orchestrator, is_trivial=lambda text: True)
+    responder.on_pause(AUDIO)
+    settle(responder)
+    assert responder.resolve("I could not sleep last night", "en") is None
+    assert responder.get_stats()["miss_no_response"] == 1
+    assert orchestrator.previews == []
+
+
+def test_new_pause_supersedes_the_previous_one(make_responder):
+    orchestrator = FakeOrchestrator()
+    orchestrator.release.clear()
+    responder = make_responder(orchestrator=orchestrator)
+    responder.on_pause(AUDIO)
+    assert orchestrator.generating.wait(2.0)
+    first = responder.current
+    responder.on_pause(AUDIO)
+    assert first.cancelled.is_set()
+    assert responder.get_stats()["throttled"] == 1
+    orchestrator.release.set()
+    assert first.future.result(timeout=2.0) is None
+    settle(responder)
+    assert responder.resolve("I could not sleep last night", "en")[1] == "How long has that been going on?"
+
+
+def test_resolve_without_a_pause(make_responder):
+    responder = make_responder()
+    assert responder.resolve("anything", "en") is None
+    assert responder.get_stats()["not_started"] == 1
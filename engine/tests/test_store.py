@@ -0,0 +1,93 @@
+from app.memory.store import CONTEXT_HEADER, ConversationStore
+
+
+def make_store(turns, **kwargs):
+    store = ConversationStore(**kwargs)
+    for index in range(turns):
+        store.add_primary_turn(f"patient {index}", "INFORMATION")
+        store.add_agent_turn("1", f"question {index}?", "PROBE_DETAILS")
+    return store
+
+
+def context_lines(context):
+    return context.split("\n")[len(CONTEXT_HEADER):]
+
+
+def test_empty_session_context():
+    store = ConversationStore()
+    assert context_lines(store.build_context(6)) == ["(Session just started)"]
+
+
+def test_context_renders_the_last_turns():
+    store = make_store(3)
+    assert store.build_context(3) == "\n".join(CONTEXT_HEADER + [
+        "STUDENT 1: question 1?",
+        "PATIENT: patient 2",
+        "STUDENT 1: question 2?",
+    ])
+
+
+def test_context_is_cached_until_the_next_turn():
+    store = make_store(2)
+    first = store.build_context(4)
+    assert store.build_context(4) is first
+    store.add_primary_turn("new", "INFORMATION")
+    assert context_lines(store.build_context(4))[-1] == "PATIENT: new"
+
+
+def test_history_beyond_the_rendered_window():
+    store = make_store(10, context_window=4)
+    lines = context_lines(store.build_context(6))
+    assert lines == [
+        "PATIENT: patient 7",
+        "STUDENT 1: question 7?",
+        "PATIENT: patient 8",
+        "STUDENT 1: question 8?",
+        "PATIENT: patient 9",
+        "STUDENT 1: question 9?",
+    ]
+
+
+def test_pending_primary_is_rendered_but_not_stored():
+    store = make_store(2)
+    before = store.build_context(3)
+    context = store.build_context(3, pending_primary="still talking")
+    assert context_lines(context) == [
+        "PATIENT: patient 1",
+        "STUDENT 1: question 1?",
+        "PATIENT: still talking",
+    ]
+    assert store.get_turn_count() == 4
+    assert store.build_context(3) == before
+
+
+def test_truncation_updates_the_cached_context():
+    store = make_store(2)
+    store.build_context(2)
+    store.mark_last_agent_turn_truncated("question 1?")
+    assert context_lines(store.build_context(2))[-1] == "STUDENT 1: question 1? (interrupted by patient)"
+
+
+def test_truncation_of_a_turn_outside_the_window():
+    store = make_store(5, context_window=2)
+    store.mark_last_agent_turn_truncated("question 0?")
+    assert store.turns[1].truncated
+    assert context_lines(store.build_context(10))[1] == "STUDENT 1: question 0? (interrupted by patient)"
+
+
+def test_recent_agent_outputs_follow_the_similarity_window():
+    store = make_store(4, similarity_window=2)
+    assert store.get_recent_agent_outputs() == ["question 2?", "question 3?"]
+
+
+def test_turn_counts():
+    store = make_store(3)
+    store.add_primary_turn("one more", "INFORMATION")
+    assert store.get_turn_count() == 7
+    assert store.get_primary_turn_count() == 4
+
+
+def test_recent_transcript_is_limited_to_whole_recent_turns():
+    store = make_store(3)
+    assert store.get_recent_transcript(25) == "patient 2 question 2?"
+    assert store.get_recent_transcript(5) == "on 2?"
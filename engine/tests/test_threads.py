@@ -0,0 +1,73 @@
+from app.memory.store import ConversationStore
+from app.memory.threads import ThreadInferencer
+
+
+def add_patient_turns(store, texts):
+    for text in texts:
+        store.add_primary_turn(text, "INFORMATION")
+        store.add_agent_turn("1", "What about work and sleep?", "PROBE_DETAILS")
+
+
+def test_keywords_skip_stopwords_short_words_and_punctuation():
+    inferencer = ThreadInferencer()
+    assert inferencer.extract_keywords("I really can't SLEEP, my boss is on me!") == ["cant", "sleep", "boss"]
+
+
+def test_threads_rank_patient_keywords_by_frequency():
+    store = ConversationStore()
+    add_patient_turns(store, [
+        "My boss keeps shouting at work.",
+        "Work is awful and my boss ignores me.",
+        "I lie awake thinking about work.",
+    ])
+    inferencer = ThreadInferencer(max_threads=2)
+    # Agent turns mention "sleep" three times but are not counted.
+    assert inferencer.infer_threads(store) == ["work", "boss"]
+
+
+def test_ties_keep_first_seen_order():
+    store = ConversationStore()
+    add_patient_turns(store, ["Mother father sister"])
+    assert ThreadInferencer(max_threads=3).infer_threads(store) == ["mother", "father", "sister"]
+
+
+def test_threads_are_published_every_update_interval():
+    store = ConversationStore()
+    inferencer = ThreadInferencer(update_interval=2)
+    add_patient_turns(store, ["Money worries again."])
+    inferencer.update_if_needed(store)
+    assert store.active_threads == []
+    add_patient_turns(store, ["Money and rent."])
+    inferencer.update_if_needed(store)
+    assert store.active_threads[0] == "money"
+
+
+def test_incremental_sync_matches_a_fresh_count():
+    store = ConversationStore()
+    incremental = ThreadInferencer(max_threads=4)
+    for text in ["Work is hard.", "Sleep is bad.", "Work and sleep, sleep.", "My sister calls."]:
+        add_patient_turns(store, [text])
+        incremental.update_if_needed(store)
+    assert incremental.infer_threads(store) == ThreadInferencer(max_threads=4).infer_threads(store)
+
+
+def test_decay_follows_the_current_topic():
+    texts = ["Work work work."] * 3 + ["Sleep sleep."] * 2
+    store = ConversationStore()
+    add_patient_turns(store, texts)
+    assert ThreadInferencer(max_threads=1).infer_threads(store) == ["work"]
+    assert ThreadInferencer(max_threads=1, decay=0.5).infer_threads(store) == ["sleep"]
+
+
+def test_rescaling_keeps_the_decayed_ranking():
+    inferencer = ThreadInferencer(max_threads=3, decay=0.5)
+    expected = {}
+    for turn in range(40):
+        keyword = ["alpha", "beta", "gamma"][turn % 3]
+        inferencer.observe(keyword)
+        for key in expected:
+            expected[key] *= 0.5
+        expected[keyword] = expected.get(keyword, 0.0) + 1.0
+    assert inferencer.turn_weight <= 1e6
+    ranking = sorted(expected, key=expected.get, reverse=True)
+    assert [keyword for keyword, _ in inferencer.keyword_weights.most_common()] == ranking
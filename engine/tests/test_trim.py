@@ -0,0 +1,24 @@
+import numpy as np
+from app.audio.trim import find_speech_span, voiced_duration
+
+
+def test_span_covers_voiced_chunks_with_padding():
+    rms = np.array([0, 0, 0, 500, 600, 0, 700, 0, 0, 0], dtype=np.float32)
+    assert find_speech_span(rms, 200.0) == (3, 7)
+    assert find_speech_span(rms, 200.0, pad_chunks=2) == (1, 9)
+
+
+def test_padding_is_clamped_to_clip():
+    rms = np.array([500, 0, 0, 500], dtype=np.float32)
+    assert find_speech_span(rms, 200.0, pad_chunks=5) == (0, 4)
+
+
+def test_silent_clip_has_no_span():
+    rms = np.zeros(10, dtype=np.float32)
+    assert find_speech_span(rms, 200.0) is None
+    assert voiced_duration(rms, 200.0, 0.064) == 0.0
+
+
+def test_voiced_duration_counts_chunks_above_threshold():
+    rms = np.array([0, 300, 300, 100, 300], dtype=np.float32)
+    assert voiced_duration(rms, 200.0, 0.5) == 1.5